@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: listing a large mailbox (latency and peak Python memory).
+
+full-parse:   get_messages before the index (policy.default, every body decoded)
+headers-only: header-block parse of every file, bodies never read
+index-cold:   first listing, index built from the files on disk
+index-warm:   later listings, index replay + directory scan
+index-top10:  warm listing with --limit 10 (heap top-N instead of a full sort)
+
+Usage: python benchmarks/bench_mail_list.py [--messages N] [--body-size BYTES] [--runs N]
+"""
+
+import argparse
+import email
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from email import policy
+from email.message import EmailMessage
+from email.utils import formatdate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ucas import mail, mail_index  # noqa: E402
+
+FOLDERS = ["inbox", "read"]
+
+
+def populate(mail_dir: Path, count: int, body_size: int) -> None:
+    mail._ensure_mail_dirs(mail_dir)
+    body = ("lorem ipsum dolor sit amet " * (body_size // 27 + 1))[:body_size]
+    for i in range(count):
+        msg = EmailMessage()
+        msg['Subject'] = f"Task {i}"
+        msg['From'] = "lead@/tmp/project"
+        msg['To'] = "worker"
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = f"<bench-{i:07d}@ucas-bench>"
+        msg.set_content(body)
+        folder = "inbox" if i % 2 else "read"
+        (mail_dir / folder / f"bench-{i:07d}.eml").write_bytes(msg.as_bytes())
+
+
+def legacy_parse(path: Path, folder: str) -> dict:
+    """The pre-index _parse_eml: full message, every part decoded."""
+    with open(path, 'rb') as f:
+        msg = email.message_from_binary_file(f, policy=policy.default)
+    body = msg.get_content() if not msg.is_multipart() else ""
+    return {"id": path.stem, "timestamp": path.stat().st_mtime, "from": msg.get('From'),
+            "to": msg.get('To'), "subject": msg.get('Subject'), "body": body, "_folder": folder}
+
+
+def scan(mail_dir: Path, parse) -> list:
+    mails = [parse(p, folder) for folder in FOLDERS for p in (mail_dir / folder).glob("*.eml")]
+    mails.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+    return mails
+
+
+def measure(fn, runs: int):
+    """Median latency (ms) over runs, then peak traced memory (MB) of one more run."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples) * 1000, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mailbox listing benchmark")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--body-size", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        mail_dir = root / ".ucas" / "mails" / "worker"
+        populate(mail_dir, args.messages, args.body_size)
+
+        def index_cold():
+            (mail_dir / mail_index.INDEX_FILE).unlink(missing_ok=True)
+            mail.get_messages(agent_name="worker", folders=FOLDERS, project_root=root)
+
+        results = [
+            ("full-parse", measure(lambda: scan(mail_dir, legacy_parse), args.runs)),
+            ("headers-only", measure(lambda: scan(mail_dir, lambda p, f: mail._parse_eml(p, f, headers_only=True)), args.runs)),
+            ("index-cold", measure(index_cold, args.runs)),
+            ("index-warm", measure(lambda: mail.get_messages(agent_name="worker", folders=FOLDERS, project_root=root), args.runs)),
+            ("index-top10", measure(lambda: mail.get_messages(agent_name="worker", folders=FOLDERS, project_root=root, limit=10), args.runs)),
+        ]
+
+    print(f"{args.messages} messages, {args.body_size} byte bodies (list --all)")
+    for label, (ms, peak) in results:
+        print(f"{label:<13} {ms:10.1f} ms   peak {peak:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
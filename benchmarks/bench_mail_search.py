@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: `ucas mail search` on a large mailbox.
+
+build:        first search, FTS table built from every message
+incremental:  search after N new deliveries (only those bodies are read)
+query:        median latency of warm searches (plain, field filter, prefix, phrase)
+grep-scan:    reading every .eml and substring matching, the list+grep baseline
+
+Usage: python benchmarks/bench_mail_search.py [--messages N] [--new N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from email.utils import formatdate
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ucas import mail, mail_search  # noqa: E402
+
+WORDS = ("spec review deploy build green red api endpoint schema migration test fix bug "
+         "release branch merge lunch status report metrics latency cache index worker lead").split()
+QUERIES = ["spec", "subject:migration", "from:lead3 deploy", "late*", '"build green"']
+
+
+def populate(mail_dir: Path, count: int) -> None:
+    mail._ensure_mail_dirs(mail_dir)
+    rng = random.Random(1)
+    for i in range(count):
+        msg = EmailMessage()
+        msg['Subject'] = " ".join(rng.choices(WORDS, k=4))
+        msg['From'] = f"lead{i % 7}@/tmp/project"
+        msg['To'] = "worker"
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = f"<{mail._generate_mail_id()}@ucas-bench>"
+        msg.set_content(" ".join(rng.choices(WORDS, k=60)))
+        folder = "inbox" if i % 4 == 0 else "read"
+        (mail_dir / folder / f"{msg['Message-ID'][1:].split('@')[0]}.eml").write_bytes(msg.as_bytes())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def grep_scan(mail_dir: Path, needle: bytes) -> int:
+    hits = 0
+    for folder in ("inbox", "read"):
+        with os.scandir(mail_dir / folder) as it:
+            for e in it:
+                with open(e.path, "rb") as f:
+                    hits += needle in f.read()
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mail search benchmark")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--new", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        mail_dir = root / ".ucas" / "mails" / "worker"
+        populate(mail_dir, args.messages)
+
+        def search(query):
+            return mail_search.search(mail_dir, query, limit=20)
+
+        build = timed(lambda: search("spec"))
+
+        with mock.patch.dict(os.environ, {"UCAS_AGENT": "lead"}), \
+                mock.patch.object(mail, "_update_project_list"), \
+                mock.patch("sys.stdout", open(os.devnull, "w")):
+            for i in range(args.new):
+                mail.send_mail("worker", f"new spec {i}", "fresh body", project_root=root)
+        incremental = timed(lambda: search("spec"))
+
+        query = {q: statistics.median(timed(lambda: search(q)) for _ in range(5)) for q in QUERIES}
+        grep = timed(lambda: grep_scan(mail_dir, b"spec"))
+
+    print(f"{args.messages} messages")
+    print(f"{'build':<22} {build:10.1f} ms")
+    print(f"{'incremental (+' + str(args.new) + ')':<22} {incremental:10.1f} ms")
+    for q, ms in query.items():
+        print(f"{'query ' + q:<22} {ms:10.1f} ms")
+    print(f"{'grep-scan':<22} {grep:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
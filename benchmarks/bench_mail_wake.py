@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: send-to-wake latency of `ucas mail check --idle`.
+
+A waiter thread blocks in mail._wait_for_mail (inotify, or forced polling);
+the main thread sends a message after a random delay and measures how long
+the waiter takes to notice it.
+
+Usage: python benchmarks/bench_mail_wake.py [--runs N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ucas import mail  # noqa: E402
+
+
+def one_wake(root: Path, poll_only: bool) -> float:
+    mail_dir = root / ".ucas" / "mails" / "worker"
+    for f in (mail_dir / "inbox").glob("*.eml"):
+        f.unlink()
+    woke = {}
+
+    def waiter():
+        mail._wait_for_mail(mail_dir, timeout=30, poll_only=poll_only)
+        woke["at"] = time.perf_counter()
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    time.sleep(random.uniform(0.05, 0.5))
+    with mock.patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        sent_at = time.perf_counter()
+        mail.send_mail("worker", "wake up", "now", project_root=root)
+    t.join()
+    return woke["at"] - sent_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle mail check wake latency")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--poll-runs", type=int, default=4, help="Polling runs (each can take up to 5 s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(mail, "_update_project_list"), \
+            mock.patch("sys.stdout", open(os.devnull, "w")):
+        root = Path(tmp)
+        mail._ensure_mail_dirs(root / ".ucas" / "mails" / "worker")
+        inotify = [one_wake(root, poll_only=False) for _ in range(args.runs)]
+        polling = [one_wake(root, poll_only=True) for _ in range(args.poll_runs)]
+
+    for label, samples in (("inotify", inotify), ("polling", polling)):
+        ms = [s * 1000 for s in samples]
+        print(f"{label:<8} median {statistics.median(ms):9.2f} ms   max {max(ms):9.2f} ms   ({len(ms)} runs)",
+              file=sys.__stdout__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: launch-to-first-output latency, cold shell vs. warm pool worker.
+
+Cold: spawn a fresh login shell that runs the command (what a new tmux
+window does). Warm: hand the command to a pre-spawned pool_worker.py over
+its FIFO (what run-tmux does when `pool.size` is set).
+
+Usage: python benchmarks/bench_pool_latency.py [--runs N] [--cmd CMD]
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+WORKER = Path(__file__).resolve().parent.parent / "mods" / "run-tmux" / "pool_worker.py"
+
+
+def _first_line(proc: subprocess.Popen) -> None:
+    proc.stdout.readline()
+    proc.wait()
+
+
+def bench_cold(cmd: str, shell: str) -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen([shell, "-lc", cmd], stdout=subprocess.PIPE)
+    _first_line(proc)
+    return time.perf_counter() - start
+
+
+def spawn_warm(fifo: str, shell: str) -> subprocess.Popen:
+    inner = " ".join(shlex.quote(p) for p in ["exec", sys.executable, str(WORKER), "--fifo", fifo])
+    proc = subprocess.Popen([shell, "-lc", inner], stdout=subprocess.PIPE)
+    while not os.path.exists(fifo):
+        time.sleep(0.001)
+    return proc
+
+
+def bench_warm(proc: subprocess.Popen, fifo: str, cmd: str) -> float:
+    start = time.perf_counter()
+    claimed = fifo[:-len(".fifo")] + ".claimed"
+    os.rename(fifo, claimed)
+    with open(claimed, "w") as f:
+        f.write(json.dumps({"cmd": cmd, "cwd": os.getcwd()}))
+    _first_line(proc)
+    return time.perf_counter() - start
+
+
+def _report(label: str, samples: list) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{label:<6} median {statistics.median(ms):8.2f} ms   p95 {p95:8.2f} ms   min {ms[0]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm pool launch latency benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--cmd", default="echo ready")
+    parser.add_argument("--shell", default=os.environ.get("SHELL") or "/bin/sh")
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            cold.append(bench_cold(args.cmd, args.shell))
+            fifo = os.path.join(tmp, f"w-{i}.fifo")
+            proc = spawn_warm(fifo, args.shell)
+            warm.append(bench_warm(proc, fifo, args.cmd))
+
+    print(f"{args.runs} runs of {args.cmd!r} via {args.shell}")
+    _report("cold", cold)
+    _report("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+UCAS warm pool worker.
+
+Sits idle in a pre-spawned tmux window (with the user's login shell already
+sourced) and blocks on a FIFO. The tmux runner claims the worker by renaming
+the FIFO, writes a JSON launch payload (one line) into it and the worker
+replaces itself with the requested command.
+
+The FIFO is created under a temporary name, opened read-write (so it always
+has a reader and a writer while the worker lives) and only then renamed to
+its *.fifo name: every visible FIFO belongs to a worker ready to be claimed,
+and a claim that finds no reader (ENXIO) means the worker is gone.
+"""
+import argparse
+import json
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCAS Pool Worker")
+    parser.add_argument("--fifo", required=True, help="FIFO path to wait on")
+    args = parser.parse_args()
+
+    fifo = args.fifo
+    os.makedirs(os.path.dirname(fifo), exist_ok=True)
+    pending = f"{fifo}.{os.getpid()}.new"
+    try:
+        os.mkfifo(pending)
+        fd = os.open(pending, os.O_RDWR)
+        os.rename(pending, fifo)
+    except OSError as e:
+        print(f"Error: pool worker failed to create {fifo}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Blocks until the runner writes the payload line into the (renamed) FIFO
+    raw = b""
+    while not raw.endswith(b"\n"):
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        raw += chunk
+    os.close(fd)
+
+    # The runner renames the FIFO to *.claimed before writing; clean up both
+    for path in (fifo, os.path.splitext(fifo)[0] + ".claimed"):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+    except ValueError:
+        print("Error: pool worker received an invalid payload.", file=sys.stderr)
+        sys.exit(1)
+
+    cwd = payload.get("cwd")
+    if cwd:
+        os.chdir(cwd)
+
+    shell = os.environ.get("SHELL") or "/bin/sh"
+    os.execvp(shell, [shell, "-c", payload["cmd"]])
+
+
+if __name__ == "__main__":
+    main()
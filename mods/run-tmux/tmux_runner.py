@@ -1,8 +1,153 @@
 #!/usr/bin/env python3
 import argparse
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shlex
 import subprocess
 import sys
 import shutil
+import uuid
+
+POOL_WINDOW_PREFIX = "pool-"
+# Session option naming the project a team session belongs to (read by tmux_stop)
+PROJECT_OPTION = "@ucas_project"
+
+
+def _project_key(project_root):
+    """Stable id of a project: equal directory names of two projects differ here."""
+    return hashlib.sha1(os.path.realpath(project_root).encode()).hexdigest()[:12]
+
+
+def _pool_session(project_root):
+    return f"ucas-pool-{_project_key(project_root)}"
+
+
+def _pool_dir(project_root):
+    return os.path.join(project_root, ".ucas", "pool")
+
+
+def _pool_windows(pool_session):
+    res = subprocess.run(['tmux', 'list-windows', '-t', pool_session, '-F', '#{window_name}'],
+                         capture_output=True, text=True)
+    if res.returncode != 0:
+        return None
+    return [w for w in res.stdout.splitlines() if w.startswith(POOL_WINDOW_PREFIX)]
+
+
+def _refill_pool(project_root, pool_size):
+    """Spawn idle workers until the pool holds pool_size windows (run via _spawn_refill)."""
+    pool_session = _pool_session(project_root)
+    windows = _pool_windows(pool_session)
+    missing = pool_size - len(windows or [])
+    worker = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pool_worker.py")
+    shell = os.environ.get("SHELL") or "/bin/sh"
+
+    for _ in range(max(0, missing)):
+        worker_id = uuid.uuid4().hex[:8]
+        fifo = os.path.join(_pool_dir(project_root), f"w-{worker_id}.fifo")
+        inner = ' '.join(shlex.quote(p) for p in ['exec', sys.executable, worker, '--fifo', fifo])
+        cmd = f"{shlex.quote(shell)} -lc {shlex.quote(inner)}"
+        name = f"{POOL_WINDOW_PREFIX}{worker_id}"
+        if windows is None:
+            tmux_cmd = ['tmux', 'new-session', '-d', '-s', pool_session, '-n', name, '-c', project_root, cmd]
+            windows = []
+        else:
+            tmux_cmd = ['tmux', 'new-window', '-d', '-t', pool_session, '-n', name, '-c', project_root, cmd]
+        subprocess.run(tmux_cmd, capture_output=True)
+
+
+def _spawn_refill(project_root, pool_size):
+    """Refill the pool from a detached grandchild, so the launch does not wait for new shells."""
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)  # The child exits right after forking the grandchild
+        return
+    try:
+        if os.fork():
+            os._exit(0)
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        # One refill at a time per project, or concurrent launches overfill the pool
+        os.makedirs(_pool_dir(project_root), exist_ok=True)
+        with open(os.path.join(_pool_dir(project_root), "refill.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            _refill_pool(project_root, pool_size)
+    finally:
+        os._exit(0)
+
+
+def _claim_worker(project_root):
+    """
+    Atomically claim an idle worker. Returns (worker_id, writable fd) or None.
+    Workers publish their FIFO only once they hold it open, so a claimed FIFO
+    without a reader (ENXIO) belongs to a dead worker and is removed.
+    """
+    pool_dir = _pool_dir(project_root)
+    try:
+        candidates = sorted(n for n in os.listdir(pool_dir) if n.endswith(".fifo"))
+    except FileNotFoundError:
+        return None
+
+    for name in candidates:
+        fifo = os.path.join(pool_dir, name)
+        claimed = fifo[:-len(".fifo")] + ".claimed"
+        try:
+            os.rename(fifo, claimed)
+        except FileNotFoundError:
+            continue  # Another launcher won the race
+        try:
+            fd = os.open(claimed, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # Nobody is reading: the worker died, drop the stale FIFO
+                os.unlink(claimed)
+                continue
+            raise
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
+        return name[len("w-"):-len(".fifo")], fd
+    return None
+
+
+def _release_worker(project_root, worker_id):
+    """Put a claimed but unused worker back into the pool."""
+    fifo = os.path.join(_pool_dir(project_root), f"w-{worker_id}.fifo")
+    try:
+        os.rename(fifo[:-len(".fifo")] + ".claimed", fifo)
+    except FileNotFoundError:
+        pass
+
+
+def _launch_from_pool(args, pool_size):
+    """Hand the command to a warm worker and move its window into the team session."""
+    claim = _claim_worker(args.project_root)
+    if not claim:
+        _spawn_refill(args.project_root, pool_size)
+        return False
+
+    worker_id, fd = claim
+    pool_window = f"{_pool_session(args.project_root)}:{POOL_WINDOW_PREFIX}{worker_id}"
+    moved = subprocess.run(['tmux', 'move-window', '-d', '-s', pool_window, '-t', f"{args.session_name}:"],
+                           capture_output=True)
+    if moved.returncode != 0:
+        os.close(fd)
+        _release_worker(args.project_root, worker_id)
+        return False
+    subprocess.run(['tmux', 'rename-window', '-t', f"{args.session_name}:{POOL_WINDOW_PREFIX}{worker_id}",
+                    args.window_name], capture_output=True)
+
+    payload = json.dumps({"cmd": args.cmd, "cwd": args.project_root}).encode() + b"\n"
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+
+    _spawn_refill(args.project_root, pool_size)
+    return True
+
 
 def main():
     parser = argparse.ArgumentParser(description="UCAS Tmux Runner")
@@ -21,18 +166,26 @@ def main():
         sys.exit(1)
 
     # 1. Ensure session exists / check for collision
-    import os
     team_index = int(os.environ.get('UCAS_TEAM_INDEX', '0'))
-    
-    has_session = subprocess.run(['tmux', 'has-session', '-t', args.session_name], 
+    # Set by `ucas team restart/reload`: the member joins a running session
+    appending = os.environ.get('UCAS_TEAM_APPEND') == '1'
+    pool_size = int(os.environ.get('UCAS_POOL_SIZE', '0') or 0)
+    if not args.project_root:
+        pool_size = 0
+
+    has_session = subprocess.run(['tmux', 'has-session', '-t', args.session_name],
                                 capture_output=True)
-    
+
     if has_session.returncode == 0:
-        if team_index == 0:
+        if team_index == 0 and not appending:
             print(f"Error: Tmux session '{args.session_name}' already exists.", file=sys.stderr)
             print(f"Please use 'ucas stop-team {args.team}' to clean up or choose a different team name.", file=sys.stderr)
             sys.exit(1)
-        
+
+        if pool_size > 0 and _launch_from_pool(args, pool_size):
+            print(f"✓ Launched '{args.agent}' from warm pool in tmux session '{args.session_name}' window '{args.window_name}'")
+            return
+
         # Append window to existing session
         tmux_cmd = [
             'tmux', 'new-window',
@@ -49,7 +202,7 @@ def main():
             '-n', args.window_name,
             args.cmd
         ]
-    
+
     try:
         subprocess.run(tmux_cmd, check=True)
         print(f"✓ Launched '{args.agent}' in tmux session '{args.session_name}' window '{args.window_name}'")
@@ -57,5 +210,13 @@ def main():
         print(f"Error: Failed to launch agent in tmux: {e}", file=sys.stderr)
         sys.exit(1)
 
+    if args.project_root:
+        # Lets tmux_stop tell whether the project still has a team session
+        subprocess.run(['tmux', 'set-option', '-t', args.session_name, PROJECT_OPTION,
+                        _project_key(args.project_root)], capture_output=True)
+
+    if pool_size > 0:
+        _spawn_refill(args.project_root, pool_size)
+
 if __name__ == "__main__":
     main()
@@ -1,9 +1,39 @@
 #!/usr/bin/env python3
 import argparse
+import glob
+import hashlib
+import os
 import subprocess
 import sys
 import shutil
 
+
+def _project_key(project_root):
+    """Same key as tmux_runner._project_key."""
+    return hashlib.sha1(os.path.realpath(project_root).encode()).hexdigest()[:12]
+
+
+def _stop_idle_pool(project_root):
+    """Kill the project's warm pool once no team session of the project is left."""
+    key = _project_key(project_root)
+    pool_session = f"ucas-pool-{key}"
+    # Session names cannot contain ':', so it safely separates the project tag
+    res = subprocess.run(['tmux', 'list-sessions', '-F', '#{session_name}:#{@ucas_project}'],
+                         capture_output=True, text=True)
+    sessions = dict(line.partition(':')[::2] for line in res.stdout.splitlines()) if res.returncode == 0 else {}
+    if pool_session not in sessions:
+        return
+    # Team sessions are tagged with their project's key by tmux_runner
+    if any(name != pool_session and project == key for name, project in sessions.items()):
+        return
+    subprocess.run(['tmux', 'kill-session', '-t', pool_session], capture_output=True)
+    for path in glob.glob(os.path.join(project_root, ".ucas", "pool", "w-*")):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    print(f"✓ Warm pool '{pool_session}' stopped.")
+
 def main():
     parser = argparse.ArgumentParser(description="UCAS Tmux Stopper")
     parser.add_argument("--cmd", help="Command (unused)")
@@ -35,5 +65,8 @@ def main():
     else:
         print(f"Session '{args.session_name}' not found. Nothing to stop.")
 
+    if args.project_root:
+        _stop_idle_pool(args.project_root)
+
 if __name__ == "__main__":
     main()
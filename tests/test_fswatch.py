@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from ucas import mail
+from ucas.fswatch import DirWatcher
+
+
+def _later(delay, fn):
+    t = threading.Timer(delay, fn)
+    t.start()
+    return t
+
+
+def test_wakes_on_rename_into_directory(tmp_path):
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "inbox").mkdir()
+    src = tmp_path / "tmp" / "m.eml"
+    src.write_text("x")
+
+    with DirWatcher([tmp_path / "inbox"]) as watcher:
+        assert watcher.uses_inotify
+        assert watcher.wait(0.05) is False
+        _later(0.1, lambda: os.rename(src, tmp_path / "inbox" / "m.eml"))
+        start = time.monotonic()
+        assert watcher.wait(5) is True
+        assert time.monotonic() - start < 2
+
+
+def test_poll_only_fallback(tmp_path):
+    with DirWatcher([tmp_path], poll_interval=0.05, poll_only=True) as watcher:
+        assert not watcher.uses_inotify
+        assert watcher.wait(1) is False
+
+
+def test_wait_for_mail_timeout_and_wake(tmp_path):
+    mail_dir = tmp_path / "agent"
+    mail._ensure_mail_dirs(mail_dir)
+    assert mail._wait_for_mail(mail_dir, timeout=0.1) is False
+
+    _later(0.1, lambda: (mail_dir / "inbox" / "1.eml").write_text("Subject: hi\n\nbody\n"))
+    start = time.monotonic()
+    assert mail._wait_for_mail(mail_dir, timeout=5) is True
+    assert time.monotonic() - start < 2
+
+
+def _send_later(project_root, delay=0.2):
+    def send():
+        with patch("ucas.mail._get_project_root", return_value=project_root), \
+                patch("ucas.mail._update_project_list"):
+            mail.send_mail("worker", "hi", "body", sender_override="lead", project_root=project_root)
+    return _later(delay, send)
+
+
+def test_hardlink_delivery_wakes_idle_wait(tmp_path):
+    mail_dir = tmp_path / ".ucas" / "mails" / "worker"
+    mail._ensure_mail_dirs(mail_dir)
+    _send_later(tmp_path)
+    start = time.monotonic()
+    assert mail._wait_for_mail(mail_dir, timeout=5) is True
+    assert time.monotonic() - start < 2
+
+
+def test_hardlink_delivery_wakes_watch(tmp_path):
+    mail_dir = tmp_path / ".ucas" / "mails" / "worker"
+    mail._ensure_mail_dirs(mail_dir)
+    _send_later(tmp_path)
+    start = time.monotonic()
+    found = []
+    msgs = list(mail.watch_messages([("worker", mail_dir)], timeout=3,
+                                    on_batch=lambda batch: found.append(time.monotonic() - start)))
+    assert [m["subject"] for m in msgs] == ["hi"]
+    # Found on the delivery event, not at the timeout
+    assert found and found[0] < 2
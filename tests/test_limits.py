@@ -0,0 +1,82 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from ucas.exceptions import LaunchError
+from ucas import limits
+from ucas.limits import (
+    parse_size, normalize_limits, merge_limits, wrap_command, get_usage, format_usage,
+    setup_cgroup, remove_cgroup
+)
+
+
+class TestLimits(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("512M"), 512 * 1024 ** 2)
+        self.assertEqual(parse_size("2G"), 2 * 1024 ** 3)
+        self.assertEqual(parse_size("1.5GiB"), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_size(4096), 4096)
+        with self.assertRaises(LaunchError):
+            parse_size("lots")
+
+    def test_normalize_rejects_unknown_keys(self):
+        with self.assertRaises(LaunchError):
+            normalize_limits({"gpu": 1})
+        with self.assertRaises(LaunchError):
+            normalize_limits({"ionice": 9})
+
+    def test_member_overrides_run_block(self):
+        merged = merge_limits({"memory": "1G", "nofile": 1024}, {"nofile": 256, "nice": 5})
+        self.assertEqual(merged, {"memory": 1024 ** 3, "nofile": 256, "nice": 5})
+
+    def test_wrap_without_limits_is_identity(self):
+        self.assertEqual(wrap_command("echo hi", {}), "echo hi")
+
+    def test_wrapped_command_applies_rlimits(self):
+        cmd = wrap_command("sh -c 'ulimit -n; ulimit -t'", {"nofile": 64, "cpu_time": 30})
+        out = subprocess.run(cmd, shell=True, capture_output=True, text=True).stdout.split()
+        self.assertEqual(out, ["64", "30"])
+
+    def test_unjoinable_cgroup_falls_back_to_rlimits(self):
+        cmd = wrap_command("sh -c 'ulimit -v'", {"memory": 64 * 1024 ** 2, "cpu": 1.0},
+                           Path("/nonexistent/cgroup"))
+        res = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        self.assertEqual(res.stdout.split(), [str(64 * 1024)])
+        self.assertIn("'cpu' limit not applied", res.stderr)
+
+    def test_cgroups_of_projects_do_not_collide(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "cg"
+            (root / "parent").mkdir(parents=True)
+            (root / "cgroup.controllers").write_text("memory cpu")
+            for project in ("a", "b"):  # The kernel creates cgroup.procs with the directory
+                member = root / "parent" / limits._team_cgroup_name(Path(tmp) / project, "dev") / "lead"
+                member.mkdir(parents=True)
+                (member / "cgroup.procs").touch()
+            with patch.object(limits, "CGROUP_ROOT", root):
+                spec = {"memory": 1024 ** 3, "cgroup_parent": "parent"}
+                a = setup_cgroup("dev", "lead", spec, Path(tmp) / "a")
+                b = setup_cgroup("dev", "lead", spec, Path(tmp) / "b")
+            self.assertIsNotNone(a)
+            self.assertNotEqual(a, b)
+            self.assertEqual((a / "memory.max").read_text(), str(1024 ** 3))
+
+            for f in list(a.iterdir()) + list(a.parent.glob("cgroup.*")):
+                f.unlink()  # Real cgroup dirs are removable with their interface files
+            remove_cgroup(str(a))
+            self.assertFalse(a.parent.exists())
+
+    def test_usage_of_current_process(self):
+        usage = get_usage(os.getpid())
+        self.assertGreater(usage["memory"], 0)
+        self.assertGreater(usage["nofile"], 0)
+        line = format_usage(usage, {"memory": 1024 ** 3, "nofile": 1024})
+        self.assertIn("/1.0G", line)
+        self.assertIn("/1024", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
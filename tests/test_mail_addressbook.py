@@ -0,0 +1,88 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_projects
+
+
+@pytest.fixture
+def book_env(tmp_path, monkeypatch):
+    """Project with two agents; system, user and cache dirs all under tmp_path."""
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("UCAS_HOME", str(tmp_path / "sys"))
+    monkeypatch.delenv("UCAS_AGENT", raising=False)
+    (tmp_path / "home").mkdir()
+    (tmp_path / "sys").mkdir()
+    root = tmp_path / "project"
+    for agent in ("alice", "bob"):
+        mail._ensure_mail_dirs(root / ".ucas" / "mails" / agent)
+    _write_mod(root, "alice", "Writes the code")
+    with patch.object(mail, "ADDRESS_BOOK_CACHE_DIR", tmp_path / "cache"), \
+            patch("ucas.mail._get_project_root", return_value=root):
+        yield root
+
+
+def _write_mod(root, name, description):
+    mod = root / ".ucas" / "mods" / name
+    mod.mkdir(parents=True, exist_ok=True)
+    (mod / "ucas.yaml").write_text(f"description: {description}\n")
+
+
+def _descs(contacts):
+    return {c["address"]: c["desc"] for c in contacts}
+
+
+def test_second_lookup_is_served_from_cache(book_env):
+    first = mail.get_address_book()
+    assert _descs(first)["alice"] == "Writes the code"
+    assert _descs(first)["bob"] == "Local Agent"
+
+    with patch("ucas.resolver.load_config_file", side_effect=AssertionError("config reloaded")), \
+            patch("ucas.resolver.find_entity", side_effect=AssertionError("mods searched")):
+        assert mail.get_address_book() == first
+
+
+def test_cache_follows_mod_agent_and_config_changes(book_env):
+    mail.get_address_book()
+
+    _write_mod(book_env, "bob", "Reviews the code")
+    assert _descs(mail.get_address_book())["bob"] == "Reviews the code"
+
+    mail._ensure_mail_dirs(book_env / ".ucas" / "mails" / "carol")
+    assert "carol" in _descs(mail.get_address_book())
+
+    (book_env / ".ucas" / "ucas.yaml").write_text("mail-addressbook:\n  dave@/elsewhere: Ops\n")
+    contacts = mail.get_address_book()
+    assert _descs(contacts)["dave@/elsewhere"] == "Ops"
+
+    # Rewriting a mod with the same size must still invalidate (mtime differs)
+    mod_yaml = book_env / ".ucas" / "mods" / "alice" / "ucas.yaml"
+    mod_yaml.write_text("description: Writes the docs\n")
+    os.utime(mod_yaml, ns=(1, 1))
+    assert _descs(mail.get_address_book())["alice"] == "Writes the docs"
+
+
+def test_current_agent_is_excluded(book_env, monkeypatch):
+    monkeypatch.setenv("UCAS_AGENT", "alice")
+    assert "alice" not in _descs(mail.get_address_book())
+    monkeypatch.setenv("UCAS_AGENT", "bob")
+    assert "alice" in _descs(mail.get_address_book())
+
+
+def test_include_registered_projects(book_env, tmp_path):
+    other = tmp_path / "other"
+    mail._ensure_mail_dirs(other / ".ucas" / "mails" / "worker")
+    _write_mod(other, "worker", "Remote worker")
+    registry = tmp_path / "home" / "mail-projects.txt"
+    registry.write_text(f"{book_env}\n{other}\n")
+
+    with patch.object(mail, "PROJECT_LIST_FILE", registry), \
+            patch.object(mail_projects, "IGNORED_PREFIXES", ()):
+        assert f"worker@{other}" not in _descs(mail.get_address_book())
+        contacts = mail.get_address_book(include_projects=True)
+
+    worker = next(c for c in contacts if c["address"] == f"worker@{other}")
+    assert worker["desc"] == "Remote worker"
+    assert worker["project"] == str(other)
+    assert not any(c["address"].endswith(f"@{book_env}") for c in contacts)
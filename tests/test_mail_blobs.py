@@ -0,0 +1,106 @@
+import io
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_blobs, mail_index, mail_search
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    for agent in ("lead", "worker", "tester"):
+        mail._ensure_mail_dirs(project_root / ".ucas" / "mails" / agent)
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"), \
+            patch("ucas.mail._get_mail_config", return_value={"blobs": {"threshold": 1024}}), \
+            patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        yield project_root
+
+
+BIG = "diff --git a/x b/x\n" + "+line ünïcode\n" * 500
+
+
+def _store(root):
+    return root / ".ucas" / "mails" / mail_blobs.BLOB_DIR
+
+
+def test_large_body_is_stored_once(mail_env):
+    mail.send_mail("ALL", "Patch", BIG)
+    blobs = list(_store(mail_env).iterdir())
+    assert len(blobs) == 1
+    assert blobs[0].read_bytes() == BIG.encode("utf-8")
+
+    eml = next((mail_env / ".ucas" / "mails" / "worker" / "inbox").glob("*.eml"))
+    assert eml.stat().st_size < 1024
+    msg = mail.get_messages("worker")[0]
+    assert msg["blob"] == blobs[0].name
+    assert msg["body"] == BIG
+    # The sent copy and the other inbox share the same blob
+    assert mail.get_messages("lead", folders=["sent"])[0]["body"] == BIG
+    assert mail.get_messages("tester")[0]["blob"] == blobs[0].name
+
+    # Small bodies stay inline
+    mail.send_mail("worker", "Short", "hi")
+    assert len(list(_store(mail_env).iterdir())) == 1
+    assert mail.get_messages("worker")[0]["blob"] is None
+
+
+def test_read_streams_blob_and_search_finds_it(mail_env, capsys):
+    mail.send_mail("worker", "Patch", BIG)
+    mail_id = mail.get_messages("worker")[0]["id"]
+    assert mail_search.search(mail_env / ".ucas" / "mails" / "worker", "ünïcode")
+
+    out = io.BytesIO()
+    stdout = io.TextIOWrapper(out, encoding="utf-8")
+    with patch.dict(os.environ, {"UCAS_AGENT": "worker"}), patch("sys.stdout", stdout):
+        mail.read_mail(mail_id, json_output=False)
+    stdout.flush()
+    assert BIG.encode("utf-8") in out.getvalue()
+
+    capsys.readouterr()
+    with patch.dict(os.environ, {"UCAS_AGENT": "worker"}):
+        mail.read_mail(mail_id)
+    assert json.loads(capsys.readouterr().out)["body"] == BIG
+
+
+def test_other_project_gets_its_own_copy(mail_env, tmp_path):
+    other = tmp_path / "other"
+    mail._ensure_mail_dirs(other / ".ucas" / "mails" / "bob")
+    mail.send_mail(f"bob@{other}", "Patch", BIG)
+    assert len(list(_store(other).iterdir())) == 1
+    assert mail.get_messages("bob", project_root=other)[0]["body"] == BIG
+
+
+def test_gc_removes_unreferenced_blobs(mail_env, capsys):
+    mail.send_mail("worker", "Keep", BIG)
+    mail.send_mail("worker", "Drop", BIG + "x")
+    mails = mail_env / ".ucas" / "mails"
+    drop = next(m for m in mail.get_messages("worker") if m["subject"] == "Drop")
+    for box in (mails / "worker", mails / "lead"):
+        _, _, path = mail_index.resolve(box, drop["id"])
+        mail._delete_message(box, drop["id"], path)
+    (_store(mail_env) / ".abc.123.tmp").write_text("partial")
+    old = time.time() - 2 * mail_blobs.BLOB_GRACE
+    for blob in _store(mail_env).iterdir():
+        os.utime(blob, (old, old))
+
+    capsys.readouterr()
+    with patch.dict(os.environ, {"UCAS_AGENT": "worker"}):
+        mail.gc_mail(json_output=True)
+    report = json.loads(capsys.readouterr().out)
+    assert report["blob_files"] == 2 and report["blob_bytes"] > len(BIG)
+    keep = mail.get_messages("worker")[0]
+    assert [p.name for p in _store(mail_env).iterdir()] == [keep["blob"]]
+    assert keep["body"] == BIG
+
+
+def test_blob_dir_is_not_a_mailbox(mail_env):
+    mail.send_mail("worker", "Patch", BIG)
+    assert _store(mail_env).is_dir()
+    targets = mail._resolve_recipients("ALL", "lead", mail_env)
+    assert sorted(name for name, _ in targets) == ["tester", "worker"]
+    assert all(not c.get("name", "").startswith(".") for c in mail.get_address_book())
@@ -0,0 +1,150 @@
+import errno
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"):
+        yield project_root
+
+
+def _box(root, name):
+    return root / ".ucas" / "mails" / name
+
+
+def test_broadcast_hardlinks_one_serialized_copy(mail_env, capsys):
+    for name in ("lead", "a", "b", "c"):
+        mail._ensure_mail_dirs(_box(mail_env, name))
+
+    with patch.dict(os.environ, {"UCAS_AGENT": "lead"}), \
+            patch.object(mail.EmailMessage, "as_bytes", autospec=True,
+                         side_effect=mail.EmailMessage.as_bytes) as as_bytes:
+        mail.send_mail("ALL", "Hello", "x" * 100000)
+    assert as_bytes.call_count == 1
+    assert "Mail sent to 3 recipient(s)." in capsys.readouterr().out
+
+    files = [next((_box(mail_env, n) / "inbox").glob("*.eml")) for n in ("a", "b", "c")]
+    files.append(next((_box(mail_env, "lead") / "sent").glob("*.eml")))
+    assert len({f.stat().st_ino for f in files}) == 1
+    assert files[0].stat().st_nlink == 4
+    assert list((_box(mail_env, "lead") / "tmp").iterdir()) == []
+
+
+def test_multi_recipient_to_list(mail_env, tmp_path, capsys):
+    other = tmp_path / "other"
+    with patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        mail.send_mail(f"a, b, a, c@{other}", "Hi", "Body")
+    assert "Mail sent to 3 recipient(s)." in capsys.readouterr().out
+
+    for name in ("a", "b", f"c@{other}"):
+        [msg] = mail.get_messages(name, project_root=mail_env)
+        assert msg["to"] == f"a, b, a, c@{other}"
+
+
+def test_copy_fallback_when_link_fails(mail_env, capsys):
+    def no_link(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    with patch.dict(os.environ, {"UCAS_AGENT": "lead"}), patch("ucas.mail.os.link", no_link):
+        mail.send_mail("a,b", "Copied", "Body")
+    assert "Mail sent to 2 recipient(s)." in capsys.readouterr().out
+
+    a = next((_box(mail_env, "a") / "inbox").glob("*.eml"))
+    b = next((_box(mail_env, "b") / "inbox").glob("*.eml"))
+    assert a.stat().st_ino != b.stat().st_ino
+    assert a.read_bytes() == b.read_bytes()
+
+
+def test_delivery_leaves_no_partial_files(mail_env):
+    with patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        mail.send_mail("a", "Synced", "Body")
+    box = _box(mail_env, "a")
+    assert [p.name for p in (box / "tmp").iterdir()] == []
+    assert list((_box(mail_env, "lead") / "tmp").iterdir()) == []
+
+
+def test_half_written_file_is_not_listed(mail_env):
+    box = _box(mail_env, "a")
+    mail._ensure_mail_dirs(box)
+    partial = box / "inbox" / "legacy-0001.eml"
+    partial.write_bytes(b"Subject: Half\nFrom: some")
+    assert mail.get_messages("a") == []
+
+    partial.write_bytes(b"Subject: Half\nFrom: someone\n\nBody\n")
+    assert [m["subject"] for m in mail.get_messages("a")] == ["Half"]
+
+
+# --- Stress: concurrent senders and readers ---
+
+SENDERS = 24
+PER_SENDER = 8
+LEGACY_FILES = 3
+
+
+def _sender(root, i):
+    import contextlib
+    import io
+    out = io.StringIO()
+    os.environ["UCAS_AGENT"] = f"sender{i}"
+    with contextlib.redirect_stdout(out):
+        for n in range(PER_SENDER):
+            mail.send_mail("worker", f"msg-{i}-{n}", "x" * (n * 5000), project_root=root)
+    return out.getvalue().count("Mail sent to 1 recipient(s).")
+
+
+def _legacy_writer(root):
+    """An old-style writer that writes straight into the inbox, slowly."""
+    import time
+    inbox = _box(root, "worker") / "inbox"
+    for n in range(LEGACY_FILES):
+        with open(inbox / f"legacy-{n}.eml", "wb") as f:
+            f.write(b"Subject: msg-legacy-")
+            f.flush()
+            time.sleep(0.2)
+            f.write(f"{n}\nFrom: old\n\nBody\n".encode())
+    return LEGACY_FILES
+
+
+def _reader(root, stop):
+    bad = []
+    while not stop.is_set():
+        for m in mail.get_messages("worker", folders=["inbox", "read"], project_root=root):
+            if not (m.get("subject") or "").startswith("msg-") or m.get("from") is None:
+                bad.append(dict(m))
+            if m["_folder"] == "inbox":
+                mail.mark_as_read(m["id"], "worker", project_root=root)
+    return bad
+
+
+def test_concurrent_senders_and_readers(mail_env):
+    import multiprocessing
+    ctx = multiprocessing.get_context("fork")
+    mail._ensure_mail_dirs(_box(mail_env, "worker"))
+    stop = ctx.Manager().Event()
+
+    with ctx.Pool(SENDERS + 3) as pool:
+        readers = [pool.apply_async(_reader, (mail_env, stop)) for _ in range(2)]
+        legacy = pool.apply_async(_legacy_writer, (mail_env,))
+        senders = [pool.apply_async(_sender, (mail_env, i)) for i in range(SENDERS)]
+        delivered = sum(s.get(timeout=120) for s in senders) + legacy.get(timeout=120)
+        stop.set()
+        bad = [b for r in readers for b in r.get(timeout=120)]
+
+    assert bad == []
+    box = _box(mail_env, "worker")
+    on_disk = sorted(p.stem for folder in ("inbox", "read") for p in (box / folder).glob("*.eml"))
+    assert delivered == SENDERS * PER_SENDER + LEGACY_FILES
+    assert len(on_disk) == delivered
+    assert list((box / "tmp").iterdir()) == []
+
+    listed = mail.get_messages("worker", folders=["inbox", "read"], project_root=mail_env)
+    assert sorted(m["id"] for m in listed) == on_disk
+    assert all(m["subject"].startswith("msg-") for m in listed)
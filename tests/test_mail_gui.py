@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from ucas import mail, mail_gui, mail_projects
+from ucas.mail_gui import Loader, MailApp, scan_accounts
+
+
+class _FakeTree:
+    """The ttk.Treeview calls the message list uses; index() must not be needed."""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+
+    def get_children(self):
+        return tuple(self.ids)
+
+    def exists(self, iid):
+        return iid in self.ids
+
+    def delete(self, *iids):
+        self.ids = [i for i in self.ids if i not in iids]
+
+    def move(self, iid, parent, index):
+        self.ids.remove(iid)
+        self.ids.insert(index, iid)
+
+    def insert(self, parent, index, iid, values):
+        self.ids.insert(index, iid)
+
+
+def test_scan_accounts_counts_unread_from_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    project = tmp_path / "project"
+    for agent in ("lead", "worker"):
+        mail._ensure_mail_dirs(project / ".ucas" / "mails" / agent)
+    registry = tmp_path / "home" / "mail-projects.txt"
+    registry.parent.mkdir()
+    registry.write_text(f"{project}\n{tmp_path / 'gone'}\n")
+
+    with patch.object(mail, "PROJECT_LIST_FILE", registry), \
+            patch.object(mail_projects, "IGNORED_PREFIXES", ()), \
+            patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        mail.send_mail("worker", "one", "1", project_root=project)
+        mail.send_mail("worker", "two", "2", project_root=project)
+        nodes = scan_accounts()
+
+    labels = {node_id: label for node_id, _, label in nodes}
+    assert labels[f"agent:worker:{project}"].strip() == "worker (2)"
+    assert labels[f"agent:lead:{project}"].strip() == "lead"
+    assert (f"agent:lead:{project}", f"proj:{project}") in {(n, p) for n, p, _ in nodes}
+    # The deleted project is not shown and is compacted out of the registry
+    assert f"proj:{tmp_path / 'gone'}" not in labels
+    assert registry.read_text() == f"{project}\n"
+
+
+def test_loader_drops_superseded_jobs():
+    loader = Loader()
+    release = threading.Event()
+    ran, done = [], []
+
+    def job(name):
+        ran.append(name)
+        if name == "first":
+            release.wait(5)
+        return name
+
+    loader.start()
+    loader.submit("list", job, "first", on_done=done.append)
+    time.sleep(0.1)  # "first" is running
+    loader.submit("list", job, "second", on_done=done.append)
+    loader.submit("list", job, "third", on_done=done.append)
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while not done and time.monotonic() < deadline:
+        time.sleep(0.02)
+        loader.drain()
+    # "second" never ran and the finished "first" was not delivered
+    assert ran == ["first", "third"]
+    assert done == ["third"]
+
+
+def test_fill_reorders_rows_without_index_lookups():
+    app = SimpleNamespace(_view="v", _fill_token=0, mail_tree=_FakeTree("abcdef"),
+                          status_var=SimpleNamespace(set=lambda text: None),
+                          root=SimpleNamespace(after=lambda ms, fn, *args: fn(*args)))
+    app._fill_rows = lambda *args: MailApp._fill_rows(app, *args)
+    rows = [(i, (i,)) for i in "xfbdgca"]  # e removed, x and g new, the rest reordered
+    with patch.object(mail_gui, "ROW_CHUNK", 2):
+        MailApp._apply_rows(app, "v", rows)
+    assert app.mail_tree.ids == list("xfbdgca")
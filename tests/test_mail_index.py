@@ -0,0 +1,285 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_index, mail_segments
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"):
+        yield project_root
+
+
+def _send(subject, sender="agent1", recipient="agent2"):
+    with patch.dict(os.environ, {"UCAS_AGENT": sender}):
+        mail.send_mail(recipient, subject, "Body")
+
+
+def test_send_and_move_update_index(mail_env):
+    _send("First")
+    _send("Second")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    entries, _ = mail_index._replay(box)
+    assert sorted(e["subject"] for e in entries.values()) == ["First", "Second"]
+
+    msg_id = mail.get_messages("agent2")[0]["id"]
+    mail.mark_as_read(msg_id, "agent2")
+    entries, _ = mail_index._replay(box)
+    assert entries[msg_id]["folder"] == "read"
+    assert [m["id"] for m in mail.get_messages("agent2", folders=["read"])] == [msg_id]
+
+    mail.archive_mail(msg_id, "agent2")
+    assert [m["_folder"] for m in mail.get_messages("agent2", folders=["inbox", "read", "archive"])
+            if m["id"] == msg_id] == ["archive"]
+
+    sent, _ = mail_index._replay(mail_env / ".ucas" / "mails" / "agent1")
+    assert {e["folder"] for e in sent.values()} == {"sent"}
+
+
+def test_reconciles_files_changed_behind_its_back(mail_env):
+    _send("Indexed")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    original = next((box / "inbox").glob("*.eml"))
+
+    # Copied in without the index (e.g. by an older UCAS), and one removed by hand
+    shutil.copy(original, box / "inbox" / "manual-0001.eml")
+    original.unlink()
+
+    msgs = mail.get_messages("agent2")
+    assert [m["id"] for m in msgs] == ["manual-0001"]
+    assert msgs[0]["subject"] == "Indexed"
+    assert "body" not in msgs[0]
+
+
+def test_rebuild_and_compaction(mail_env):
+    for i in range(5):
+        _send(f"S{i}")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    for m in mail.get_messages("agent2"):
+        mail.mark_as_read(m["id"], "agent2")
+
+    (box / mail_index.INDEX_FILE).write_text('{"op": "add", "id": "torn"')
+    assert mail_index.rebuild(box) == 5
+    lines = (box / mail_index.INDEX_FILE).read_text().splitlines()
+    assert len(lines) == 5
+    assert len(mail.get_messages("agent2", folders=["read"])) == 5
+
+
+def test_compaction_keeps_ops_appended_meanwhile(mail_env):
+    for i in range(3):
+        _send(f"S{i}")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    first = mail.get_messages("agent2")[-1]
+    reconcile = mail_index._reconcile
+
+    def racing_reconcile(*args):
+        fixes = reconcile(*args)
+        # Another process reads a message after load() replayed the log
+        os.rename(first["_path"], box / "read" / f"{first['id']}.eml")
+        mail_index.record_move(box, first["id"], "read")
+        return fixes
+
+    with patch.object(mail_index, "COMPACT_SLACK", -100), \
+            patch.object(mail_index, "_reconcile", racing_reconcile):
+        mail_index.load(box)
+    lines = (box / mail_index.INDEX_FILE).read_text().splitlines()
+    assert len(lines) == 3  # Compacted
+    # The move survived in the log itself (reconciling would not restore read_at)
+    entry = mail_index._replay(box)[0][first["id"]]
+    assert entry["folder"] == "read" and "read_at" in entry
+
+
+def test_torn_line_is_skipped(tmp_path):
+    box = tmp_path / "box"
+    mail_index.record_add(box, {"id": "a", "folder": "inbox", "timestamp": 1})
+    with open(box / mail_index.INDEX_FILE, "a") as f:
+        f.write('{"op": "move", "id": "a", "fol')
+    entries, _ = mail_index._replay(box)
+    assert entries["a"]["folder"] == "inbox"
+
+
+def test_headers_only_parse_and_lazy_body(mail_env):
+    subject = "Příliš žluťoučký kůň úpěl ďábelské ódy, dlouhý předmět který se zalomí na více řádků"
+    with patch.dict(os.environ, {"UCAS_AGENT": "agent1"}):
+        mail.send_mail("agent2", subject, "Line 1\n" + "x" * 50000)
+    path = next((mail_env / ".ucas" / "mails" / "agent2" / "inbox").glob("*.eml"))
+
+    block = mail_index.read_header_block(path)
+    assert block.endswith(b"\n\n")
+    assert b"xxxx" not in block
+
+    data = mail._parse_eml(path, "inbox", headers_only=True)
+    assert data["subject"] == subject
+    assert "body" not in dict(data)
+    assert data["body"].startswith("Line 1")
+    assert data.get("body") == data.body
+
+    listed = mail.get_messages("agent2")[0]
+    assert listed["subject"] == subject
+    assert listed["body"].startswith("Line 1")
+
+
+def test_resolve_full_and_short_ids(mail_env):
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    for name in ("20260101-000000-aaaa", "20260101-000000-aabb", "20260102-000000-cccc"):
+        mail._ensure_mail_dirs(box)
+        (box / "inbox" / f"{name}.eml").write_text(f"Subject: {name}\n\nbody\n")
+
+    # Unindexed files are picked up by the reconcile-and-retry path
+    assert mail_index.resolve(box, "20260102")[0] == "20260102-000000-cccc"
+    assert mail_index.resolve(box, "20260101-000000-aab")[0] == "20260101-000000-aabb"
+    assert mail_index.resolve(box, "2026010") is not None
+    assert mail_index.resolve(box, "2027") is None
+
+    mail.mark_as_read("20260102", "agent2")
+    hit = mail_index.resolve(box, "20260102-000000-cccc")
+    assert hit[1] == "read" and hit[2].endswith("read/20260102-000000-cccc.eml")
+
+
+def test_read_and_archive_move_without_parsing(mail_env):
+    _send("Move me")
+    msg_id = mail.get_messages("agent2")[0]["id"]
+    with patch("ucas.mail._parse_eml", side_effect=AssertionError("parsed")), \
+            patch("ucas.mail_index.read_headers", side_effect=AssertionError("parsed")):
+        mail.mark_as_read(msg_id[:15], "agent2")
+        mail.archive_mail(msg_id, "agent2")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    assert (box / "archive" / f"{msg_id}.eml").exists()
+    assert mail_index._replay(box)[0][msg_id]["folder"] == "archive"
+
+
+def test_resolve_sees_moves_by_other_processes(mail_env):
+    _send("Elsewhere")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    msg_id = mail.get_messages("agent2")[0]["id"]
+    assert mail_index.resolve(box, msg_id)[1] == "inbox"
+
+    # Moved by hand without touching the index: the stale entry is reconciled
+    (box / "inbox" / f"{msg_id}.eml").rename(box / "archive" / f"{msg_id}.eml")
+    assert mail_index.resolve(box, msg_id)[1] == "archive"
+
+
+def test_ids_are_unique_and_time_ordered():
+    ids = [mail._generate_mail_id() for _ in range(20000)]
+    assert len(set(ids)) == len(ids)
+    assert sorted(ids) == ids
+    assert mail_index._ID_TIME.match(ids[0])
+
+
+def test_listing_sorts_by_id_with_old_ids(mail_env):
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    mail._ensure_mail_dirs(box)
+    names = ["20260101-120000-ffff", "20260101-120000500-0000-000000000000",
+             "20260101-120001-0000", "20260101-120001001-0000-000000000000"]
+    # Written newest first, so mtime order would be the reverse
+    for name in reversed(names):
+        (box / "inbox" / f"{name}.eml").write_text(f"Subject: {name}\n\nbody\n")
+
+    assert [m["id"] for m in mail.get_messages("agent2")] == names[::-1]
+    assert mail.get_message_content("20260101-120000-ff", "agent2")[0]["subject"] == names[0]
+
+
+def test_list_filters_and_paging(mail_env, capsys):
+    for i in range(6):
+        _send(f"Task {i}" if i % 2 else f"Note {i}", sender="lead" if i < 3 else "helper")
+    ids = [m["id"] for m in mail.get_messages("agent2")]  # newest first
+
+    assert [m["id"] for m in mail.get_messages("agent2", limit=2)] == ids[:2]
+    assert [m["id"] for m in mail.get_messages("agent2", limit=2, offset=3)] == ids[3:5]
+    assert [m["id"] for m in mail.get_messages("agent2", since=ids[2])] == ids[:2]
+    assert [m["subject"] for m in mail.get_messages("agent2", sender="HELPER")] == ["Task 5", "Note 4", "Task 3"]
+    assert [m["subject"] for m in mail.get_messages("agent2", subject_contains="task", limit=1)] == ["Task 5"]
+    assert len(mail.get_messages("agent2", since="1h")) == 6
+    assert mail.get_messages("agent2", since="2999-01-01") == []
+
+    capsys.readouterr()
+    with patch.dict(os.environ, {"UCAS_AGENT": "agent2"}):
+        mail.list_mail(jsonl=True, limit=3)
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids[:3]
+    assert all("body" in json.loads(line) for line in lines)
+
+    with patch.dict(os.environ, {"UCAS_AGENT": "agent2"}):
+        mail.list_mail(limit=1)
+    assert "body" in json.loads(capsys.readouterr().out)[0]
+
+
+def test_compact_packs_old_messages_into_segments(mail_env, capsys):
+    for i in range(5):
+        _send(f"Old {i}")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    ids = [m["id"] for m in mail.get_messages("agent2")]
+    for msg_id in ids:
+        mail.mark_as_read(msg_id, "agent2")
+    old = time.time() - 30 * 86400
+    for path in (box / "read").glob("*.eml"):
+        os.utime(path, (old, old))
+
+    with patch.dict(os.environ, {"UCAS_AGENT": "agent2"}):
+        mail.compact_mail(older_than="7d")
+    assert "Packed 5 message(s)" in capsys.readouterr().out
+    assert list((box / "read").glob("*.eml")) == []
+    assert len(list((box / "read" / ".segments").glob("*.seg"))) == 1
+
+    # Listing, short-ID reads and bodies come straight from the segment
+    listed = mail.get_messages("agent2", folders=["read"])
+    assert [m["id"] for m in listed] == ids
+    assert listed[0]["subject"] == "Old 4" and listed[0]["body"] == "Body\n"
+    data, _, folder = mail.get_message_content(ids[2][:20], "agent2")
+    assert folder == "read" and data["subject"] == "Old 2"
+    assert mail_index.rebuild(box) == 5
+
+    # Archiving a packed message writes it out and drops it from the segment
+    mail.archive_mail(ids[0], "agent2")
+    assert (box / "archive" / f"{ids[0]}.eml").read_bytes().startswith(b"Subject: Old 4\n")
+    assert [m["id"] for m in mail.get_messages("agent2", folders=["read"])] == ids[1:]
+    assert [m["id"] for m in mail.get_messages("agent2", folders=["archive"])] == [ids[0]]
+
+
+def test_message_moved_while_packing_is_not_duplicated(mail_env):
+    for i in range(3):
+        _send(f"Old {i}")
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    ids = [m["id"] for m in mail.get_messages("agent2")]
+    for msg_id in ids:
+        mail.mark_as_read(msg_id, "agent2")
+    old = time.time() - 30 * 86400
+    for path in (box / "read").glob("*.eml"):
+        os.utime(path, (old, old))
+
+    append_sidecar = mail_segments._append_sidecar
+
+    def archive_meanwhile(idx_path, records):
+        # Archived after pack read the file, before it unlinks it
+        if records and not (box / "archive" / f"{ids[1]}.eml").exists():
+            mail.archive_mail(ids[1], "agent2")
+        append_sidecar(idx_path, records)
+
+    with patch.object(mail_segments, "_append_sidecar", archive_meanwhile):
+        assert mail_segments.pack(box / "read", time.time()) == 2
+    assert ids[1] not in mail_segments.packed(box / "read")
+    assert sorted(m["id"] for m in mail.get_messages("agent2", folders=["read"])) == sorted(ids[:1] + ids[2:])
+    assert [m["id"] for m in mail.get_messages("agent2", folders=["archive"])] == [ids[1]]
+    mail_index.rebuild(box)
+    assert len(mail.get_messages("agent2", folders=["read", "archive"])) == 3
+
+
+def test_check_auto_compacts_large_folders(mail_env):
+    box = mail_env / ".ucas" / "mails" / "agent2"
+    mail._ensure_mail_dirs(box)
+    for i in range(4):
+        (box / "archive" / f"20250101-000000-000{i}.eml").write_text(f"Subject: {i}\n\nbody\n")
+    policy = {"compaction": {"max_files": 3, "older_than": "0s"}}
+    with patch("ucas.mail._get_mail_config", return_value=policy):
+        mail._auto_compact(box)
+    assert list((box / "archive").glob("*.eml")) == []
+    assert len(mail.get_messages("agent2", folders=["archive"])) == 4
@@ -0,0 +1,166 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail
+from ucas.__main__ import handle_mail
+from ucas.cli import parse_args
+from ucas.exceptions import MailLimitError
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    for agent in ("lead", "worker", "tester"):
+        mail._ensure_mail_dirs(project_root / ".ucas" / "mails" / agent)
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"), \
+            patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        yield project_root
+
+
+def _limits(config):
+    return patch("ucas.mail._get_mail_config", return_value={"limits": config})
+
+
+def _inbox(root, agent):
+    return list((root / ".ucas" / "mails" / agent / "inbox").glob("*.eml"))
+
+
+def test_inbox_quota(mail_env, capsys):
+    with _limits({"inbox_quota": 5, "quotas": {"worker": 2}}):
+        mail.send_mail("worker", "1", "x")
+        mail.send_mail("worker", "2", "x")
+        with pytest.raises(MailLimitError) as exc:
+            mail.send_mail("worker", "3", "x")
+        assert exc.value.exit_code == mail.EXIT_INBOX_FULL
+        assert exc.value.retry_after == mail.QUOTA_RETRY_AFTER
+
+        # A broadcast still reaches the inboxes with room
+        capsys.readouterr()
+        mail.send_mail("ALL", "4", "x")
+    assert len(_inbox(mail_env, "worker")) == 2
+    assert len(_inbox(mail_env, "tester")) == 1
+    assert "Not delivered (inbox full): worker" in capsys.readouterr().err
+
+
+def test_sender_rate_limit(mail_env):
+    with _limits({"rate": {"messages": 2, "per": "60s"}, "rates": {"worker": {"messages": 100}}}):
+        mail.send_mail("worker", "1", "x")
+        mail.send_mail("worker", "2", "x")
+        with pytest.raises(MailLimitError) as exc:
+            mail.send_mail("worker", "3", "x")
+        assert exc.value.exit_code == mail.EXIT_RATE_LIMITED
+        assert 1 <= exc.value.retry_after <= 30
+
+        # The bucket refills over `per`
+        state_file = mail_env / ".ucas" / "mails" / "lead" / mail.RATE_STATE
+        state = json.loads(state_file.read_text())
+        state_file.write_text(json.dumps(dict(state, updated=state["updated"] - 30)))
+        mail.send_mail("worker", "3", "x")
+
+        # Per-sender override, and the human user is never throttled
+        with patch.dict(os.environ, {"UCAS_AGENT": "worker"}):
+            for i in range(5):
+                mail.send_mail("lead", f"w{i}", "x")
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("UCAS_AGENT")
+            for i in range(5):
+                mail.send_mail("worker", f"u{i}", "x")
+    assert len(_inbox(mail_env, "worker")) == 8
+
+
+def test_cli_exit_code_and_retry_hint(mail_env, capsys):
+    with _limits({"rate": {"messages": 1, "per": "1h"}}):
+        handle_mail(parse_args(["mail", "send", "worker", "ok", "--body", "x"]))
+        with pytest.raises(SystemExit) as exc:
+            handle_mail(parse_args(["mail", "send", "worker", "too much", "--body", "x"]))
+    assert exc.value.code == mail.EXIT_RATE_LIMITED
+    assert "Retry after 3600s." in capsys.readouterr().err
+
+
+def test_broadcast_wider_than_burst_is_refused(mail_env, capsys):
+    with _limits({"rate": {"messages": 1, "per": "60s"}}):
+        with pytest.raises(MailLimitError) as exc:
+            mail.send_mail("ALL", "everyone", "x")
+        assert exc.value.retry_after is None
+        assert "exceed the burst" in str(exc.value)
+        # Nothing was charged: a single send still goes through
+        mail.send_mail("worker", "one", "x")
+        with pytest.raises(SystemExit):
+            handle_mail(parse_args(["mail", "send", "ALL", "again", "--body", "x"]))
+    assert "Retry after" not in capsys.readouterr().err
+    assert len(_inbox(mail_env, "tester")) == 0
+
+
+def test_failed_delivery_is_not_charged(mail_env):
+    with _limits({"rate": {"messages": 2, "per": "1h"}}):
+        with patch("ucas.mail._deliver_mail", return_value=False):
+            mail.send_mail("worker", "lost", "x")
+            mail.send_mail("worker", "lost again", "x")
+        mail.send_mail("worker", "1", "x")
+        mail.send_mail("worker", "2", "x")
+        with pytest.raises(MailLimitError):
+            mail.send_mail("worker", "3", "x")
+    assert len(_inbox(mail_env, "worker")) == 2
+
+
+def test_config_is_per_project_and_follows_edits(tmp_path):
+    roots = []
+    for name, threshold in (("a", 10), ("b", 20)):
+        root = tmp_path / name
+        (root / ".ucas").mkdir(parents=True)
+        (root / ".ucas" / "ucas.yaml").write_text(f"mail:\n  blobs:\n    threshold: {threshold}\n")
+        roots.append(root)
+    with patch.dict(mail._mail_configs, clear=True):
+        assert [mail._blob_threshold(root) for root in roots] == [10, 20]
+        config = roots[0] / ".ucas" / "ucas.yaml"
+        config.write_text("mail:\n  blobs:\n    threshold: 30\n")
+        os.utime(config, ns=(1, 1))  # Same second as the first write on coarse filesystems
+        assert mail._blob_threshold(roots[0]) == 30
+
+
+def test_refused_send_leaves_no_blob(mail_env):
+    with patch("ucas.mail._get_mail_config",
+               return_value={"limits": {"inbox_quota": 1}, "blobs": {"threshold": 10}}):
+        mail.send_mail("worker", "1", "x" * 100)
+        with pytest.raises(MailLimitError):
+            mail.send_mail("worker", "2", "y" * 100)
+    assert len(list((mail_env / ".ucas" / "mails" / ".blobs").iterdir())) == 1
+
+def test_priority_orders_listing_and_check(mail_env, capsys):
+    mail.send_mail("worker", "bulk 1", "x", priority="low")
+    mail.send_mail("worker", "normal", "x")
+    mail.send_mail("worker", "fire", "x", priority="urgent")
+    mail.send_mail("worker", "bulk 2", "x", priority="low")
+    mail.send_mail("worker", "soon", "x", priority="high")
+
+    msgs = mail.get_messages("worker")
+    assert [m["subject"] for m in msgs] == ["fire", "soon", "normal", "bulk 2", "bulk 1"]
+    assert msgs[0]["priority"] == "urgent" and msgs[2]["priority"] is None
+
+    capsys.readouterr()
+    with patch.dict(os.environ, {"UCAS_AGENT": "worker"}), pytest.raises(SystemExit):
+        mail.check_mail()
+    out = capsys.readouterr().out
+    assert out.index("fire") < out.index("normal")
+    assert "Priority: urgent" in out
+
+    with pytest.raises(Exception, match="Invalid priority"):
+        mail.send_mail("worker", "x", "x", priority="asap")
+
+
+def test_queue_claims_urgent_first(mail_env):
+    mails = mail_env / ".ucas" / "mails"
+    mail._ensure_queue_dir(mails / "jobs")
+    mail.send_mail("jobs", "bulk", "x", priority="low")
+    mail.send_mail("jobs", "plain", "x")
+    mail.send_mail("jobs", "fire", "x", priority="urgent")
+
+    order = []
+    for _ in range(3):
+        claimed = mail._claim_from_queue("jobs", mails / "worker", mail_env)
+        order.append(mail.get_message_content(claimed, "worker")[0]["subject"])
+    assert order == ["fire", "plain", "bulk"]
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail
+
+
+@pytest.fixture
+def notify_env():
+    config = {"notifications": {"on_new_mail": "notify {subject} {from}"}}
+    with patch.dict(mail._mail_configs, clear=True), \
+            patch("ucas.mail.merge_configs", return_value={"mail": config}) as merge, \
+            patch("ucas.mail.subprocess.Popen") as popen:
+        yield config["notifications"], merge, popen
+
+
+def _msgs(n):
+    return [{"id": f"id{i}", "subject": f"Subject {i}", "from": f"agent{i % 2}", "date_str": ""} for i in range(n)]
+
+
+def test_single_messages_notify_each_without_waiting(notify_env):
+    _, merge, popen = notify_env
+    mail._notify_new_mail(_msgs(2))
+    mail._notify_new_mail(_msgs(1))
+
+    assert merge.call_count == 1  # Config files unchanged: merged once
+    assert [c.args[0] for c in popen.call_args_list] == [
+        "notify 'Subject 0' agent0", "notify 'Subject 1' agent1", "notify 'Subject 0' agent0"]
+    assert all(c.kwargs["start_new_session"] for c in popen.call_args_list)
+
+
+def test_burst_is_coalesced_into_one_summary(notify_env):
+    config, _, popen = notify_env
+    mail._notify_new_mail(_msgs(5))
+    assert [c.args[0] for c in popen.call_args_list] == ["notify '5 new messages' 'agent0, agent1'"]
+
+    popen.reset_mock()
+    config["on_new_mail_summary"] = "summary {count}: {subjects}"
+    config["summary_threshold"] = 2
+    mail._notify_new_mail(_msgs(2))
+    assert [c.args[0] for c in popen.call_args_list] == ["summary 2: 'Subject 0; Subject 1'"]
+
+
+def test_no_template_no_process(notify_env):
+    config, _, popen = notify_env
+    config.clear()
+    mail._notify_new_mail(_msgs(4))
+    popen.assert_not_called()
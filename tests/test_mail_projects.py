@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_projects
+
+
+@pytest.fixture(autouse=True)
+def _allow_tmp_projects():
+    # pytest's tmp_path lives under /tmp, which the registry ignores
+    with patch.object(mail_projects, "IGNORED_PREFIXES", ("/scratch/",)):
+        yield
+
+
+def _register_many(registry, roots):
+    for root in roots:
+        mail_projects.register(root, registry)
+
+
+def _projects(tmp_path, count):
+    roots = []
+    for i in range(count):
+        root = tmp_path / "work" / f"proj{i}"
+        root.mkdir(parents=True)
+        roots.append(str(root))
+    return roots
+
+
+def test_register_appends_once_and_uses_cache(tmp_path):
+    registry = tmp_path / "home" / "mail-projects.txt"
+    root = _projects(tmp_path, 1)[0]
+
+    assert mail_projects.register(root, registry) is True
+    with patch("builtins.open", side_effect=AssertionError("registry re-read")), \
+            patch("ucas.mail_projects.os.open", side_effect=AssertionError("registry rewritten")):
+        assert mail_projects.register(root, registry) is False
+    assert registry.read_text() == f"{root}\n"
+
+
+def test_register_sees_appends_from_other_processes(tmp_path):
+    registry = tmp_path / "mail-projects.txt"
+    first, second = _projects(tmp_path, 2)
+    mail_projects.register(first, registry)
+    with open(registry, "a") as f:
+        f.write(f"{second}\n")
+    assert mail_projects.register(second, registry) is False
+    assert mail_projects.list_projects(registry) == [first, second]
+
+
+def test_concurrent_senders_lose_no_registrations(tmp_path):
+    registry = str(tmp_path / "mail-projects.txt")
+    roots = _projects(tmp_path, 40)
+    ctx = multiprocessing.get_context("fork")
+    # Every worker registers every project, in a different order
+    workers = [ctx.Process(target=_register_many, args=(registry, roots[i:] + roots[:i])) for i in range(8)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+        assert w.exitcode == 0
+
+    lines = open(registry).read().splitlines()
+    assert sorted(lines) == sorted(roots)
+
+
+def test_compact_dedupes_and_prunes(tmp_path):
+    registry = tmp_path / "mail-projects.txt"
+    live, dead = _projects(tmp_path, 2)
+    os.rmdir(dead)
+    registry.write_text(f"{live}\n{dead}\n{live}\n/scratch/x\n")
+
+    assert mail_projects.list_projects(registry, existing_only=True) == [live]
+    assert mail_projects.compact(registry) == (1, 3)
+    assert registry.read_text() == f"{live}\n"
+    assert mail_projects.compact(registry) == (1, 0)
+
+
+def test_tmp_projects_are_not_registered(tmp_path):
+    registry = tmp_path / "mail-projects.txt"
+    assert mail_projects.register("/scratch/some-project", registry) is False
+    assert not registry.exists()
+
+
+def test_projects_command(tmp_path, capsys):
+    registry = tmp_path / "mail-projects.txt"
+    live, dead = _projects(tmp_path, 2)
+    os.rmdir(dead)
+    registry.write_text(f"{live}\n{dead}\n")
+    with patch.object(mail, "PROJECT_LIST_FILE", registry):
+        mail.projects_mail()
+        assert capsys.readouterr().out.split() == [live, dead]
+        mail.projects_mail(compact=True)
+        assert capsys.readouterr().out.splitlines() == ["Removed 1 stale entry, 1 project(s) registered.", live]
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_index, mail_segments
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"), \
+            patch.dict(os.environ, {"UCAS_AGENT": "worker"}):
+        yield project_root
+
+
+def _retention(config):
+    return patch("ucas.mail._get_mail_config", return_value={"retention": config})
+
+
+def _fill(mail_env, count, days_old=0):
+    """Deliver `count` messages to worker, `days_old` days in the past (index rebuilt)."""
+    with patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        for i in range(count):
+            mail.send_mail("worker", f"Msg {i}", "x" * 100)
+    box = mail_env / ".ucas" / "mails" / "worker"
+    if days_old:
+        old = time.time() - days_old * 86400
+        for f in (box / "inbox").glob("*.eml"):
+            os.utime(f, (old, old))
+        mail_index.rebuild(box)
+    return box
+
+
+def _ids(box, folder):
+    return sorted(p.stem for p in (box / folder).glob("*.eml"))
+
+
+def test_max_count_archives_oldest(mail_env):
+    box = _fill(mail_env, 5)
+    ids = _ids(box, "inbox")
+    with _retention({"inbox": {"max_count": 2}}):
+        report = mail.apply_retention(box, mail._retention_rules())
+    assert report == {"inbox": {"archived": 3, "deleted": 0, "bytes": 0}}
+    assert _ids(box, "inbox") == ids[3:]
+    assert _ids(box, "archive") == ids[:3]
+    assert mail_index.counts(box) == {"inbox": 2, "archive": 3}
+
+
+def test_max_age_delete_respects_budget(mail_env):
+    box = _fill(mail_env, 4, days_old=10)
+    _fill(mail_env, 1)
+    with _retention({"inbox": {"max_age": "7d", "action": "delete"}}):
+        rules = mail._retention_rules()
+        first = mail.apply_retention(box, rules, budget=3)
+        second = mail.apply_retention(box, rules, budget=3)
+    assert first["inbox"]["deleted"] == 3 and first["inbox"]["bytes"] > 300
+    assert second["inbox"]["deleted"] == 1
+    assert len(_ids(box, "inbox")) == 1
+    assert mail_index.counts(box) == {"inbox": 1}
+
+
+def test_enforce_retention_is_throttled(mail_env):
+    box = _fill(mail_env, 3)
+    with _retention({"inbox": {"max_count": 1}}):
+        mail.enforce_retention()
+        assert len(_ids(box, "inbox")) == 1
+        _fill(mail_env, 2)
+        mail.enforce_retention()  # Within RETENTION_INTERVAL: no work
+        assert len(_ids(box, "inbox")) == 3
+        os.utime(box / mail.RETENTION_STAMP, (0, 0))
+        mail.enforce_retention()
+        assert len(_ids(box, "inbox")) == 1
+
+
+def test_invalid_rule_is_rejected(mail_env):
+    with _retention({"archive": {"max_age": "1d", "action": "archive"}}):
+        with pytest.raises(ValueError):
+            mail._retention_rules()
+    with _retention({"read": {"max_age": "soon"}}):
+        with pytest.raises(ValueError, match="max_age for read"):
+            mail._retention_rules()
+
+    with _retention({"inbox": {"max_count": "lots"}}):
+        with pytest.raises(ValueError, match="max_count for inbox"):
+            mail._retention_rules()
+    with _retention({"inbx": {"max_count": 1}}):
+        with pytest.raises(ValueError, match="Unknown retention folder: inbx"):
+            mail._retention_rules()
+
+
+def test_invalid_config_is_reported_not_ignored(mail_env, capsys):
+    box = _fill(mail_env, 2)
+    with _retention({"inbox": {"max_age": "soon"}}):
+        mail.enforce_retention()
+        assert "mail.retention ignored" in capsys.readouterr().err
+        with pytest.raises(SystemExit) as exc:
+            mail.gc_mail()
+    assert exc.value.code == 1
+    assert "Invalid retention max_age for inbox" in capsys.readouterr().err
+    assert len(_ids(box, "inbox")) == 2
+
+
+def test_config_is_read_once_per_interval(mail_env, capsys):
+    box = _fill(mail_env, 2)
+    for retention in ({}, {"inbox": {"max_age": "soon"}}):
+        (box / mail.RETENTION_STAMP).unlink(missing_ok=True)
+        with _retention(retention), patch.object(mail, "_retention_rules", wraps=mail._retention_rules) as rules:
+            mail.enforce_retention()
+            mail.enforce_retention()
+        assert rules.call_count == 1
+        assert (box / mail.RETENTION_STAMP).exists()
+    assert capsys.readouterr().err.count("mail.retention ignored") == 1
+
+
+def test_gc_reclaims_packed_and_stale_files(mail_env, capsys):
+    box = _fill(mail_env, 3)
+    for msg in mail.get_messages("worker"):
+        mail.archive_mail(msg["id"])
+    old = time.time() - 30 * 86400
+    for f in (box / "archive").glob("*.eml"):
+        os.utime(f, (old, old))
+    mail_index.rebuild(box)
+    mail.compact_mailbox(box, ["archive"], "7d")
+    assert mail_segments.packed(box / "archive")
+    stale = box / "tmp" / "crashed.eml.123"
+    stale.write_text("partial")
+    os.utime(stale, (old, old))
+
+    capsys.readouterr()
+    with _retention({"archive": {"max_age": "14d"}}):
+        mail.gc_mail(dry_run=True, json_output=True)
+        dry = json.loads(capsys.readouterr().out)
+        assert dry["folders"]["archive"]["deleted"] == 3 and stale.exists()
+
+        mail.gc_mail(json_output=True)
+        report = json.loads(capsys.readouterr().out)
+    assert report["folders"]["archive"]["deleted"] == 3
+    assert report["tmp_files"] == 1
+    assert report["segment_bytes"] > 0
+    assert not stale.exists()
+    assert not list((box / "archive" / ".segments").glob("*.seg"))
+    assert mail.get_messages("worker", folders=["archive"]) == []
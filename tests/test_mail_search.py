@@ -0,0 +1,77 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_index, mail_search
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"):
+        yield project_root
+
+
+def _send(subject, body, sender="lead", recipient="worker"):
+    with patch.dict(os.environ, {"UCAS_AGENT": sender}):
+        mail.send_mail(recipient, subject, body)
+
+
+def _search(box, query, **kwargs):
+    return mail_search.search(box, query, **kwargs)
+
+
+def test_search_ranks_and_filters(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("API spec v2", "The new endpoint spec is attached.")
+    _send("Lunch", "Anyone for lunch? Not about the spec.", sender="helper")
+    _send("Status", "Build is green.")
+
+    hits = _search(box, "spec")
+    assert [h["subject"] for h in hits] == ["API spec v2", "Lunch"]
+    assert "[spec]" in hits[0]["snippet"]
+    assert [h["subject"] for h in _search(box, "subject:spec")] == ["API spec v2"]
+    assert [h["subject"] for h in _search(box, "spec from:helper")] == ["Lunch"]
+    assert [h["subject"] for h in _search(box, "spec", sender="lead")] == ["API spec v2"]
+    assert [h["subject"] for h in _search(box, "endpo*")] == ["API spec v2"]
+    # Not valid FTS5 syntax: searched as plain words
+    assert [h["subject"] for h in _search(box, 'green.  "')] == ["Status"]
+
+
+def test_search_follows_deliveries_and_moves(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("First", "alpha")
+    assert [h["folder"] for h in _search(box, "alpha")] == ["inbox"]
+
+    _send("Second", "alpha beta")
+    msg_id = mail.get_messages("worker")[-1]["id"]
+    mail.archive_mail(msg_id, "worker")
+    hits = {h["subject"]: h["folder"] for h in _search(box, "alpha")}
+    assert hits == {"First": "archive", "Second": "inbox"}
+    assert [h["subject"] for h in _search(box, "alpha", folders=["inbox"])] == ["Second"]
+
+    # Removed behind the index's back, then the log is compacted: diffed, not replayed
+    (box / "inbox" / f"{mail.get_messages('worker')[0]['id']}.eml").unlink()
+    mail_index.rebuild(box)
+    assert [h["subject"] for h in _search(box, "alpha")] == ["First"]
+
+
+def test_log_rewrite_forces_a_diff(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("First", "alpha")
+    _search(box, "alpha")
+    mail_index.compact(box)
+    conn = mail_search._connect(box)
+    try:
+        assert mail_search._get_meta(conn, "log_inode") is None
+    finally:
+        conn.close()
+
+    # The next search diffs against the index instead of trusting inode and offset
+    with patch.object(mail_search, "_full_sync", wraps=mail_search._full_sync) as full:
+        _send("Second", "alpha")
+        assert sorted(h["subject"] for h in _search(box, "alpha")) == ["First", "Second"]
+    assert full.call_count == 1
@@ -0,0 +1,121 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_index, mail_stats
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    for agent in ("lead", "worker", "tester"):
+        mail._ensure_mail_dirs(project_root / ".ucas" / "mails" / agent)
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"), \
+            patch.dict(os.environ, {"UCAS_AGENT": "lead"}):
+        yield project_root
+
+
+def _send(sender, target, count):
+    with patch.dict(os.environ, {"UCAS_AGENT": sender}):
+        for i in range(count):
+            mail.send_mail(target, f"{sender} {i}", "x")
+
+
+def test_summary_backlog_latency_and_senders(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("lead", "worker", 3)
+    _send("tester", "worker", 1)
+    for msg in mail.get_messages("worker")[:2]:
+        mail.archive_mail(msg["id"], agent_name="worker")
+
+    report = mail_stats.summary(box)
+    assert report["backlog"]["inbox"] == 2 and report["backlog"]["archive"] == 2
+    assert report["latency"]["count"] == 2
+    assert 0 <= report["latency"]["p50"] <= report["latency"]["max"] < 60
+    assert report["oldest_unread_age"] is not None
+    top = report["top_senders"][0]
+    assert top["from"].startswith("lead@") and top["count"] == 3
+    assert report["per_hour"]["received"] == round(4 / 24, 2)
+    assert mail_stats.summary(mail_env / ".ucas" / "mails" / "lead")["per_hour"]["sent"] == round(3 / 24, 2)
+
+
+def test_update_is_incremental(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("lead", "worker", 2)
+    mail_stats.update(box)
+    with patch.object(mail_stats, "_apply", wraps=mail_stats._apply) as apply:
+        mail_stats.update(box)  # Nothing new in the log
+        assert apply.call_count == 0
+        _send("lead", "worker", 1)
+        state = mail_stats.update(box)
+    assert len(apply.call_args[0][1]) == 1
+    assert len(state["unread"]) == 3
+
+
+def test_reconciled_messages_are_not_counted_twice(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("lead", "worker", 3)
+    ids = [m["id"] for m in mail.get_messages("worker")]
+    mail.archive_mail(ids[0], agent_name="worker")
+    mail_stats.update(box)
+
+    # Moved behind the index's back: the next listing reconciles them back in
+    os.rename(box / "archive" / f"{ids[0]}.eml", box / "read" / f"{ids[0]}.eml")
+    os.rename(box / "inbox" / f"{ids[1]}.eml", box / "read" / f"{ids[1]}.eml")
+    mail_index.load(box)
+
+    state = mail_stats.update(box)
+    assert sum(c.get("received", 0) for c in state["hours"].values()) == 3
+    assert sum(c.get("read", 0) for c in state["hours"].values()) == 2
+    assert len(state["latency"]) == 2
+    assert list(state["senders"].values()) == [3]
+    assert list(state["unread"]) == [ids[2]]
+
+
+def test_read_history_survives_compaction(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("lead", "worker", 2)
+    msg = mail.get_messages("worker")[0]
+    mail.archive_mail(msg["id"], agent_name="worker")
+    before = mail_stats.update(box)
+
+    mail_index.compact(box)
+    after = mail_stats.update(box)
+    assert after["latency"] == before["latency"]
+    assert after["unread"] == before["unread"]
+    assert mail_index.load(box)[msg["id"]]["read_at"] >= msg["timestamp"]
+
+
+def test_totals_of_deleted_messages_survive_compaction(mail_env):
+    box = mail_env / ".ucas" / "mails" / "worker"
+    _send("lead", "worker", 3)
+    mail_stats.update(box)
+    for msg in mail.get_messages("worker"):
+        mail.archive_mail(msg["id"], agent_name="worker")
+    _send("tester", "worker", 1)  # Not yet counted when the log is rewritten
+    for msg in mail.get_messages("worker", folders=["archive"]):
+        mail._delete_message(box, msg["id"], msg["_path"])
+
+    mail_index.compact(box)
+    mail_index.rebuild(box)
+    report = mail_stats.summary(box)
+    assert report["backlog"]["inbox"] == 1 and report["backlog"]["archive"] == 0
+    assert report["latency"]["count"] == 3
+    assert report["per_hour"]["received"] == round(4 / 24, 2)
+    assert {s["count"] for s in report["top_senders"]} == {3, 1}
+
+def test_cli_stats_all(mail_env, capsys):
+    _send("lead", "worker", 2)
+    capsys.readouterr()
+    mail.stats_mail(all_agents=True, json_output=True)
+    reports = {r["agent"]: r for r in json.loads(capsys.readouterr().out)}
+    assert set(reports) == {"lead", "worker", "tester"}
+    assert reports["worker"]["backlog"]["inbox"] == 2
+
+    mail.stats_mail("worker")
+    out = capsys.readouterr().out
+    assert "Backlog: inbox 2" in out and "Top senders: lead@" in out
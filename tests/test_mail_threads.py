@@ -0,0 +1,75 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail, mail_index, mail_threads
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"):
+        yield project_root
+
+
+def _as(agent, fn, *args, **kwargs):
+    with patch.dict(os.environ, {"UCAS_AGENT": agent}):
+        return fn(*args, **kwargs)
+
+
+def _newest(agent):
+    return mail.get_messages(agent, folders=["inbox", "read", "sent", "archive"])[0]["id"]
+
+
+def _conversation():
+    _as("lead", mail.send_mail, "worker", "Spec", "Please review")
+    root = _newest("worker")
+    _as("worker", mail.send_mail, None, None, "Looks good", reply_id=root[:20])
+    reply = _newest("lead")
+    _as("lead", mail.send_mail, None, None, "Thanks", reply_id=reply)
+    _as("lead", mail.send_mail, "worker", "Unrelated", "Other topic")
+    return root, reply
+
+
+def test_thread_tree_from_both_sides(mail_env, capsys):
+    root, reply = _conversation()
+    worker_box = mail_env / ".ucas" / "mails" / "worker"
+
+    entry = mail_index.read_entry(worker_box / "sent" / f"{reply}.eml", "sent")
+    assert entry["in_reply_to"] == root and entry["thread"] == root
+
+    thread = mail_threads.get_thread(worker_box, entry)
+    assert [(m["subject"], m["depth"]) for m in thread] == [("Spec", 0), ("Re: Spec", 1), ("Re: Spec", 2)]
+    assert [m["folder"] for m in thread] == ["inbox", "sent", "inbox"]
+
+    capsys.readouterr()
+    _as("lead", mail.thread_mail, root[:20])
+    assert [m["subject"] for m in json.loads(capsys.readouterr().out)] == ["Spec", "Re: Spec", "Re: Spec"]
+
+
+def test_thread_is_resolved_without_a_mailbox_scan(mail_env):
+    root, _ = _conversation()
+    box = mail_env / ".ucas" / "mails" / "worker"
+    entry = mail_index.read_entry(box / "inbox" / f"{root}.eml", "inbox")
+    with patch("ucas.mail_index._replay", side_effect=AssertionError("scanned")), \
+            patch("ucas.mail_index.load", side_effect=AssertionError("scanned")):
+        assert len(mail_threads.get_thread(box, entry)) == 3
+
+
+def test_list_threads_and_reindex(mail_env, capsys):
+    root, _ = _conversation()
+    capsys.readouterr()
+    _as("worker", mail.list_mail, show_all=True, threads=True)
+    summaries = json.loads(capsys.readouterr().out)
+    assert [(s["subject"], s["count"], s["unread"]) for s in summaries] == [("Unrelated", 1, 1), ("Spec", 2, 2)]
+
+    box = mail_env / ".ucas" / "mails" / "worker"
+    for f in (box / mail_threads.THREAD_DIR).iterdir():
+        f.unlink()
+    _as("worker", mail.reindex_mail)
+    entry = mail_index.read_entry(box / "inbox" / f"{root}.eml", "inbox")
+    assert len(mail_threads.get_thread(box, entry)) == 3
@@ -0,0 +1,61 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from ucas import mail
+
+
+@pytest.fixture
+def mail_env(tmp_path):
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    with patch("ucas.mail._get_project_root", return_value=project_root), \
+            patch("ucas.mail._update_project_list"):
+        yield project_root
+
+
+def _send(subject, recipient, sender="lead"):
+    with patch.dict(os.environ, {"UCAS_AGENT": sender}):
+        mail.send_mail(recipient, subject, "Body")
+
+
+def test_watch_emits_new_mail_from_several_mailboxes(mail_env):
+    _send("Old", "worker")
+    targets = mail._watch_targets(["worker", "reviewer"])
+    assert [name for name, _ in targets] == ["worker", "reviewer"]
+
+    threading.Timer(0.1, lambda: (_send("New 1", "worker"), _send("New 2", "reviewer"))).start()
+    got = list(mail.watch_messages(targets, timeout=1))
+
+    assert [(m["agent"], m["subject"]) for m in got] == [("worker", "New 1"), ("reviewer", "New 2")]
+    assert got[0]["body"] == "Body\n"
+
+
+def test_watch_since_and_mark_read(mail_env):
+    _send("Backlog", "worker")
+    targets = mail._watch_targets(["worker"])
+
+    got = list(mail.watch_messages(targets, folders=["inbox", "read"], since=0, mark_read=True, timeout=0.3))
+
+    # Emitted once from the inbox; the move to read is not reported again
+    assert [(m["subject"], m["_folder"]) for m in got] == [("Backlog", "inbox")]
+    assert mail.get_messages("worker") == []
+    assert [m["subject"] for m in mail.get_messages("worker", folders=["read"])] == ["Backlog"]
+
+
+def test_watch_project_targets_skip_queues(mail_env, tmp_path):
+    mails = mail_env / ".ucas" / "mails"
+    mail._ensure_mail_dirs(mails / "alpha")
+    mail._ensure_queue_dir(mails / "work")
+
+    targets = mail._watch_targets(projects=[str(mail_env)])
+    assert [name for name, _ in targets] == [f"alpha@{mail_env}"]
+
+
+def test_parse_since():
+    assert mail._parse_since("1700000000") == 1700000000.0
+    assert abs(mail._parse_since("10m") - (mail.time.time() - 600)) < 5
+    with pytest.raises(ValueError):
+        mail._parse_since("yesterday")
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ucas import mail
+from ucas.exceptions import LaunchError
+from ucas.launcher import HookRunner, get_context_export_str
+from ucas.team import _apply_team, _expand_replicas
+
+
+class TestReplicas(unittest.TestCase):
+    def test_expand_replicas(self):
+        members = {"lead": "generic", "worker": {"mods": ["generic"], "replicas": 3}}
+        expanded, groups = _expand_replicas(members)
+        self.assertEqual(list(expanded), ["lead", "worker-1", "worker-2", "worker-3"])
+        self.assertEqual(expanded["worker-2"], {"mods": ["generic"]})
+        self.assertEqual(groups, {"worker-1": "worker", "worker-2": "worker", "worker-3": "worker"})
+
+    def test_scale_override_wins(self):
+        members = {"worker": {"mods": ["generic"], "replicas": 3}, "solo": ["generic", "mod-a"]}
+        expanded, _ = _expand_replicas(members, {"worker": 1, "solo": 2})
+        self.assertEqual(list(expanded), ["worker-1", "solo-1", "solo-2"])
+        self.assertEqual(expanded["solo-1"], {"mods": ["generic", "mod-a"]})
+
+    def test_invalid_replicas(self):
+        with self.assertRaises(LaunchError):
+            _expand_replicas({"worker": {"mods": ["generic"], "replicas": "many"}})
+
+    def test_apply_selects_replicas_by_recorded_group(self):
+        # worker scaled from 2 to 1; worker-9 is an ordinary member with a similar name
+        members = {"worker-1": {"mods": ["generic"]}, "worker-9": "generic"}
+        recorded = {name: {"plan_hash": "h", "group": group}
+                    for name, group in (("worker-1", "worker"), ("worker-2", "worker"), ("worker-9", None))}
+        team_state = {"team": "dev", "members": recorded}
+        with mock.patch("ucas.team._resolve_team",
+                        return_value=({}, {}, "dev", members, {"worker-1": "worker"})), \
+                mock.patch("ucas.team._init_mails"), \
+                mock.patch("ucas.team._launch_member", return_value="h") as launch, \
+                mock.patch("ucas.team.state.is_member_alive", return_value=True), \
+                mock.patch("ucas.team._stop_member") as stop:
+            _apply_team(Path("/tmp"), team_state, only=["worker"])
+        self.assertEqual([c.args[2] for c in stop.call_args_list], ["worker-2"])
+        self.assertEqual([c.args[5] for c in launch.call_args_list], ["worker-1"])
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.mails = self.root / ".ucas" / "mails"
+        mail._ensure_queue_dir(self.mails / "worker")
+        for name in ("worker-1", "worker-2", "lead"):
+            mail._ensure_mail_dirs(self.mails / name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queue_is_not_inherited_by_other_members(self):
+        env = dict(os.environ, UCAS_QUEUE="worker")
+        for context, expected in (({"UCAS_AGENT": "lead"}, ""), ({"UCAS_QUEUE": "worker"}, "worker")):
+            script = f"{get_context_export_str(context)} && echo \"${{UCAS_QUEUE-}}\""
+            out = subprocess.run(script, shell=True, env=env, capture_output=True, text=True).stdout
+            self.assertEqual(out.strip(), expected)
+        with mock.patch.dict(os.environ, {"UCAS_QUEUE": "worker"}):
+            self.assertNotIn("UCAS_QUEUE", HookRunner({"UCAS_AGENT": "lead"}).env)
+
+    def test_each_message_claimed_once(self):
+        with mock.patch.dict(os.environ, {"UCAS_AGENT": "lead"}), \
+                mock.patch("ucas.mail._update_project_list"):
+            for i in range(3):
+                mail.send_mail("worker", f"job{i}", "do it", project_root=self.root)
+
+        claimed = [mail._claim_from_queue("worker", self.mails / w, self.root)
+                   for w in ("worker-1", "worker-2", "worker-1", "worker-2")]
+        self.assertIsNone(claimed[-1])
+        self.assertEqual(len(set(claimed[:3])), 3)
+        self.assertEqual(list((self.mails / "worker" / "inbox").glob("*.eml")), [])
+        self.assertEqual(len(list((self.mails / "worker-1" / "inbox").glob("*.eml"))), 2)
+
+    def test_broadcast_skips_queue(self):
+        with mock.patch.dict(os.environ, {"UCAS_AGENT": "lead"}), \
+                mock.patch("ucas.mail._update_project_list"):
+            mail.send_mail("ALL", "hello", "everyone", project_root=self.root)
+        self.assertEqual(list((self.mails / "worker" / "inbox").glob("*.eml")), [])
+        self.assertEqual(len(list((self.mails / "worker-2" / "inbox").glob("*.eml"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ucas import project, state, team
+
+
+class TestState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / ".ucas").mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _record(self, member, pid=None, team="dev"):
+        pid_file = state.get_pid_file(self.root, team, member)
+        pid_file.parent.mkdir(parents=True, exist_ok=True)
+        if pid:
+            pid_file.write_text(str(pid))
+        entry = {"agent": member, "window": member, "pid_file": str(pid_file), "plan_hash": "x"}
+        state.record_member(self.root, team, member, entry, session="proj-dev", runner={"script": "r.py"})
+
+    def test_record_and_load(self):
+        self.assertFalse(state.has_state(self.root))
+        self._record("a", os.getpid())
+        self._record("b")
+        data = state.load_state(self.root, "dev")
+        self.assertEqual(data["session"], "proj-dev")
+        self.assertEqual(sorted(data["members"]), ["a", "b"])
+        self.assertEqual(state.member_pid(data["members"]["a"]), os.getpid())
+        self.assertIsNone(state.member_pid(data["members"]["b"]))
+
+        state.remove_members(self.root, "dev", ["b"])
+        self.assertEqual(list(state.load_state(self.root, "dev")["members"]), ["a"])
+
+    def test_running_teams_uses_pid_liveness(self):
+        dead = subprocess.Popen(["true"])
+        dead.wait()
+        self._record("gone", dead.pid, team="old")
+        self.assertEqual(state.running_teams(self.root), [])
+
+        self._record("a", os.getpid())
+        self.assertEqual(state.running_teams(self.root), ["dev"])
+
+        state.clear_team(self.root, "dev")
+        self.assertIsNone(state.load_state(self.root, "dev"))
+        self.assertEqual(state.running_teams(self.root), [])
+
+    def test_plan_hash_ignores_volatile_keys(self):
+        ctx1 = {"UCAS_AGENT": "a", "UCAS_SESSION_ID": "111", "UCAS_TEAM_INDEX": "0"}
+        ctx2 = {"UCAS_AGENT": "a", "UCAS_SESSION_ID": "222", "UCAS_TEAM_INDEX": "3"}
+        h1 = state.launch_plan_hash(ctx1, "claude --session-id 111", {}, {"script": "r.py"})
+        h2 = state.launch_plan_hash(ctx2, "claude --session-id 222", {}, {"script": "r.py"})
+        self.assertEqual(h1, h2)
+        h3 = state.launch_plan_hash(ctx2, "claude --model x --session-id 222", {}, {"script": "r.py"})
+        self.assertNotEqual(h1, h3)
+        h4 = state.launch_plan_hash(ctx2, "claude --session-id 222", {}, {"script": "r.py"}, prompt="new")
+        self.assertNotEqual(h1, h4)
+
+    def test_update_team_keeps_members(self):
+        self._record("a", os.getpid())
+        state.update_team(self.root, "dev", team_arg="dev-team", mods=["mod-a"])
+        data = state.load_state(self.root, "dev")
+        self.assertEqual(data["mods"], ["mod-a"])
+        self.assertEqual(list(data["members"]), ["a"])
+
+    def test_kill_member(self):
+        proc = subprocess.Popen(["sleep", "30"], start_new_session=True)
+        entry = {"pid": proc.pid}
+        self.assertTrue(state.is_member_alive(entry))
+        self.assertTrue(state.kill_member(entry))
+        proc.wait(timeout=5)
+        self.assertFalse(state.is_member_alive(entry))
+        self.assertFalse(state.kill_member(entry))
+
+    def test_stop_member_escalates_to_sigkill(self):
+        proc = subprocess.Popen(["sh", "-c", "trap '' TERM; sleep 30"], start_new_session=True)
+        entry = {"pid": proc.pid}
+        self.assertTrue(state.stop_member(entry, timeout=0.2))
+        proc.wait(timeout=5)
+        self.assertFalse(state.is_member_alive(entry))
+
+    def test_reused_pid_is_stale(self):
+        proc = subprocess.Popen(["sleep", "30"], start_new_session=True)
+        try:
+            # Pid file written long before this process started: the pid was reused
+            self._record("old", proc.pid)
+            pid_file = state.get_pid_file(self.root, "dev", "old")
+            os.utime(pid_file, (0, 0))
+            entry = state.load_state(self.root, "dev")["members"]["old"]
+            self.assertIsNone(state.member_pid(entry))
+            self.assertFalse(state.is_member_alive(entry))
+            self.assertFalse(state.stop_member(entry, timeout=0.2))
+            self.assertEqual(state.running_teams(self.root), [])
+            self.assertIsNone(proc.poll())
+
+            started = state.process_start_time(proc.pid)
+            self.assertTrue(state.is_member_alive({"pid": proc.pid, "pid_start": started}))
+            self.assertFalse(state.kill_member({"pid": proc.pid, "pid_start": started - 3600}))
+            self.assertIsNone(proc.poll())
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_stop_clears_legacy_team_started(self):
+        project.set_team_started(self.root, "dev")
+        self._record("a")
+        with mock.patch.object(team, "stop_runner"):
+            team._stop_recorded_team(self.root, state.load_state(self.root, "dev"))
+        self.assertEqual(project.get_team_started(self.root), "NONE")
+        self.assertIsNone(state.load_state(self.root, "dev"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+MOD_DIR = Path(__file__).resolve().parent.parent / "mods" / "run-tmux"
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location(name, MOD_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+runner = _load("tmux_runner")
+stopper = _load("tmux_stop")
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".ucas" / "pool").mkdir(parents=True)
+    return str(tmp_path)
+
+
+def _start_worker(project, worker_id):
+    fifo = os.path.join(runner._pool_dir(project), f"w-{worker_id}.fifo")
+    proc = subprocess.Popen([sys.executable, str(MOD_DIR / "pool_worker.py"), "--fifo", fifo],
+                            env=dict(os.environ, SHELL="/bin/sh"))
+    assert _wait_for(lambda: os.path.exists(fifo))
+    return proc
+
+
+def test_claim_hands_command_to_worker(project):
+    proc = _start_worker(project, "abc")
+    try:
+        worker_id, fd = runner._claim_worker(project)
+        assert worker_id == "abc"
+        out = Path(project) / "out.txt"
+        with os.fdopen(fd, "wb") as f:
+            f.write(f'{{"cmd": "pwd > {out}", "cwd": "{project}"}}\n'.encode())
+        assert proc.wait(timeout=5) == 0
+        assert out.read_text().strip() == os.path.realpath(project)
+        # Both the FIFO and its claimed name are gone
+        assert os.listdir(runner._pool_dir(project)) == []
+    finally:
+        proc.kill()
+
+
+def test_claim_drops_dead_worker_and_takes_next(project):
+    pool_dir = runner._pool_dir(project)
+    os.mkfifo(os.path.join(pool_dir, "w-0dead.fifo"))  # No process holds it open
+    proc = _start_worker(project, "live")
+    try:
+        worker_id, fd = runner._claim_worker(project)
+        os.close(fd)
+        assert worker_id == "live"
+        assert not os.path.exists(os.path.join(pool_dir, "w-0dead.fifo"))
+        assert not os.path.exists(os.path.join(pool_dir, "w-0dead.claimed"))
+
+        # A claimed worker that is not used goes back into the pool
+        runner._release_worker(project, "live")
+        assert runner._claim_worker(project)[0] == "live"
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_launch_falls_back_without_workers(project):
+    args = SimpleNamespace(project_root=project, session_name="proj-dev", window_name="w", cmd="true")
+    with patch.object(runner, "_spawn_refill") as refill, patch("subprocess.run") as run:
+        assert runner._launch_from_pool(args, 2) is False
+    refill.assert_called_once_with(project, 2)
+    run.assert_not_called()
+
+
+def test_refill_spawns_missing_windows(project):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = "pool-aaaa\nother\n" if cmd[1] == "list-windows" else ""
+        return SimpleNamespace(returncode=0, stdout=stdout)
+
+    with patch("subprocess.run", fake_run):
+        runner._refill_pool(project, 3)
+    created = [c for c in calls if c[1] == "new-window"]
+    assert len(created) == 2
+    assert all(c[c.index("-n") + 1].startswith(runner.POOL_WINDOW_PREFIX) for c in created)
+
+
+def test_refill_runs_detached(project):
+    marker = Path(project) / "refilled"
+
+    def slow_refill(project_root, pool_size):
+        time.sleep(0.5)
+        marker.write_text(f"{pool_size}")
+
+    with patch.object(runner, "_refill_pool", slow_refill):
+        start = time.monotonic()
+        runner._spawn_refill(project, 4)
+        assert time.monotonic() - start < 0.4
+    assert _wait_for(marker.exists)
+    assert _wait_for(lambda: marker.read_text() == "4")
+
+
+def test_pool_session_is_keyed_by_project_path(tmp_path):
+    a, b = tmp_path / "a" / "proj", tmp_path / "b" / "proj"
+    a.mkdir(parents=True)
+    b.mkdir(parents=True)
+    (tmp_path / "link").symlink_to(a)
+    assert runner._pool_session(str(a)) != runner._pool_session(str(b))
+    assert runner._pool_session(str(tmp_path / "link")) == runner._pool_session(str(a))
+    assert stopper._project_key(str(a)) == runner._project_key(str(a))
+
+
+@pytest.mark.parametrize("other_key, killed", [("elsewhere", True), (None, False)])
+def test_stop_keeps_pool_while_project_has_a_session(project, other_key, killed):
+    key = runner._project_key(project)
+    sessions = f"{runner._pool_session(project)}:\nproj-dev:{other_key or key}\n"
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return SimpleNamespace(returncode=0, stdout=sessions if cmd[1] == "list-sessions" else "")
+
+    with patch("subprocess.run", fake_run):
+        stopper._stop_idle_pool(project)
+    assert any(c[1] == "kill-session" for c in calls) is killed
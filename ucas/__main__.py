@@ -17,7 +17,7 @@ from .launcher import (
     validate_runner, stop_runner, expand_variables,
     get_runner_preview
 )
-from .exceptions import LaunchError, MergerError
+from .exceptions import LaunchError, MergerError, MailLimitError
 # We might need resolve_entities if run_agent uses it from here?
 # run_agent uses prepare_and_run_member which is now in launcher.
 from .resolver import (
@@ -83,9 +83,13 @@ def main():
 def handle_mail(args):
     """Handle mail commands."""
     if not args.mail_command:
-        print("Use: ucas mail {send,list,read,check,archive,instruction,addressbook,gui} ...")
+        print("Use: ucas mail {send,list,read,thread,search,check,watch,archive,compact,gc,reindex,stats,projects,instruction,addressbook,gui} ...")
         sys.exit(1)
 
+    # Bounded retention pass for the current mailbox (`mail gc` does the full one)
+    if args.mail_command not in ('gc', 'instruction') and not settings.DRY_RUN:
+        mail.enforce_retention()
+
     if args.mail_command == 'send':
         recipient = args.recipient or args.to
         subject = args.subject or args.subject_flag
@@ -98,28 +102,64 @@ def handle_mail(args):
                 print("Enter message body (Ctrl+D to finish):")
             body = sys.stdin.read()
             
-        mail.send_mail(recipient, subject, body, reply_id=args.reply)
+        try:
+            mail.send_mail(recipient, subject, body, reply_id=args.reply, priority=args.priority)
+        except MailLimitError as e:
+            hint = f" Retry after {e.retry_after}s." if e.retry_after is not None else ""
+            print(f"Error: {e}{hint}", file=sys.stderr)
+            sys.exit(e.exit_code)
         
     elif args.mail_command == 'list':
         # Respect --json flag, fallback to not --table
         json_output = args.json if hasattr(args, 'json') else not args.table
-        mail.list_mail(show_all=args.all, show_sent=args.sent, show_archive=args.archive, json_output=json_output)
+        mail.list_mail(show_all=args.all, show_sent=args.sent, show_archive=args.archive, json_output=json_output,
+                       jsonl=args.jsonl, limit=args.limit, offset=args.offset, since=args.since,
+                       sender=args.sender, subject_contains=args.subject_contains, threads=args.threads)
         
     elif args.mail_command == 'read':
         # Respect --json flag, fallback to not --table
         json_output = args.json if hasattr(args, 'json') else not args.table
         mail.read_mail(args.id, json_output=json_output)
 
+    elif args.mail_command == 'thread':
+        mail.thread_mail(args.id, json_output=not args.table)
+
+    elif args.mail_command == 'search':
+        folders = [f.strip() for f in args.folders.split(',') if f.strip()] if args.folders else None
+        mail.search_mail(args.query, folders, sender=args.sender, limit=args.limit, json_output=not args.table)
+
     elif args.mail_command == 'archive':
         mail.archive_mail(args.id)
+
+    elif args.mail_command == 'compact':
+        folders = [f.strip() for f in args.folders.split(',') if f.strip()] if args.folders else None
+        mail.compact_mail(args.agent_name, folders, args.older_than)
+
+    elif args.mail_command == 'reindex':
+        mail.reindex_mail(args.agent_name)
+
+    elif args.mail_command == 'gc':
+        # Global --dry-run: only report what would be removed
+        mail.gc_mail(args.agent_name, dry_run=settings.DRY_RUN, json_output=args.json)
+
+    elif args.mail_command == 'stats':
+        mail.stats_mail(args.agent_name, json_output=args.json, all_agents=args.all)
+
+    elif args.mail_command == 'projects':
+        mail.projects_mail(compact=args.compact, json_output=args.json)
         
     elif args.mail_command == 'check':
-        mail.check_mail(idle=args.idle)
+        mail.check_mail(idle=args.idle, timeout=args.timeout)
         
+    elif args.mail_command == 'watch':
+        folders = [f.strip() for f in args.folders.split(',') if f.strip()]
+        mail.watch_mail(args.agents, args.projects, folders, since=args.since,
+                        mark_read=args.mark_read, body=args.body, timeout=args.timeout)
+
     elif args.mail_command == 'addressbook':
         # Respect --json flag
         json_output = args.json if hasattr(args, 'json') else not args.table
-        mail.print_address_book(json_output=json_output)
+        mail.print_address_book(json_output=json_output, include_projects=args.all_projects)
         
     elif args.mail_command == 'instruction':
         print(mail.get_instruction(args.agent_name or "USER"))
@@ -42,6 +42,7 @@ def parse_args(argv=None):
     addr_parser = mail_subparsers.add_parser('addressbook', help='List known contacts')
     addr_parser.add_argument('--table', action='store_true', help='Output in human-readable table')
     addr_parser.add_argument('--json', action='store_true', help='Output in JSON format (default)')
+    addr_parser.add_argument('--all-projects', action='store_true', help='Also list agents of other registered projects')
     
     # mail archive
     archive_parser = mail_subparsers.add_parser('archive', help='Archive a message')
@@ -50,6 +51,13 @@ def parse_args(argv=None):
     # mail check
     check_parser = mail_subparsers.add_parser('check', help='Check for new mail')
     check_parser.add_argument('--idle', action='store_true', help='Wait for new mail')
+    check_parser.add_argument('--timeout', type=float, help='With --idle: give up after SECONDS (exit 1)')
+
+    # mail compact
+    compact_parser = mail_subparsers.add_parser('compact', help='Pack old messages into segment files')
+    compact_parser.add_argument('agent_name', nargs='?', help='Agent name (default: current agent)')
+    compact_parser.add_argument('--older-than', help='Pack messages older than this (default: 7d; also 12h, epoch or ISO date)')
+    compact_parser.add_argument('--folders', help='Comma-separated folders (default: read,archive)')
 
     # mail gui
     gui_parser = mail_subparsers.add_parser('gui', help='Open mail GUI')
@@ -66,6 +74,13 @@ def parse_args(argv=None):
     list_parser.add_argument('--archive', action='store_true', help='Show archived messages')
     list_parser.add_argument('--table', action='store_true', help='Output in human-readable table')
     list_parser.add_argument('--json', action='store_true', help='Output in JSON format (default)')
+    list_parser.add_argument('--jsonl', action='store_true', help='Output one compact JSON object per line')
+    list_parser.add_argument('--limit', type=int, help='Show at most N messages (newest first)')
+    list_parser.add_argument('--offset', type=int, default=0, help='Skip the N newest matching messages')
+    list_parser.add_argument('--since', help='Only messages newer than a mail ID, or since a date/duration (ISO, epoch, 10m, 2h, 1d)')
+    list_parser.add_argument('--from', dest='sender', help='Only messages whose sender contains TEXT')
+    list_parser.add_argument('--subject-contains', help='Only messages whose subject contains TEXT (case-insensitive)')
+    list_parser.add_argument('--threads', action='store_true', help='Group messages into conversations')
     
     # mail read
     read_parser = mail_subparsers.add_parser('read', help='Read mail')
@@ -73,15 +88,63 @@ def parse_args(argv=None):
     read_parser.add_argument('--table', action='store_true', help='Output in human-readable format')
     read_parser.add_argument('--json', action='store_true', help='Output in JSON format (default)')
     
+    # mail reindex
+    reindex_parser = mail_subparsers.add_parser('reindex', help='Rebuild the mailbox index from disk')
+    reindex_parser.add_argument('agent_name', nargs='?', help='Agent name (default: current agent)')
+
+    # mail gc
+    gc_parser = mail_subparsers.add_parser('gc', help='Apply retention rules and reclaim mailbox space')
+    gc_parser.add_argument('agent_name', nargs='?', help='Agent name (default: current agent)')
+    gc_parser.add_argument('--json', action='store_true', help='Output in JSON format')
+
+    # mail stats
+    stats_parser = mail_subparsers.add_parser('stats', help='Mail backlog, latency and throughput')
+    stats_parser.add_argument('agent_name', nargs='?', help='Agent name (default: current agent)')
+    stats_parser.add_argument('--all', action='store_true', help='One row per mailbox of the project')
+    stats_parser.add_argument('--json', action='store_true', help='Output in JSON format')
+
+    # mail projects
+    projects_parser = mail_subparsers.add_parser('projects', help='List projects registered for mail')
+    projects_parser.add_argument('--compact', action='store_true', help='Drop duplicate and deleted projects from the registry')
+    projects_parser.add_argument('--json', action='store_true', help='Output in JSON format')
+
+    # mail search
+    search_parser = mail_subparsers.add_parser('search', help='Full-text search of your mail')
+    search_parser.add_argument('query', help='Words, "phrases", prefix*, AND/OR/NOT; fields subject:, body:, from:, to:')
+    search_parser.add_argument('--folders', help='Comma-separated folders (default: all)')
+    search_parser.add_argument('--from', dest='sender', help='Only messages whose sender contains TEXT')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+    search_parser.add_argument('--table', action='store_true', help='Output in human-readable table')
+    search_parser.add_argument('--json', action='store_true', help='Output in JSON format (default)')
+
+    # mail thread
+    thread_parser = mail_subparsers.add_parser('thread', help='Show the conversation of a message')
+    thread_parser.add_argument('id', help='Mail ID (any message of the thread)')
+    thread_parser.add_argument('--table', action='store_true', help='Output as an indented tree')
+    thread_parser.add_argument('--json', action='store_true', help='Output in JSON format (default)')
+
     # mail send
     send_parser = mail_subparsers.add_parser('send', help='Send mail')
-    send_parser.add_argument('recipient', nargs='?', help='Recipient name (or ALL). Optional if --reply is used.')
+    send_parser.add_argument('recipient', nargs='?', help='Recipient name, ALL, or a comma-separated list. Optional if --reply is used.')
     send_parser.add_argument('subject', nargs='?', help='Subject line. Optional if --reply is used.')
     send_parser.add_argument('--to', help='Alias for recipient')
     send_parser.add_argument('--subject', dest='subject_flag', help='Alias for subject')
     send_parser.add_argument('--body', help='Message body (optional, otherwise reads from stdin)')
     send_parser.add_argument('--reply', help='ID of message being replied to')
+    send_parser.add_argument('--priority', choices=['urgent', 'high', 'normal', 'low'],
+                             help='X-Ucas-Priority; urgent and high are listed (and claimed from queues) first')
     
+    # mail watch
+    watch_parser = mail_subparsers.add_parser('watch', help='Stream new messages as JSON lines')
+    watch_parser.add_argument('agents', nargs='*', help='Mailboxes to watch: name, name@/path or USER (default: current agent)')
+    watch_parser.add_argument('--project', action='append', dest='projects', metavar='PATH',
+                              help='Watch every mailbox of a project (repeatable)')
+    watch_parser.add_argument('--folders', default='inbox', help='Comma-separated folders to watch (default: inbox)')
+    watch_parser.add_argument('--since', help='Also emit existing messages newer than this (10m, 2h, 1d, epoch or ISO time)')
+    watch_parser.add_argument('--mark-read', action='store_true', help='Move inbox messages to read once emitted')
+    watch_parser.add_argument('--body', action='store_true', help='Include the message body')
+    watch_parser.add_argument('--timeout', type=float, help='Exit after SECONDS without new mail')
+
     # install
     install_parser = subparsers.add_parser('install', help='Install UCAS for current user')
     install_parser.add_argument('--force', action='store_true', help='Reinstall even if already installed')
@@ -112,6 +175,20 @@ def parse_args(argv=None):
     team_stop = team_subparsers.add_parser('stop', help='Stop a team')
     team_stop.add_argument('team', nargs='?', help='Team name')
 
+    # team restart
+    team_restart = team_subparsers.add_parser('restart', help='Restart selected members of a running team')
+    team_restart.add_argument('team', help='Team name')
+    team_restart.add_argument('members', nargs='+', help='Members to restart')
+
+    # team reload
+    team_reload = team_subparsers.add_parser('reload', help='Apply config changes to a running team')
+    team_reload.add_argument('team', help='Team name')
+
+    # team scale
+    team_scale = team_subparsers.add_parser('scale', help='Change the replica count of running members')
+    team_scale.add_argument('team', help='Team name')
+    team_scale.add_argument('scale', nargs='+', metavar='MEMBER=N', help='Replica count per member')
+
     # init
     init_parser = subparsers.add_parser('init', help='Initialize UCAS project')
     init_parser.add_argument('--non-interactive', action='store_true', help='Non-interactive mode')
@@ -2,6 +2,8 @@
 Centralized exception definitions for UCAS.
 """
 
+from typing import Optional
+
 class LaunchError(Exception):
     """Error during command launch."""
     pass
@@ -9,3 +11,13 @@ class LaunchError(Exception):
 class MergerError(LaunchError):
     """Error during configuration merging."""
     pass
+
+class MailLimitError(LaunchError):
+    """
+    Mail refused by an inbox quota or a sender rate limit; retry after
+    `retry_after` seconds (None: retrying the same send cannot succeed).
+    """
+    def __init__(self, message: str, exit_code: int, retry_after: Optional[int]):
+        super().__init__(message)
+        self.exit_code = exit_code
+        self.retry_after = retry_after
@@ -0,0 +1,92 @@
+"""
+Directory change notification for idle waits (`ucas mail check --idle`).
+
+Uses Linux inotify through ctypes (no extra dependency) and falls back to
+plain polling where inotify is not available.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+# A delivered message shows up as a finished write, a rename into the directory,
+# or a new name: hardlink delivery (send_mail fan-out) raises only IN_CREATE
+WAKE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    return _libc
+
+
+class DirWatcher:
+    """
+    Wait until something is written or moved into one of the watched directories.
+    Create it *before* checking the directories so no event is missed.
+    """
+
+    def __init__(self, paths: List[Union[str, Path]], poll_interval: float = 5.0, poll_only: bool = False):
+        self.poll_interval = poll_interval
+        self.fd: Optional[int] = None
+        if not poll_only:
+            self._init_inotify(paths)
+
+    def _init_inotify(self, paths):
+        try:
+            libc = _get_libc()
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            for path in paths:
+                if libc.inotify_add_watch(fd, os.fsencode(str(path)), WAKE_MASK) < 0:
+                    os.close(fd)
+                    return
+            self.fd = fd
+        except (OSError, AttributeError):
+            # No libc or no inotify (non-Linux): poll instead
+            self.fd = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.fd is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a change event or timeout. Returns True on an event.
+        Without inotify this just sleeps for the poll interval (capped by timeout).
+        """
+        if self.fd is None:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            return False
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -19,6 +19,8 @@ from . import settings
 # Imports for _prepare_and_run_member
 from .resolver import get_acli_config, get_run_config, find_entity
 from .merger import merge_configs, collect_skills, resolve_entities
+from .limits import CPU_WARNING, merge_limits, setup_cgroup, wrap_command
+from . import state
 
 
 from .exceptions import LaunchError
@@ -84,9 +86,14 @@ def expand_session_template(template: str, context: Dict[str, str]) -> str:
     return result
 
 
+# Set only for some members (replicas); others must not inherit a stale value
+# from the tmux server environment or the launching shell
+_MEMBER_ONLY_KEYS = ('UCAS_QUEUE',)
+
+
 def get_context_export_str(context: Dict[str, str]) -> str:
     """Return a string of exports for shell injection."""
-    parts = []
+    parts = [f"unset {k}" for k in _MEMBER_ONLY_KEYS if not context.get(k)]
     for k, v in context.items():
         if v:
             parts.append(f"export {k}={shlex.quote(v)}")
@@ -98,6 +105,8 @@ class HookRunner:
     def __init__(self, context: Dict[str, str]):
         self.context = context
         self.env = os.environ.copy()
+        for k in _MEMBER_ONLY_KEYS:
+            self.env.pop(k, None)
         self.env.update(context)
 
     def run(self, hooks: Dict[str, Any], stage: str):
@@ -385,12 +394,24 @@ def get_runner_preview(run_def: Dict[str, Any], cmd: str, member_name: str, cont
         raise LaunchError("Run block missing 'script', 'executable', or 'template'")
 
 
+def get_session_name(context: Dict[str, str]) -> str:
+    """Session name used by runners: <project>-<team> or <project>."""
+    root = Path(context['UCAS_PROJECT_ROOT'])
+    team = context.get('UCAS_TEAM', '')
+    return f"{root.name}-{team}" if team else root.name
+
+
+def get_window_name(member_name: str, context: Dict[str, str]) -> str:
+    """Window name for a member; fixed once per launch via UCAS_WINDOW_NAME."""
+    return context.get('UCAS_WINDOW_NAME') or f"{member_name}-{datetime.now().strftime('%H%M%S')}"
+
+
 def get_run_args(cmd: str, member_name: str, context: Dict[str, str]) -> List[str]:
     """Standard arguments for run-mod scripts."""
     root = Path(context['UCAS_PROJECT_ROOT'])
     team = context.get('UCAS_TEAM', '')
-    session_name = f"{root.name}-{team}" if team else root.name
-    window_name = f"{member_name}-{datetime.now().strftime('%H%M%S')}"
+    session_name = get_session_name(context)
+    window_name = get_window_name(member_name, context)
 
     return [
         '--cmd', cmd,
@@ -407,8 +428,8 @@ def expand_run_template(template: str, cmd: str, member_name: str, context: Dict
     """Expand run template variables."""
     root = Path(context['UCAS_PROJECT_ROOT'])
     team = context.get('UCAS_TEAM', '')
-    session_name = f"{root.name}-{team}" if team else root.name
-    window_name = f"{member_name}-{datetime.now().strftime('%H%M%S')}"
+    session_name = get_session_name(context)
+    window_name = get_window_name(member_name, context)
 
     repls = {
         '{cmd}': cmd,
@@ -450,6 +471,17 @@ def select_run_mod(merged_config: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def get_pool_size(merged_config: Dict[str, Any]) -> int:
+    """Read the warm pool size (pool.size) from configuration."""
+    pool = merged_config.get('pool', {})
+    if not isinstance(pool, dict):
+        return 0
+    try:
+        return max(0, int(pool.get('size', 0) or 0))
+    except (TypeError, ValueError):
+        raise LaunchError(f"Invalid pool size: {pool.get('size')!r}")
+
+
 def _resolve_and_merge(
     agent_name: str,
     mods: List[str],
@@ -484,9 +516,18 @@ def prepare_and_run_member(
     prompt: str = None,
     model: str = None,
     provider: str = None,
-    project_root: Optional[Path] = None
-) -> None:
-    """Prepare and run a single agent member."""
+    project_root: Optional[Path] = None,
+    limits: Optional[Dict[str, Any]] = None,
+    append: bool = False,
+    plan_only: bool = False,
+    extra_env: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Prepare and run a single agent member. Returns its launch plan hash.
+    append: add the member to an already running team session (restart/reload).
+    plan_only: only resolve the launch plan and return its hash, do not run.
+    extra_env: additional context variables (e.g. UCAS_QUEUE for replicas).
+    """
     agent_path, explicit_mod_paths, search_paths, base_config, default_mod_paths, merged_config = (
         _resolve_and_merge(agent_name, mods, project_root)
     )
@@ -529,9 +570,18 @@ def prepare_and_run_member(
         project_root=project_root
     )
     
+    context['UCAS_WINDOW_NAME'] = get_window_name(member_name, context)
+
     env_config = merged_config.get('env', {})
     for k, v in env_config.items():
         context[k] = expand_variables(v, context) if isinstance(v, str) else str(v)
+    context.update(extra_env or {})
+
+    pool_size = get_pool_size(merged_config)
+    if pool_size:
+        context['UCAS_POOL_SIZE'] = str(pool_size)
+    if append:
+        context['UCAS_TEAM_APPEND'] = '1'
 
     all_mod_paths = default_mod_paths + explicit_mod_paths
     skills_dirs = collect_skills(agent_path, all_mod_paths)
@@ -549,22 +599,42 @@ def prepare_and_run_member(
     context['UCAS_ACLI_EXE'] = acli_def.get('executable', '')
     context['UCAS_MAIN_COMMAND'] = main_cmd
 
-    all_cmds = [get_context_export_str(context)]
+    run_def = get_run_config(merged_config)
+    if not run_def:
+        raise LaunchError("No 'run' block found in final configuration")
+
+    # Resource limits: run block defaults, member spec overrides
+    member_limits = merge_limits(run_def.get('limits'), limits)
     hooks = merged_config.get('hooks', {})
+    plan_hash = state.launch_plan_hash(
+        context, main_cmd, hooks, dict(run_def, limits=member_limits),
+        prompt=get_merged_prompt(agent_path, all_mod_paths, merged_config, context)
+    )
+    if plan_only:
+        return plan_hash
+
+    state_root = Path(context['UCAS_PROJECT_ROOT'])
+    cgroup_dir = None
+    if member_limits and not settings.DRY_RUN:
+        cgroup_dir = setup_cgroup(team_name, member_name, member_limits, state_root)
+        if 'cpu' in member_limits and not cgroup_dir:
+            print(f"{prefix}{CPU_WARNING}", file=sys.stderr)
+
+    # The member's shell records its own pid so stop/status can do a cheap liveness check
+    pid_file = state.get_pid_file(state_root, team_name, member_name)
+
+    all_cmds = [f"echo $$ > {shlex.quote(str(pid_file))}", get_context_export_str(context)]
     
     prerun = hooks.get('prerun', [])
     if isinstance(prerun, str): prerun = [prerun]
     all_cmds.extend(prerun)
-    all_cmds.append(main_cmd)
+    all_cmds.append(wrap_command(main_cmd, member_limits, cgroup_dir))
     
     postrun = hooks.get('postrun', [])
     if isinstance(postrun, str): postrun = [postrun]
     all_cmds.extend(postrun)
     
     final_command = ' && '.join(all_cmds)
-    run_def = get_run_config(merged_config)
-    if not run_def:
-        raise LaunchError("No 'run' block found in final configuration")
     
     # Validation step for team context
     validate_runner(run_def, context)
@@ -576,4 +646,19 @@ def prepare_and_run_member(
     else:
         if settings.DEBUG: print(f"[DEBUG] Real run, executing...", file=sys.stderr)
         HookRunner(context).run(hooks, 'install')
+        pid_file.parent.mkdir(parents=True, exist_ok=True)
+        if pid_file.exists():
+            pid_file.unlink()
+        state.record_member(state_root, team_name, member_name, {
+            "agent": agent_name,
+            "window": context['UCAS_WINDOW_NAME'],
+            "index": team_index,
+            "pid_file": str(pid_file),
+            "plan_hash": plan_hash,
+            "session_id": context['UCAS_SESSION_ID'],
+            "group": (extra_env or {}).get('UCAS_QUEUE'),
+            "limits": member_limits,
+            "cgroup": str(cgroup_dir) if cgroup_dir else None,
+        }, session=get_session_name(context), runner=run_def)
         run_command(run_def, final_command, member_name, context)
+    return plan_hash
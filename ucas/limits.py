@@ -0,0 +1,291 @@
+"""
+Per-agent resource limits (CPU, memory, nice/ionice, open files).
+
+Limits are declared in the `run` block and/or in a team member spec:
+
+    limits:
+      memory: 2G        # cgroup memory.max, fallback RLIMIT_AS
+      cpu: 1.5          # cores, cgroup cpu.max (no rlimit equivalent)
+      cpu_time: 3600    # seconds of CPU, RLIMIT_CPU
+      nice: 10
+      ionice: 7         # best-effort level 0-7, or "idle"
+      nofile: 4096      # RLIMIT_NOFILE
+
+They are applied by wrapping the main command in a small `sh -c` prologue,
+so every runner (tmux, bash, xterm, ...) enforces them the same way.
+"""
+
+import errno
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from . import settings
+from .exceptions import LaunchError
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+LIMIT_KEYS = ('memory', 'cpu', 'cpu_time', 'nice', 'ionice', 'nofile', 'cgroup_parent')
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+CPU_WARNING = "Warning: 'cpu' limit not applied (cgroup v2 not available)"
+
+
+def parse_size(value: Any) -> int:
+    """Parse a size like 512M, 2G or a plain byte count."""
+    if isinstance(value, int):
+        return value
+    m = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', str(value), re.IGNORECASE)
+    if not m:
+        raise LaunchError(f"Invalid size in limits: {value!r}")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+def format_size(value: int) -> str:
+    """Format bytes using the largest fitting unit."""
+    for unit in ('T', 'G', 'M', 'K'):
+        if value >= _SIZE_UNITS[unit]:
+            return f"{value / _SIZE_UNITS[unit]:.1f}{unit}"
+    return f"{value}B"
+
+
+def normalize_limits(spec: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate a limits block and convert values to canonical types."""
+    if not spec:
+        return {}
+    if not isinstance(spec, dict):
+        raise LaunchError(f"'limits' must be a dict, got {type(spec).__name__}")
+
+    unknown = [k for k in spec if k not in LIMIT_KEYS]
+    if unknown:
+        raise LaunchError(f"Unknown limit(s): {', '.join(unknown)}")
+
+    result: Dict[str, Any] = {}
+    try:
+        if spec.get('memory') is not None:
+            result['memory'] = parse_size(spec['memory'])
+        if spec.get('cpu') is not None:
+            result['cpu'] = float(spec['cpu'])
+        for key in ('cpu_time', 'nice', 'nofile'):
+            if spec.get(key) is not None:
+                result[key] = int(spec[key])
+    except (TypeError, ValueError) as e:
+        raise LaunchError(f"Invalid limits value: {e}")
+
+    if spec.get('ionice') is not None:
+        ionice = spec['ionice']
+        if ionice != 'idle' and not (isinstance(ionice, int) and 0 <= ionice <= 7):
+            raise LaunchError(f"'ionice' must be 0-7 or 'idle', got {ionice!r}")
+        result['ionice'] = ionice
+    if spec.get('cgroup_parent'):
+        result['cgroup_parent'] = str(spec['cgroup_parent'])
+    return result
+
+
+def merge_limits(*specs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge limit blocks; later blocks (member specs) win."""
+    result: Dict[str, Any] = {}
+    for spec in specs:
+        result.update(normalize_limits(spec))
+    return result
+
+
+def _own_cgroup() -> Optional[Path]:
+    """Return the cgroup v2 directory of the current process."""
+    try:
+        for line in Path("/proc/self/cgroup").read_text().splitlines():
+            if line.startswith("0::"):
+                return CGROUP_ROOT / line[3:].lstrip("/")
+    except OSError:
+        pass
+    return None
+
+
+def _enable_controllers(cgroup_dir: Path) -> None:
+    for ctrl in ('memory', 'cpu', 'pids'):
+        try:
+            (cgroup_dir / 'cgroup.subtree_control').write_text(f"+{ctrl}")
+        except OSError:
+            pass
+
+
+def _team_cgroup_name(project_root: Path, team_name: Optional[str]) -> str:
+    """ucas-<project hash>-<team>: equal team names of two projects get separate cgroups."""
+    key = hashlib.sha1(str(Path(project_root).resolve()).encode()).hexdigest()[:8]
+    return f"ucas-{key}-{team_name or 'single'}"
+
+
+def setup_cgroup(team_name: str, member_name: str, limits: Dict[str, Any],
+                 project_root: Path) -> Optional[Path]:
+    """
+    Create a cgroup v2 subtree <parent>/ucas-<project hash>-<team>/<member> and
+    apply limits. Returns the member cgroup directory, or None when cgroups are
+    not usable.
+    """
+    if 'memory' not in limits and 'cpu' not in limits:
+        return None
+    if not (CGROUP_ROOT / 'cgroup.controllers').exists():
+        return None
+
+    if limits.get('cgroup_parent'):
+        parent = CGROUP_ROOT / limits['cgroup_parent'].lstrip('/')
+    else:
+        own = _own_cgroup()
+        # Processes may only live in leaf cgroups, so build next to our own
+        parent = own.parent if own else None
+    if not parent or not os.access(parent, os.W_OK):
+        return None
+
+    try:
+        team_dir = parent / _team_cgroup_name(project_root, team_name)
+        _enable_controllers(parent)
+        team_dir.mkdir(exist_ok=True)
+        _enable_controllers(team_dir)
+        member_dir = team_dir / member_name
+        member_dir.mkdir(exist_ok=True)
+        if 'memory' in limits:
+            (member_dir / 'memory.max').write_text(str(limits['memory']))
+        if 'cpu' in limits:
+            period = 100000
+            (member_dir / 'cpu.max').write_text(f"{int(limits['cpu'] * period)} {period}")
+        if not os.access(member_dir / 'cgroup.procs', os.W_OK):
+            return None
+        return member_dir
+    except OSError as e:
+        if settings.DEBUG:
+            print(f"[LIMITS] cgroup v2 unavailable, falling back to rlimits: {e}")
+        return None
+
+
+def remove_cgroup(cgroup_dir: Optional[str], timeout: float = 2.0) -> None:
+    """
+    Remove a stopped member's cgroup, then its team cgroup once empty.
+    Waits up to timeout for the member's processes to leave it.
+    """
+    if not cgroup_dir:
+        return
+    member_dir = Path(cgroup_dir)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            member_dir.rmdir()
+            break
+        except FileNotFoundError:
+            break
+        except OSError as e:
+            if e.errno != errno.EBUSY or time.monotonic() > deadline:
+                if settings.DEBUG:
+                    print(f"[LIMITS] Could not remove {member_dir}: {e}")
+                return
+            time.sleep(0.05)
+    try:
+        member_dir.parent.rmdir()  # Fails while other members still run
+    except OSError:
+        pass
+
+
+def wrap_command(cmd: str, limits: Dict[str, Any], cgroup_dir: Optional[Path] = None) -> str:
+    """Wrap a command so that it runs under the given limits."""
+    if not limits:
+        return cmd
+
+    prologue: List[str] = []
+    memory_rlimit = f"ulimit -v {limits['memory'] // 1024} 2>/dev/null" if 'memory' in limits else None
+    if cgroup_dir:
+        # Joining the cgroup can still fail (e.g. delegation changed); fall back to rlimits
+        fallback = [f"echo {shlex.quote(CPU_WARNING)} >&2"] if 'cpu' in limits else []
+        fallback += [memory_rlimit] if memory_rlimit else []
+        prologue.append(f"echo $$ > {shlex.quote(str(cgroup_dir / 'cgroup.procs'))} 2>/dev/null"
+                        f" || {{ {'; '.join(fallback or ['true'])}; }}")
+    if 'nofile' in limits:
+        prologue.append(f"ulimit -n {limits['nofile']} 2>/dev/null")
+    if 'cpu_time' in limits:
+        prologue.append(f"ulimit -t {limits['cpu_time']} 2>/dev/null")
+    if memory_rlimit and not cgroup_dir:
+        prologue.append(memory_rlimit)
+
+    prefix: List[str] = []
+    if 'nice' in limits and shutil.which('nice'):
+        prefix.extend(['nice', '-n', str(limits['nice'])])
+    if 'ionice' in limits and shutil.which('ionice'):
+        if limits['ionice'] == 'idle':
+            prefix.extend(['ionice', '-c', '3'])
+        else:
+            prefix.extend(['ionice', '-c', '2', '-n', str(limits['ionice'])])
+
+    script = '; '.join(prologue + [' '.join(['exec'] + prefix + [cmd])])
+    return f"sh -c {shlex.quote(script)}"
+
+
+# =============================================================================
+# Usage (for `ucas team status`)
+# =============================================================================
+
+def _process_tree(root_pid: int) -> List[int]:
+    """Return root_pid and all its descendants."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            stat = Path(f'/proc/{entry}/stat').read_text()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def get_usage(pid: int, cgroup_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Current memory (bytes), CPU time (seconds) and max open files of a member."""
+    usage = {'memory': 0, 'cpu_time': 0.0, 'nofile': 0}
+    if cgroup_dir and Path(cgroup_dir).is_dir():
+        cg = Path(cgroup_dir)
+        try:
+            usage['memory'] = int((cg / 'memory.current').read_text())
+            for line in (cg / 'cpu.stat').read_text().splitlines():
+                if line.startswith('usage_usec'):
+                    usage['cpu_time'] = int(line.split()[1]) / 1e6
+        except (OSError, ValueError):
+            pass
+
+    ticks = os.sysconf('SC_CLK_TCK')
+    for p in _process_tree(pid):
+        try:
+            if not cgroup_dir:
+                for line in Path(f'/proc/{p}/status').read_text().splitlines():
+                    if line.startswith('VmRSS:'):
+                        usage['memory'] += int(line.split()[1]) * 1024
+                fields = Path(f'/proc/{p}/stat').read_text().rsplit(')', 1)[1].split()
+                usage['cpu_time'] += (int(fields[11]) + int(fields[12])) / ticks
+            usage['nofile'] = max(usage['nofile'], len(os.listdir(f'/proc/{p}/fd')))
+        except (OSError, ValueError, IndexError):
+            continue
+    return usage
+
+
+def format_usage(usage: Dict[str, Any], limits: Dict[str, Any]) -> str:
+    """Render 'usage/limit' pairs for every declared limit."""
+    parts = []
+    if 'memory' in limits:
+        parts.append(f"mem {format_size(usage['memory'])}/{format_size(limits['memory'])}")
+    if 'cpu' in limits:
+        parts.append(f"cpu {limits['cpu']} cores")
+    if 'cpu_time' in limits:
+        parts.append(f"cpu_time {usage['cpu_time']:.1f}s/{limits['cpu_time']}s")
+    if 'nofile' in limits:
+        parts.append(f"nofile {usage['nofile']}/{limits['nofile']}")
+    if 'nice' in limits:
+        parts.append(f"nice {limits['nice']}")
+    if 'ionice' in limits:
+        parts.append(f"ionice {limits['ionice']}")
+    return "  ".join(parts)
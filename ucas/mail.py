@@ -11,24 +11,68 @@ import socket
 import subprocess
 import shlex
 import time
+import threading
 import glob
 import shutil
 import hashlib
+import fcntl
+import math
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import Callable, List, Dict, Optional, Tuple, Any
 import email
 from email import policy
 from email.message import EmailMessage
 from email.utils import formatdate, parsedate_to_datetime
 from . import settings
+from . import mail_index
+from . import mail_segments
+from . import mail_blobs
+from . import mail_search
+from . import mail_threads
+from . import mail_projects
+from . import mail_stats
+from . import fswatch
 from .merger import merge_configs
+from .exceptions import LaunchError, MailLimitError
 
 # Constants
 USER_AGENT_NAME = "USER"
 MAIL_SUBDIR = "mails"
-PROJECT_LIST_FILE = Path.home() / ".ucas" / "mail-projects.txt"
+PROJECT_LIST_FILE = mail_projects.PROJECT_LIST_FILE
+# `mail check --idle`: poll interval without inotify, safety rescan with it
+IDLE_POLL_INTERVAL = 5.0
+IDLE_RESCAN_INTERVAL = 60.0
+# Marks a shared work-queue mailbox of a replica group (see `replicas:` in team specs)
+QUEUE_MARKER = ".queue"
+# `mail compact` defaults; `mail check` packs a folder once it has more than COMPACT_MAX_FILES files
+COMPACT_FOLDERS = ["read", "archive"]
+COMPACT_OLDER_THAN = "7d"
+COMPACT_MAX_FILES = 5000
+# `mail.retention`: each `ucas mail` run prunes at most RETENTION_BATCH messages,
+# and only if the mailbox was not pruned within the last RETENTION_INTERVAL seconds
+RETENTION_BATCH = 200
+RETENTION_INTERVAL = 60.0
+RETENTION_STAMP = ".retention-stamp"
+# `mail gc` removes files left in tmp/ by crashed deliveries after this many seconds
+TMP_MAX_AGE = 36 * 3600
+# `mail.limits`: exit codes of a refused `mail send`, and the retry hint for a full inbox
+EXIT_RATE_LIMITED = 75
+EXIT_INBOX_FULL = 76
+QUOTA_RETRY_AFTER = 30
+RATE_STATE = ".rate.json"
+RATE_LOCK = ".rate.lock"
+# A burst of this many new USER messages gets one summary notification
+NOTIFY_SUMMARY_THRESHOLD = 3
+# Per-project address book caches, validated by the mtimes of the files they were built from
+ADDRESS_BOOK_CACHE_DIR = Path.home() / ".ucas" / "cache" / "addressbook"
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
 _UCAS_HOSTNAME = socket.gethostname()
+_id_lock = threading.Lock()
+_last_id_ms = 0
+_id_counter = 0
+# project root -> (signatures of its config files, merged `mail` section)
+_mail_configs: Dict[Path, Tuple[List[Optional[List[int]]], Dict[str, Any]]] = {}
 
 def _get_project_root() -> Path:
     """Find the project root (where .ucas exists) or current directory."""
@@ -64,15 +108,62 @@ def _get_agent_mail_dir(agent_name: str, project_root: Optional[Path] = None) ->
     return project_root / ".ucas" / MAIL_SUBDIR / agent_name
 
 def _ensure_mail_dirs(base_dir: Path):
-    """Ensure inbox, read, sent, archive directories exist."""
-    for subdir in ["inbox", "read", "sent", "archive"]:
+    """Ensure inbox, read, sent, archive (and the tmp delivery area) exist."""
+    for subdir in ["tmp", "inbox", "read", "sent", "archive"]:
         (base_dir / subdir).mkdir(parents=True, exist_ok=True)
 
+def _ensure_queue_dir(base_dir: Path):
+    """Create a work-queue mailbox: messages in its inbox are claimed by one replica each."""
+    _ensure_mail_dirs(base_dir)
+    (base_dir / QUEUE_MARKER).touch()
+
+def _is_queue(mail_dir: Path) -> bool:
+    return (mail_dir / QUEUE_MARKER).exists()
+
+def _claim_from_queue(queue: str, mail_dir: Path, project_root: Optional[Path] = None) -> Optional[str]:
+    """
+    Claim the most urgent (then oldest) message of a work queue into mail_dir's
+    inbox. os.rename is atomic, so each message is claimed by exactly one replica.
+    """
+    queue_inbox = _get_agent_mail_dir(queue, project_root) / "inbox"
+    if not queue_inbox.is_dir():
+        return None
+    (mail_dir / "inbox").mkdir(parents=True, exist_ok=True)
+    waiting = [e for e in mail_index.load(queue_inbox.parent, ["inbox"]).values() if e["folder"] == "inbox"]
+    waiting.sort(key=lambda e: (-mail_index.priority_rank(e), mail_index.sort_key(e)))
+    for mail_file in (queue_inbox / f"{e['id']}.eml" for e in waiting):
+        try:
+            os.rename(mail_file, mail_dir / "inbox" / mail_file.name)
+        except FileNotFoundError:
+            continue  # Another replica won the race
+        mail_index.record_remove(queue_inbox.parent, mail_file.stem)
+        mail_index.record_file(mail_dir, mail_dir / "inbox" / mail_file.name, "inbox")
+        try:
+            _record_thread(mail_dir, mail_index.read_entry(mail_dir / "inbox" / mail_file.name, "inbox"))
+        except (OSError, ValueError):
+            pass
+        return mail_file.stem
+    return None
+
 def _generate_mail_id() -> str:
-    """Generate a unique mail ID."""
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    random_part = hashlib.md5(os.urandom(16)).hexdigest()[:4]
-    return f"{timestamp}-{random_part}"
+    """
+    Generate a unique, time-ordered mail ID: YYYYMMDD-HHMMSSmmm-CCCC-RRRRRRRRRRRR.
+    Millisecond time, a per-process counter for IDs within one millisecond and
+    48 random bits against other senders, so IDs sort by creation time as strings.
+    """
+    global _last_id_ms, _id_counter
+    with _id_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_id_ms:
+            _last_id_ms, _id_counter = now_ms, 0
+        else:
+            # Same millisecond (or the clock stepped back): stay monotonic
+            _id_counter += 1
+            if _id_counter > 0xFFFF:
+                _last_id_ms, _id_counter = _last_id_ms + 1, 0
+        ms, counter = _last_id_ms, _id_counter
+    stamp = datetime.fromtimestamp(ms / 1000).strftime("%Y%m%d-%H%M%S")
+    return f"{stamp}{ms % 1000:03d}-{counter:04x}-{os.urandom(6).hex()}"
 
 def _get_sender_info(override_agent: Optional[str] = None, project_root: Optional[Path] = None) -> Tuple[str, Path]:
     """Determine current sender name and their mail directory."""
@@ -85,127 +176,368 @@ def _get_sender_info(override_agent: Optional[str] = None, project_root: Optiona
     return USER_AGENT_NAME, _get_user_mail_dir()
 
 def _update_project_list(project_root: Path):
-    """Register project path for the GUI."""
+    """Register project path for the GUI (one stat when already registered)."""
     try:
-        abs_path = str(Path(project_root).resolve())
-        if abs_path.startswith("/tmp/"):
-            return
-            
-        PROJECT_LIST_FILE.parent.mkdir(parents=True, exist_ok=True)
-        current_paths = set(PROJECT_LIST_FILE.read_text().splitlines()) if PROJECT_LIST_FILE.exists() else set()
-        if abs_path not in current_paths:
-            with open(PROJECT_LIST_FILE, "a") as f:
-                f.write(f"{abs_path}\n")
-    except:
+        mail_projects.register(project_root, PROJECT_LIST_FILE)
+    except OSError:
         pass
 
-def _parse_eml(path: Path, folder: str) -> Dict:
-    """Parse an EML file into a dictionary."""
-    with open(path, 'rb') as f:
-        msg = email.message_from_binary_file(f, policy=policy.default)
-    
-    body = ""
+def _read_body(path: Path) -> str:
+    """Decode the text/plain body of an EML file (or of a packed message, or its blob)."""
+    try:
+        with open(path, 'rb') as f:
+            msg = email.message_from_binary_file(f, policy=policy.default)
+    except FileNotFoundError:
+        data = mail_segments.read(path)
+        if data is None:
+            raise
+        msg = email.message_from_bytes(data, policy=policy.default)
+
+    digest = mail_blobs.reference(msg)
+    if digest:
+        return mail_blobs.read_text(mail_blobs.store_of_message(path), digest)
+
     if msg.is_multipart():
         for part in msg.walk():
             if part.get_content_type() == "text/plain":
-                body = part.get_content()
-                break
-    else:
-        body = msg.get_content()
+                return part.get_content()
+        return ""
+    return msg.get_content()
 
-    return {
-        "id": path.stem,
-        "timestamp": path.stat().st_mtime,
-        "date_str": msg.get('Date') or "",
-        "from": msg.get('From'),
-        "to": msg.get('To'),
-        "subject": msg.get('Subject'),
-        "body": body,
-        "from_project": msg.get('X-Ucas-Project'),
-        "in_reply_to": msg.get('X-Ucas-In-Reply-To'),
-        "_folder": folder,
-        "_path": str(path)
-    }
+class MailMessage(dict):
+    """Message headers as a dict; `body` is read from `_path` on first access."""
+
+    def _load_body(self):
+        if not dict.__contains__(self, "body"):
+            dict.__setitem__(self, "body", _read_body(Path(self["_path"])))
+
+    def __getitem__(self, key):
+        if key == "body":
+            self._load_body()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key == "body":
+            try:
+                self._load_body()
+            except (OSError, KeyError):
+                return default
+        return dict.get(self, key, default)
+
+    @property
+    def body(self) -> str:
+        return self["body"]
+
+def _parse_eml(path: Path, folder: str, headers_only: bool = False) -> Dict:
+    """
+    Parse an EML file into a dictionary.
+    headers_only: read only the header block; the body is loaded lazily on access.
+    """
+    data = MailMessage(mail_index.read_entry(path, folder))
+    del data["folder"]
+    data["_folder"] = folder
+    data["_path"] = str(path)
+    if not headers_only:
+        data["body"] = _read_body(path)
+    return data
+
+def _mail_filename(msg: EmailMessage) -> str:
+    return f"{msg['Message-ID'].strip('<>').split('@')[0]}.eml"
+
+def _write_synced(path: Path, data: bytes):
+    """Write a file and fsync it, so it is complete before it is linked anywhere."""
+    with open(path, 'xb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _stage_mail(mail_dir: Path, msg: EmailMessage) -> Path:
+    """Serialize a message once into the sender's tmp/ for fan-out."""
+    (mail_dir / "tmp").mkdir(parents=True, exist_ok=True)
+    staged = mail_dir / "tmp" / f"{_mail_filename(msg)}.{os.getpid()}"
+    _write_synced(staged, msg.as_bytes())
+    return staged
 
-def _deliver_mail(target_dir: Path, msg: EmailMessage) -> bool:
-    """Deliver a message to an agent's inbox."""
+def _deliver_mail(target_dir: Path, msg: EmailMessage, staged: Path) -> bool:
+    """
+    Deliver a staged message to an agent's inbox (Maildir style): the file
+    appears in inbox/ only once complete, via a hardlink to the staged file,
+    or across filesystems via a synced copy in the target's tmp/. An existing
+    message with the same name is never overwritten.
+    """
     try:
         _ensure_mail_dirs(target_dir)
-        mail_filename = f"{msg['Message-ID'].strip('<>').split('@')[0]}.eml"
-        with open(target_dir / "inbox" / mail_filename, 'wb') as f:
-            f.write(msg.as_bytes())
+        digest = mail_blobs.reference(msg)
+        if digest:
+            mail_blobs.ensure(mail_blobs.store_for(target_dir), mail_blobs.store_of_message(staged), digest)
+        target = target_dir / "inbox" / _mail_filename(msg)
+        try:
+            os.link(staged, target)
+        except FileExistsError:
+            return False
+        except OSError:
+            # Other filesystem, or links not supported
+            if target.exists():
+                return False
+            tmp = target_dir / "tmp" / staged.name
+            _write_synced(tmp, staged.read_bytes())
+            os.rename(tmp, target)
+        mail_index.record_file(target_dir, target, "inbox", msg)
+        _record_thread(target_dir, msg)
         return True
     except:
         return False
 
+def _record_thread(mail_dir: Path, msg):
+    """Add a reply to its thread file (msg: EmailMessage or an index entry)."""
+    if isinstance(msg, EmailMessage):
+        thread, parent, mail_id = msg['X-Ucas-Thread'], msg['X-Ucas-In-Reply-To'], _mail_filename(msg)[:-4]
+    else:
+        thread, parent, mail_id = msg.get('thread'), msg.get('in_reply_to'), msg['id']
+    if thread and parent:
+        try:
+            mail_threads.record(mail_dir, str(thread), mail_id, str(parent))
+        except OSError:
+            pass
+
+def _is_agent_dir(path: Path) -> bool:
+    """Agent mailboxes are lowercase; USER and dot-dirs (.blobs) are not agents."""
+    return path.is_dir() and path.name.islower() and not path.name.startswith(".")
+
+def _resolve_recipients(recipient: str, sender_name: str, project_root: Path) -> List[Tuple[str, Path]]:
+    """Mailboxes for a To: value: a name, name@/path, USER, ALL, or a comma-separated list of those."""
+    targets = []
+    for name in (r.strip() for r in recipient.split(",")):
+        if not name:
+            continue
+        if name.upper() == "ALL":
+            mails_dir = project_root / ".ucas" / MAIL_SUBDIR
+            if mails_dir.exists():
+                for agent_dir in mails_dir.iterdir():
+                    if _is_agent_dir(agent_dir):
+                        if agent_dir.name == sender_name or _is_queue(agent_dir):
+                            continue
+                        targets.append((agent_dir.name, agent_dir))
+        elif name == USER_AGENT_NAME:
+            targets.append((USER_AGENT_NAME, _get_user_mail_dir()))
+        else:
+            targets.append((name, _get_agent_mail_dir(name, project_root)))
+
+    # A mailbox named twice (e.g. "ALL, worker") gets one copy
+    unique = {}
+    for name, mail_dir in targets:
+        unique.setdefault(mail_dir.resolve(), (name, mail_dir))
+    return list(unique.values())
+
 # --- Public API ---
 
-def get_messages(agent_name: Optional[str] = None, folders: List[str] = None, project_root: Optional[Path] = None) -> List[Dict]:
-    """Get list of messages for an agent."""
+def _message_filter(since: Optional[str] = None, sender: Optional[str] = None,
+                    subject_contains: Optional[str] = None):
+    """
+    Predicate over index entries for list filters, or None when there are none.
+    since: a mail ID (newer than it) or a date/duration as for `mail watch --since`.
+    """
+    checks = []
+    if since:
+        if mail_index._ID_TIME.match(since):
+            checks.append(lambda e: mail_index.sort_key(e) > since)
+        else:
+            since_key = time.strftime("%Y%m%d-%H%M%S", time.localtime(_parse_since(since)))
+            checks.append(lambda e: mail_index.sort_key(e) >= since_key)
+    if sender:
+        sender_lower = sender.lower()
+        checks.append(lambda e: sender_lower in (e.get("from") or "").lower())
+    if subject_contains:
+        subject_lower = subject_contains.lower()
+        checks.append(lambda e: subject_lower in (e.get("subject") or "").lower())
+    if not checks:
+        return None
+    return lambda e: all(check(e) for check in checks)
+
+def get_messages(agent_name: Optional[str] = None, folders: List[str] = None, project_root: Optional[Path] = None,
+                 limit: Optional[int] = None, offset: int = 0, since: Optional[str] = None,
+                 sender: Optional[str] = None, subject_contains: Optional[str] = None) -> List[Dict]:
+    """Get list of messages for an agent (most urgent, then newest first)."""
     name, mail_dir = _get_sender_info(agent_name, project_root)
     if not mail_dir.exists():
         return []
-    
+
+    # Headers come from the mailbox index; use get_message_content for the body
+    where = _message_filter(since, sender, subject_contains)
     mails = []
-    for folder in (folders or ["inbox"]):
-        path = mail_dir / folder
-        if path.exists():
-            for mail_file in path.glob("*.eml"):
-                try:
-                    mails.append(_parse_eml(mail_file, folder))
-                except:
-                    continue
-    mails.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+    base = str(mail_dir)
+    # Urgent and high priority first, newest first within a priority
+    for entry in mail_index.list_entries(mail_dir, folders or ["inbox"], limit, offset, where, mail_index.priority_key):
+        folder = entry.pop("folder")
+        entry["_folder"] = folder
+        entry["_path"] = os.path.join(base, folder, entry["id"] + ".eml")
+        mails.append(MailMessage(entry))
     return mails
 
-def get_message_content(mail_id: str, agent_name: Optional[str] = None, project_root: Optional[Path] = None) -> Tuple[Optional[Dict], Optional[Path], Optional[str]]:
+def get_message_content(mail_id: str, agent_name: Optional[str] = None, project_root: Optional[Path] = None,
+                        headers_only: bool = False) -> Tuple[Optional[Dict], Optional[Path], Optional[str]]:
     """Get message content and file path. Returns (data, filepath, foldername)."""
     name, mail_dir = _get_sender_info(agent_name, project_root)
-    for folder in ["inbox", "read", "sent", "archive"]:
-        path = mail_dir / folder / f"{mail_id}.eml"
-        if path.exists():
-            return _parse_eml(path, folder), path, folder
-        files = list((mail_dir / folder).glob(f"{mail_id}*.eml"))
-        if files:
-            return _parse_eml(files[0], folder), files[0], folder
-    return None, None, None
+    hit = mail_index.resolve(mail_dir, mail_id)
+    if not hit:
+        return None, None, None
+    _, folder, path = hit
+    path = Path(path)
+    return _parse_eml(path, folder, headers_only), path, folder
+
+def _move_message(mail_dir: Path, mail_id: str, path: str, folder: str) -> bool:
+    """Move a located message to another folder of its mailbox (no parsing)."""
+    target_dir = mail_dir / folder
+    target_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(path, target_dir / os.path.basename(path))
+    except FileNotFoundError:
+        # A packed message is written out to its new folder and dropped from the segment
+        data = mail_segments.read(path)
+        if data is None:
+            return False  # Moved by someone else meanwhile
+        tmp = mail_dir / "tmp" / f"{os.path.basename(path)}.{os.getpid()}"
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        _write_synced(tmp, data)
+        os.rename(tmp, target_dir / os.path.basename(path))
+        mail_segments.remove(os.path.dirname(path), mail_id)
+    mail_index.record_move(mail_dir, mail_id, folder)
+    return True
 
 def mark_as_read(mail_id: str, agent_name: Optional[str] = None, project_root: Optional[Path] = None):
     """Move message from inbox to read folder."""
-    data, path, folder = get_message_content(mail_id, agent_name, project_root)
-    if data and path and folder == "inbox":
-        read_dir = path.parent.parent / "read"
-        read_dir.mkdir(parents=True, exist_ok=True)
-        shutil.move(str(path), str(read_dir / path.name))
+    name, mail_dir = _get_sender_info(agent_name, project_root)
+    hit = mail_index.resolve(mail_dir, mail_id)
+    if hit and hit[1] == "inbox":
+        _move_message(mail_dir, hit[0], hit[2], "read")
 
 def archive_mail(mail_id: str, agent_name: Optional[str] = None, project_root: Optional[Path] = None):
     """Move message to archive folder."""
-    data, path, folder = get_message_content(mail_id, agent_name, project_root)
-    if data and path and folder != "archive":
-        archive_dir = path.parent.parent / "archive"
-        archive_dir.mkdir(parents=True, exist_ok=True)
-        shutil.move(str(path), str(archive_dir / path.name))
-
-def send_mail(recipient: str, subject: str, body: str, reply_id: Optional[str] = None, sender_override: Optional[str] = None, project_root: Optional[Path] = None):
-    """Send a mail to a recipient."""
+    name, mail_dir = _get_sender_info(agent_name, project_root)
+    hit = mail_index.resolve(mail_dir, mail_id)
+    if hit and hit[1] != "archive":
+        _move_message(mail_dir, hit[0], hit[2], "archive")
+
+def _parse_duration(value) -> float:
+    """Seconds from 30s, 10m, 2h, 1d or a plain number of seconds."""
+    value = str(value).strip()
+    if value[-1:] in _DURATION_UNITS:
+        return float(value[:-1]) * _DURATION_UNITS[value[-1]]
+    return float(value)
+
+def _send_rate(limits: Dict[str, Any], sender: str) -> Optional[Tuple[float, float]]:
+    """(messages, per seconds) allowed for a sender, or None when unlimited."""
+    rule = (limits.get('rates') or {}).get(sender, limits.get('rate'))
+    if not rule:
+        return None
+    try:
+        messages, per = float(rule['messages']), _parse_duration(rule.get('per', 60))
+    except (KeyError, TypeError, ValueError):
+        raise LaunchError(f"Invalid mail.limits rate for {sender}: {rule}")
+    return (messages, per) if messages > 0 and per > 0 else None
+
+def _inbox_quota(limits: Dict[str, Any], recipient: str) -> Optional[int]:
+    quota = (limits.get('quotas') or {}).get(recipient, limits.get('inbox_quota'))
+    return int(quota) if quota else None
+
+def _take_send_tokens(mail_dir: Path, rate: Tuple[float, float], cost: int) -> int:
+    """
+    Token bucket of a sender (capacity `messages`, refilled over `per` seconds),
+    kept in its mailbox. Takes `cost` tokens and returns 0, or returns the
+    seconds until they are available (nothing taken). A negative cost refunds.
+    """
+    messages, per = rate
+    mail_dir.mkdir(parents=True, exist_ok=True)
+    with open(mail_dir / RATE_LOCK, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        now = time.time()
+        try:
+            state = json.loads((mail_dir / RATE_STATE).read_text())
+            tokens = min(messages, state['tokens'] + (now - state['updated']) * messages / per)
+        except (OSError, ValueError, KeyError, TypeError):
+            tokens = messages
+        if tokens < cost:
+            return max(1, math.ceil((cost - tokens) * per / messages))
+        tmp = mail_dir / f"{RATE_STATE}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps({'tokens': min(messages, tokens - cost), 'updated': now}))
+        os.replace(tmp, mail_dir / RATE_STATE)
+    return 0
+
+def _apply_limits(sender_name: str, sender_mail_dir: Path, targets: List[Tuple[str, Path]],
+                  project_root: Optional[Path] = None):
+    """
+    Enforce `mail.limits`: drop targets whose inbox is at its quota, then charge
+    the sender's rate limit for the rest. Returns (accepted, refused, retry after,
+    the charged rate or None). Raises MailLimitError when nothing can be delivered.
+    """
+    limits = _get_mail_config(project_root).get('limits') or {}
+    if not limits:
+        return targets, [], 0, None
+    retry_after = int(limits.get('retry_after', QUOTA_RETRY_AFTER))
+
+    accepted, refused = [], []
+    for name, mail_dir in targets:
+        quota = _inbox_quota(limits, name.split("@")[0])
+        if quota and mail_index.counts(mail_dir).get("inbox", 0) >= quota:
+            refused.append(name)
+        else:
+            accepted.append((name, mail_dir))
+    if refused and not accepted:
+        raise MailLimitError(f"Inbox full: {', '.join(refused)}.", EXIT_INBOX_FULL, retry_after)
+
+    # The human user is never throttled
+    rate = _send_rate(limits, sender_name) if sender_name != USER_AGENT_NAME else None
+    if rate and len(accepted) > rate[0]:
+        # Could never be paid for: the bucket holds at most `messages` tokens
+        raise MailLimitError(f"Rate limit for {sender_name}: {len(accepted)} recipients exceed the burst of "
+                             f"{rate[0]:g} message(s); send to fewer recipients at a time.", EXIT_RATE_LIMITED, None)
+    if rate and accepted:
+        wait = _take_send_tokens(sender_mail_dir, rate, len(accepted))
+        if wait:
+            raise MailLimitError(f"Rate limit for {sender_name}: {rate[0]:g} message(s) per {rate[1]:g}s.",
+                                 EXIT_RATE_LIMITED, wait)
+    return accepted, refused, retry_after, rate if accepted else None
+
+def _blob_threshold(project_root: Optional[Path] = None) -> int:
+    """Body size above which send_mail uses the blob store (mail.blobs.threshold; 0 disables)."""
+    value = (_get_mail_config(project_root).get("blobs") or {}).get("threshold", mail_blobs.DEFAULT_THRESHOLD)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        raise LaunchError(f"Invalid mail.blobs.threshold: {value!r} (bytes expected).")
+
+def send_mail(recipient: str, subject: str, body: str, reply_id: Optional[str] = None, sender_override: Optional[str] = None,
+              project_root: Optional[Path] = None, priority: Optional[str] = None):
+    """
+    Send a mail to a recipient. Raises MailLimitError when `mail.limits` refuse
+    it (rate limit, or every recipient's inbox full).
+    """
     if not project_root:
         project_root = _get_project_root()
     sender_name, sender_mail_dir = _get_sender_info(sender_override, project_root)
     
     full_sender = f"{sender_name}@{project_root}" if sender_name != USER_AGENT_NAME else sender_name
 
-    if (not recipient or not subject) and reply_id:
-        orig, _, _ = get_message_content(reply_id, agent_name=sender_name, project_root=project_root)
+    thread = None
+    if reply_id:
+        orig, _, _ = get_message_content(reply_id, agent_name=sender_name, project_root=project_root, headers_only=True)
         if orig:
+            # Full ID of the parent, and the thread it belongs to
+            reply_id = orig['id']
+            thread = mail_threads.thread_of(orig)
             if not recipient:
                 recipient = orig.get('from')
             if not subject:
                 subj = orig.get('subject', 'No Subject')
                 subject = "Re: " + subj.replace("Re: ", "")
+        else:
+            thread = reply_id
     
     if not recipient or not subject:
         print("Error: Recipient and Subject required.", file=sys.stderr)
         return
+    if priority and priority not in mail_index.PRIORITIES:
+        raise LaunchError(f"Invalid priority '{priority}' (use {', '.join(mail_index.PRIORITIES)}).")
 
     mail_id = _generate_mail_id()
     _update_project_list(project_root)
@@ -219,35 +551,86 @@ def send_mail(recipient: str, subject: str, body: str, reply_id: Optional[str] =
     msg['Message-ID'] = f"<{mail_id}@ucas-{_UCAS_HOSTNAME}>"
     if reply_id:
         msg['X-Ucas-In-Reply-To'] = reply_id
-    msg.set_content(body)
-    
-    if recipient.upper() == "ALL":
-        mails_dir = project_root / ".ucas" / MAIL_SUBDIR
-        targets = []
-        if mails_dir.exists():
-            for agent_dir in mails_dir.iterdir():
-                if agent_dir.is_dir() and agent_dir.name.islower():
-                    if agent_dir.name == sender_name:
-                        continue
-                    targets.append((agent_dir.name, agent_dir))
+        msg['X-Ucas-Thread'] = thread
+    if priority and priority != "normal":
+        msg['X-Ucas-Priority'] = priority
+
+    # Limits first: a refused send must not leave a blob behind
+    threshold = _blob_threshold(project_root)
+    targets = _resolve_recipients(recipient, sender_name, project_root)
+    targets, refused, retry_after, rate = _apply_limits(sender_name, sender_mail_dir, targets, project_root)
+
+    data = body.encode("utf-8")
+    if threshold and len(data) > threshold:
+        # Stored once per project; every copy of the message carries only the reference
+        msg[mail_blobs.BLOB_HEADER] = mail_blobs.put(mail_blobs.store_for(sender_mail_dir), data)
+        msg[mail_blobs.SIZE_HEADER] = str(len(data))
+        msg.set_content(f"[{len(data)} bytes stored in {mail_blobs.BLOB_DIR}/{msg[mail_blobs.BLOB_HEADER]}]\n")
     else:
-        if recipient == USER_AGENT_NAME:
-            targets = [(USER_AGENT_NAME, _get_user_mail_dir())]
-        else:
-            targets = [(recipient, _get_agent_mail_dir(recipient, project_root))]
+        msg.set_content(body)
 
-    sent_count = sum(1 for _, d in targets if _deliver_mail(d, msg))
-    if sent_count > 0:
+    # Serialized once; inboxes get hardlinks and the staged file becomes the sent copy
+    sent_count = 0
+    staged = None
+    try:
         _ensure_mail_dirs(sender_mail_dir)
-        with open(sender_mail_dir / "sent" / f"{mail_id}.eml", 'wb') as f:
-            f.write(msg.as_bytes())
+        staged = _stage_mail(sender_mail_dir, msg)
+        sent_count = sum(1 for _, d in targets if _deliver_mail(d, msg, staged))
+        if sent_count > 0:
+            sent_path = sender_mail_dir / "sent" / _mail_filename(msg)
+            os.rename(staged, sent_path)
+            mail_index.record_file(sender_mail_dir, sent_path, "sent", msg)
+            _record_thread(sender_mail_dir, msg)
+    finally:
+        if staged and staged.exists():
+            staged.unlink()
+        if rate and sent_count < len(targets):
+            # Only delivered copies count against the rate limit
+            _take_send_tokens(sender_mail_dir, rate, sent_count - len(targets))
     print(f"Mail sent to {sent_count} recipient(s).")
+    if refused:
+        print(f"Not delivered (inbox full): {', '.join(refused)}. Retry after {retry_after}s.", file=sys.stderr)
 
-def list_mail(show_all=False, show_sent=False, show_archive=False, json_output=True):
+def list_mail(show_all=False, show_sent=False, show_archive=False, json_output=True, jsonl=False,
+              limit: Optional[int] = None, offset: int = 0, since: Optional[str] = None,
+              sender: Optional[str] = None, subject_contains: Optional[str] = None, threads=False):
     """List mails."""
     folders = ["sent"] if show_sent else (["archive"] if show_archive else (["inbox", "read"] if show_all else ["inbox"]))
-    mails = get_messages(folders=folders)
-    
+    try:
+        # Threads are grouped from all matching messages; the limit applies to threads
+        mails = get_messages(folders=folders, limit=None if threads else limit, offset=0 if threads else offset,
+                             since=since, sender=sender, subject_contains=subject_contains)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if threads:
+        summaries = mail_threads.summarize(mails)
+        summaries = summaries[offset:offset + limit] if limit is not None else summaries[offset:]
+        if jsonl:
+            for t in summaries:
+                print(json.dumps(t, ensure_ascii=False))
+        elif json_output:
+            print(json.dumps(summaries, indent=2, ensure_ascii=False))
+        elif not summaries:
+            print("No messages.")
+        else:
+            print(f"{'THREAD':<36} {'MSGS':>4} {'NEW':>3} {'LAST':<20} {'PARTICIPANTS':<40} {'SUBJECT'}")
+            print("-" * 140)
+            for t in summaries:
+                print(f"{t['thread']:<36} {t['count']:>4} {t['unread']:>3} {t['last_date'][:19]:<20} "
+                      f"{', '.join(t['participants'])[:40]:<40} {t['subject']}")
+        return
+
+    if jsonl or json_output:
+        # JSON keeps the body; only the table is served from the index alone
+        for m in mails:
+            m.get("body", "")
+    if jsonl:
+        for m in mails:
+            print(json.dumps(m, ensure_ascii=False))
+        return
+
     if json_output:
         print(json.dumps(mails, indent=2, ensure_ascii=False))
         return
@@ -256,14 +639,384 @@ def list_mail(show_all=False, show_sent=False, show_archive=False, json_output=T
         print("No messages.")
         return
 
-    print(f"{'ID':<20} {'DATE':<20} {'FROM':<30} {'TO':<30} {'FOLDER':<8} {'SUBJECT'}")
-    print("-" * 140)
+    print(f"{'ID':<36} {'DATE':<20} {'FROM':<30} {'TO':<30} {'FOLDER':<8} {'SUBJECT'}")
+    print("-" * 156)
     for m in mails:
-        print(f"{m.get('id'):<20} {m.get('date_str')[:19]:<20} {m.get('from'):<30} {m.get('to'):<30} {m['_folder']:<8} {m.get('subject')}")
+        marker = f"[{m['priority']}] " if m.get('priority') in ("urgent", "high") else ""
+        print(f"{m.get('id'):<36} {m.get('date_str')[:19]:<20} {m.get('from'):<30} {m.get('to'):<30} {m['_folder']:<8} {marker}{m.get('subject')}")
+
+def reindex_mail(agent_name: Optional[str] = None):
+    """Rebuild a mailbox index from the .eml files on disk."""
+    name, mail_dir = _get_sender_info(agent_name)
+    if not mail_dir.exists():
+        print(f"No mailbox for {name}.")
+        return
+    count = mail_index.rebuild(mail_dir)
+    mail_threads.rebuild(mail_dir, mail_index.load(mail_dir))
+    mail_search.drop(mail_dir)
+    print(f"Reindexed {count} message(s) for {name}.")
+
+def projects_mail(compact: bool = False, json_output: bool = False):
+    """List projects registered for mail; with compact, drop duplicates and deleted projects first."""
+    if compact:
+        kept, removed = mail_projects.compact(PROJECT_LIST_FILE)
+        if not json_output:
+            print(f"Removed {removed} stale entr{'y' if removed == 1 else 'ies'}, {kept} project(s) registered.")
+    projects = mail_projects.list_projects(PROJECT_LIST_FILE)
+    if json_output:
+        print(json.dumps(projects, indent=2))
+        return
+    for project in projects:
+        print(project)
+
+def _compaction_policy() -> Dict[str, Any]:
+    policy_config = _get_mail_config().get('compaction', {}) or {}
+    return {
+        'folders': policy_config.get('folders', COMPACT_FOLDERS),
+        'older_than': str(policy_config.get('older_than', COMPACT_OLDER_THAN)),
+        'max_files': policy_config.get('max_files', COMPACT_MAX_FILES),
+    }
+
+def compact_mailbox(mail_dir: Path, folders: List[str], older_than: str, min_files: int = 0) -> Dict[str, int]:
+    """Pack old messages of the given folders into segments. Returns {folder: packed count}."""
+    cutoff = _parse_since(older_than)
+    packed = {}
+    for folder in folders:
+        folder_dir = mail_dir / folder
+        if not folder_dir.is_dir() or mail_segments.count_files(folder_dir) <= min_files:
+            continue
+        packed[folder] = mail_segments.pack(folder_dir, cutoff)
+    return packed
+
+def compact_mail(agent_name: Optional[str] = None, folders: Optional[List[str]] = None,
+                 older_than: Optional[str] = None):
+    """`ucas mail compact`: pack old read/archived messages into segment files."""
+    name, mail_dir = _get_sender_info(agent_name)
+    if not mail_dir.exists():
+        print(f"No mailbox for {name}.")
+        return
+    compaction = _compaction_policy()
+    try:
+        packed = compact_mailbox(mail_dir, folders or compaction['folders'], older_than or compaction['older_than'])
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    total = sum(packed.values())
+    details = ", ".join(f"{folder}: {count}" for folder, count in packed.items())
+    print(f"Packed {total} message(s) for {name}" + (f" ({details})." if details else "."))
+
+def _auto_compact(mail_dir: Path):
+    """Compaction policy of `mail check`: pack a folder once it holds more than max_files files."""
+    compaction = _compaction_policy()
+    if not compaction['max_files']:
+        return
+    try:
+        compact_mailbox(mail_dir, compaction['folders'], compaction['older_than'], compaction['max_files'])
+    except Exception:
+        pass  # Never let housekeeping break a mail check
+
+def _retention_rules() -> Dict[str, Dict[str, Any]]:
+    """
+    Rules of `mail.retention` by folder: {cutoff (epoch) or None, max_count or None, action}.
+    Raises ValueError for an invalid rule.
+    """
+    config = _get_mail_config().get('retention', {}) or {}
+    if not isinstance(config, dict):
+        raise ValueError("mail.retention must map folders to rules")
+    unknown = sorted(set(config) - set(mail_index.FOLDERS))
+    if unknown:
+        raise ValueError(f"Unknown retention folder: {', '.join(map(str, unknown))}")
+    rules = {}
+    for folder in mail_index.FOLDERS:
+        rule = config.get(folder)
+        if rule is None:
+            continue
+        if not isinstance(rule, dict):
+            raise ValueError(f"Invalid retention rule for {folder}: {rule!r}")
+        action = rule.get('action', 'delete' if folder == 'archive' else 'archive')
+        if action not in ('archive', 'delete') or (folder == 'archive' and action == 'archive'):
+            raise ValueError(f"Invalid retention action for {folder}: {action}")
+        max_age, max_count = rule.get('max_age'), rule.get('max_count')
+        if max_age is None and max_count is None:
+            continue
+        try:
+            cutoff = _parse_since(str(max_age)) if max_age is not None else None
+        except ValueError:
+            raise ValueError(f"Invalid retention max_age for {folder}: {max_age}")
+        try:
+            max_count = int(max_count) if max_count is not None else None
+        except (TypeError, ValueError):
+            max_count = -1
+        if max_count is not None and max_count < 0:
+            raise ValueError(f"Invalid retention max_count for {folder}: {rule.get('max_count')}")
+        rules[folder] = {'cutoff': cutoff, 'max_count': max_count, 'action': action}
+    return rules
+
+def _message_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        rec = mail_segments.locate(path)
+        return rec[2] if rec else 0
+
+def _delete_message(mail_dir: Path, mail_id: str, path: str) -> bool:
+    """Delete a located message (file or packed) and drop it from the index."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        if mail_segments.locate(path) is None:
+            return False  # Moved or deleted by someone else meanwhile
+        mail_segments.remove(os.path.dirname(path), mail_id)
+    mail_index.record_remove(mail_dir, mail_id)
+    return True
+
+def apply_retention(mail_dir: Path, rules: Dict[str, Dict[str, Any]], budget: Optional[int] = None,
+                    dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Archive or delete the messages that break a folder's retention rule,
+    oldest first, at most `budget` in total. Returns per folder
+    {"archived": n, "deleted": n, "bytes": bytes deleted}.
+    """
+    report: Dict[str, Dict[str, int]] = {}
+    if not rules:
+        return report
+    entries = mail_index.load(mail_dir, list(rules))
+    remaining = budget
+    for folder, rule in rules.items():
+        if remaining is not None and remaining <= 0:
+            break
+        in_folder = sorted((e for e in entries.values() if e['folder'] == folder), key=mail_index.sort_key)
+        excess = len(in_folder) - rule['max_count'] if rule['max_count'] is not None else 0
+        stats = {'archived': 0, 'deleted': 0, 'bytes': 0}
+        for i, entry in enumerate(in_folder):
+            if remaining is not None and remaining <= 0:
+                break
+            expired = rule['cutoff'] is not None and (entry.get('timestamp') or 0) < rule['cutoff']
+            if i >= excess and not expired:
+                if rule['cutoff'] is None:
+                    break  # Oldest first: nothing further is over the count
+                continue
+            path = os.path.join(str(mail_dir), folder, f"{entry['id']}.eml")
+            size = _message_size(path)
+            if rule['action'] == 'archive':
+                if not dry_run and not _move_message(mail_dir, entry['id'], path, 'archive'):
+                    continue
+                stats['archived'] += 1
+            else:
+                if not dry_run and not _delete_message(mail_dir, entry['id'], path):
+                    continue
+                stats['deleted'] += 1
+                stats['bytes'] += size
+            if remaining is not None:
+                remaining -= 1
+        if stats['archived'] or stats['deleted']:
+            report[folder] = stats
+    return report
+
+def enforce_retention(agent_name: Optional[str] = None):
+    """
+    Incremental retention for the current mailbox, run by every `ucas mail`
+    command: at most RETENTION_BATCH messages, at most once per
+    RETENTION_INTERVAL (checked with one stat before any config is read).
+    The stamp is written even without rules, so a mailbox without them costs
+    one stat per command; an invalid `mail.retention` is reported on stderr
+    (once per interval) and does not stop the command.
+    """
+    _, mail_dir = _get_sender_info(agent_name)
+    stamp = mail_dir / RETENTION_STAMP
+    try:
+        if time.time() - os.stat(stamp).st_mtime < RETENTION_INTERVAL:
+            return
+    except FileNotFoundError:
+        if not mail_dir.is_dir():
+            return
+    try:
+        stamp.touch()  # Concurrent invocations skip while this one works
+    except OSError:
+        return  # Read-only or vanishing mailbox: housekeeping never breaks a mail command
+    try:
+        rules = _retention_rules()
+    except ValueError as e:
+        print(f"Warning: mail.retention ignored: {e}", file=sys.stderr)
+        return
+    if not rules:
+        return
+    try:
+        apply_retention(mail_dir, rules, RETENTION_BATCH)
+    except OSError:
+        pass
+
+def _prune_tmp(mail_dir: Path, dry_run: bool = False) -> Tuple[int, int]:
+    """Remove files left in tmp/ by interrupted deliveries. Returns (files, bytes)."""
+    cutoff = time.time() - TMP_MAX_AGE
+    files = size = 0
+    try:
+        with os.scandir(mail_dir / "tmp") as it:
+            for e in it:
+                try:
+                    st = e.stat()
+                    if not e.is_file() or st.st_mtime >= cutoff:
+                        continue
+                    if not dry_run:
+                        os.unlink(e.path)
+                except FileNotFoundError:
+                    continue
+                files += 1
+                size += st.st_size
+    except FileNotFoundError:
+        pass
+    return files, size
+
+def _collect_blobs(mail_dir: Path, dry_run: bool = False) -> Tuple[int, int]:
+    """Remove blobs no mailbox sharing mail_dir's store refers to. Returns (files, bytes)."""
+    store = mail_blobs.store_for(mail_dir)
+    if not store.is_dir():
+        return 0, 0
+    referenced = set()
+    for box in store.parent.iterdir():
+        if box.is_dir() and not box.name.startswith("."):
+            referenced.update(e["blob"] for e in mail_index.load(box).values() if e.get("blob"))
+    return mail_blobs.collect(store, referenced, time.time(), dry_run)
+
+def gc_mail(agent_name: Optional[str] = None, dry_run: bool = False, json_output: bool = False):
+    """`ucas mail gc`: apply the retention rules in full and reclaim space."""
+    name, mail_dir = _get_sender_info(agent_name)
+    if not mail_dir.exists():
+        print(f"No mailbox for {name}.")
+        return
+    try:
+        rules = _retention_rules()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report: Dict[str, Any] = {"agent": name, "dry_run": dry_run}
+    report["folders"] = apply_retention(mail_dir, rules, dry_run=dry_run)
+    report["tmp_files"], report["tmp_bytes"] = _prune_tmp(mail_dir, dry_run)
+    report["segment_bytes"] = 0
+    report["index_bytes"] = 0
+    if not dry_run:
+        for folder in mail_index.FOLDERS:
+            report["segment_bytes"] += mail_segments.drop_dead(mail_dir / folder)
+        index_file = mail_dir / mail_index.INDEX_FILE
+        if index_file.exists():
+            before = index_file.stat().st_size
+            mail_index.load(mail_dir)  # Reconciled first, so the rewrite drops stale entries
+            mail_index.compact(mail_dir)
+            report["index_bytes"] = max(0, before - index_file.stat().st_size)
+        (mail_dir / RETENTION_STAMP).touch()
+    report["blob_files"], report["blob_bytes"] = _collect_blobs(mail_dir, dry_run)
+    deleted_bytes = sum(stats["bytes"] for stats in report["folders"].values())
+    report["reclaimed_bytes"] = (deleted_bytes + report["tmp_bytes"] + report["segment_bytes"]
+                                 + report["index_bytes"] + report["blob_bytes"])
+
+    if json_output:
+        print(json.dumps(report, indent=2))
+        return
+    prefix = "Would reclaim" if dry_run else "Reclaimed"
+    for folder, stats in report["folders"].items():
+        print(f"{folder:<8} archived {stats['archived']}, deleted {stats['deleted']} ({stats['bytes']} bytes)")
+    if report["tmp_files"]:
+        print(f"tmp      {report['tmp_files']} stale file(s) ({report['tmp_bytes']} bytes)")
+    if report["blob_files"]:
+        print(f"blobs    {report['blob_files']} unreferenced ({report['blob_bytes']} bytes)")
+    print(f"{prefix} {report['reclaimed_bytes']} bytes for {name}.")
+
+def _format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if value >= size:
+            return f"{value / size:.1f}{unit}"
+    return f"{value:.1f}s"
+
+def stats_mail(agent_name: Optional[str] = None, json_output: bool = False, all_agents: bool = False):
+    """`ucas mail stats`: backlog, send-to-read latency, hourly rates and top senders."""
+    if all_agents:
+        mails_dir = _get_project_root() / ".ucas" / MAIL_SUBDIR
+        boxes = [(d.name, d) for d in sorted(mails_dir.iterdir()) if _is_agent_dir(d)] \
+            if mails_dir.is_dir() else []
+    else:
+        boxes = [_get_sender_info(agent_name)]
+    reports = [dict(agent=name, **mail_stats.summary(mail_dir)) for name, mail_dir in boxes if mail_dir.exists()]
+    if not reports:
+        print("No mailboxes in this project." if all_agents else f"No mailbox for {boxes[0][0]}.")
+        return
+
+    if json_output:
+        print(json.dumps(reports if all_agents else reports[0], indent=2, ensure_ascii=False))
+        return
+
+    if all_agents:
+        print(f"{'AGENT':<20} {'INBOX':>6} {'OLDEST':>8} {'P50':>8} {'P90':>8} {'RECV/H':>7} {'SENT/H':>7} {'READ/H':>7}")
+        print("-" * 80)
+        for r in reports:
+            lat, rate = r['latency'], r['per_hour']
+            print(f"{r['agent']:<20} {r['backlog']['inbox']:>6} {_format_seconds(r['oldest_unread_age']):>8} "
+                  f"{_format_seconds(lat['p50']):>8} {_format_seconds(lat['p90']):>8} "
+                  f"{rate['received']:>7} {rate['sent']:>7} {rate['read']:>7}")
+        return
+
+    r = reports[0]
+    lat, rate = r['latency'], r['per_hour']
+    print(f"Mailbox: {r['agent']}")
+    print("Backlog: " + ", ".join(f"{folder} {count}" for folder, count in r['backlog'].items()))
+    print(f"Oldest unread: {_format_seconds(r['oldest_unread_age'])}")
+    print(f"Send-to-read latency ({lat['count']} read): p50 {_format_seconds(lat['p50'])}, "
+          f"p90 {_format_seconds(lat['p90'])}, p99 {_format_seconds(lat['p99'])}, max {_format_seconds(lat['max'])}")
+    print(f"Per hour (last 24h): received {rate['received']}, sent {rate['sent']}, read {rate['read']}")
+    if r['top_senders']:
+        print("Top senders: " + ", ".join(f"{s['from']} ({s['count']})" for s in r['top_senders']))
+
+def thread_mail(mail_id: str, json_output=True):
+    """Show the conversation a message belongs to, oldest first."""
+    name, mail_dir = _get_sender_info()
+    hit = mail_index.resolve(mail_dir, mail_id) if mail_dir.exists() else None
+    if not hit:
+        if json_output:
+            print(json.dumps({"error": "Not found"}))
+        else:
+            print("Not found.")
+        return
+
+    msgs = mail_threads.get_thread(mail_dir, mail_index.read_entry(Path(hit[2]), hit[1]))
+    if json_output:
+        print(json.dumps(msgs, indent=2, ensure_ascii=False))
+        return
+    for m in msgs:
+        indent = "  " * m['depth']
+        print(f"{indent}{m['id']}  [{m['folder']}]  {m.get('from')}")
+        print(f"{indent}  {m.get('subject')}")
+
+def search_mail(query: str, folders: Optional[List[str]] = None, sender: Optional[str] = None,
+                limit: int = 20, json_output=True):
+    """Full-text search of the current agent's mailbox, best matches first."""
+    name, mail_dir = _get_sender_info()
+    if not mail_dir.exists():
+        results = []
+    else:
+        try:
+            results = mail_search.search(mail_dir, query, folders, sender, limit)
+        except mail_search.SearchUnavailable as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if json_output:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    if not results:
+        print("No matches.")
+        return
+    print(f"{'ID':<36} {'FOLDER':<8} {'SCORE':>7} {'FROM':<30} {'SUBJECT'}")
+    print("-" * 120)
+    for r in results:
+        print(f"{r['id']:<36} {r['folder']:<8} {r['score']:>7.2f} {(r['from'] or ''):<30} {r['subject']}")
+        print(f"{'':<36} {r['snippet']}")
 
 def read_mail(mail_id: str, json_output=True):
     """Read a specific mail by ID. Moves from inbox to read."""
-    data, path, folder = get_message_content(mail_id)
+    data, path, folder = get_message_content(mail_id, headers_only=True)
     if not data:
         if json_output:
             print(json.dumps({"error": "Not found"}))
@@ -272,22 +1025,158 @@ def read_mail(mail_id: str, json_output=True):
         return
     
     if json_output:
+        data._load_body()
         print(json.dumps(data, indent=2, ensure_ascii=False))
     else:
         for k in ['From', 'To', 'Date', 'Subject']:
             print(f"{k:<8}: {data.get(k.lower())}")
-        print("-" * 40 + "\n" + data.get('body', '') + "\n" + "-" * 40)
+        if data.get('blob'):
+            # Large body: copied from the blob store in chunks
+            print("-" * 40, flush=True)
+            mail_blobs.stream(mail_blobs.store_of_message(path), data['blob'], sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+            print("\n" + "-" * 40)
+        else:
+            print("-" * 40 + "\n" + data.get('body', '') + "\n" + "-" * 40)
         
     if folder == "inbox":
-        mark_as_read(mail_id)
+        _move_message(path.parent.parent, data["id"], str(path), "read")
+
+def _stat_signature(path) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def _build_project_contacts(root: Path) -> Tuple[List[Dict[str, str]], List[str]]:
+    """
+    Contacts of one project (local agents, queues, configured entries) and the
+    paths they depend on. Missing paths are dependencies too: creating them
+    (a project ucas.yaml, a mod for an agent) must invalidate the cache.
+    """
+    # Needs to import config loaders. Importing inside function to avoid circular imports if any
+    from .resolver import get_layer_config_paths, load_config_file, get_search_paths, find_entity, load_config
+    from .merger import _merge_dicts
+
+    contacts: List[Dict[str, str]] = []
+    ucas_home = Path(os.environ.get('UCAS_HOME') or Path(__file__).parent.parent)
+    deps = [ucas_home, Path.home() / ".ucas", root / ".ucas"]
+
+    # Load merged config to get mail-addressbook
+    (sys_cfg, _), (usr_cfg, _), (prj_cfg, _) = get_layer_config_paths(root)
+    merged_config = {}
+    for layer_name, cfg in [('System', sys_cfg), ('User', usr_cfg), ('Project', prj_cfg)]:
+        if cfg:
+            deps.append(cfg)
+            merged_config = _merge_dicts(merged_config, load_config_file(cfg), False, f"Base:{layer_name}")
+
+    # Load search paths to find local agent mods for descriptions
+    extra_paths = merged_config.get('mod_path', [])
+    if isinstance(extra_paths, str):
+        extra_paths = [extra_paths]
+    deps.extend(Path(p) if Path(p).is_absolute() else root / p for p in extra_paths)
+    search_paths = get_search_paths(extra_paths, merged_config.get('strict', False), project_root=root)
+
+    mails_dir = root / ".ucas" / MAIL_SUBDIR
+    deps.append(mails_dir)
+    if mails_dir.exists():
+        for item in sorted(mails_dir.iterdir()):
+            # Skip USER (only lowercase names are agents)
+            if not _is_agent_dir(item):
+                continue
+            deps.append(item / QUEUE_MARKER)
+            if _is_queue(item):
+                contacts.append({
+                    "address": item.name,
+                    "type": "Queue",
+                    "desc": "Work queue (claimed by one replica)"
+                })
+                continue
+
+            # Try to find mod for this agent to get description
+            desc = "Local Agent"
+            mod_path = find_entity(item.name, search_paths)
+            # A mod added earlier in the search order would take precedence
+            for base_path in search_paths:
+                deps.append(base_path / item.name / "ucas.yaml")
+                if mod_path and base_path / item.name == mod_path:
+                    break
+            if mod_path:
+                try:
+                    mod_cfg = load_config(mod_path)
+                    if mod_cfg.get('description'):
+                        desc = mod_cfg.get('description')
+                except:
+                    pass
+
+            contacts.append({
+                "address": item.name,
+                "type": "Agent",
+                "desc": desc
+            })
+
+    # Load configured mail-addressbook entries (external contacts)
+    configured_book = merged_config.get('mail-addressbook', {})
+    if isinstance(configured_book, dict):
+        for addr, desc in configured_book.items():
+            # Check if already exists (from local agents)
+            existing = next((c for c in contacts if c['address'] == addr), None)
+            if existing:
+                # Override description if it was "Local Agent"
+                if existing['desc'] == "Local Agent":
+                    existing['desc'] = desc
+            else:
+                # Add new entry
+                address_type = "External" if "@" in addr else "Configured"
+                contacts.append({
+                    "address": addr,
+                    "type": address_type,
+                    "desc": desc
+                })
+
+    return contacts, [str(d) for d in deps]
+
+def _address_book_cache_file(root: Path) -> Path:
+    key = json.dumps([str(root), os.environ.get('UCAS_HOME', ''), str(Path.home())])
+    return ADDRESS_BOOK_CACHE_DIR / (hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+
+def _project_contacts(root: Path) -> List[Dict[str, str]]:
+    """Contacts of a project from its cache file; rebuilt when any dependency changed."""
+    cache_file = _address_book_cache_file(root)
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        if all(_stat_signature(path) == sig for path, sig in cached["deps"]):
+            return cached["contacts"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    # Created first so that creating it does not invalidate the entry written below
+    ADDRESS_BOOK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    contacts, deps = _build_project_contacts(root)
+    try:
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({
+            "root": str(root),
+            "deps": [[path, _stat_signature(path)] for path in deps],
+            "contacts": contacts,
+        }), encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+    return contacts
 
-def get_address_book() -> List[Dict[str, str]]:
+def get_address_book(include_projects: bool = False) -> List[Dict[str, str]]:
     """
     Get list of known contacts.
     Combines:
     1. USER (System)
     2. Local Agents in .ucas/mails (read description from mod if available)
     3. Entries in `mail-addressbook` from ucas.yaml (Merged Config)
+    4. With include_projects: agents of the other registered projects (`name@root`)
+
+    The per-project part is cached (see ADDRESS_BOOK_CACHE_DIR) and rebuilt only
+    when the mails directory, a layer config or a mod config it used changed.
     """
     contacts = [
         {"address": USER_AGENT_NAME, "type": "System", "desc": "Human User"},
@@ -297,117 +1186,117 @@ def get_address_book() -> List[Dict[str, str]]:
     current_agent = os.environ.get("UCAS_AGENT")
     root = _get_project_root()
 
-    # Needs to import config loaders. Importing inside function to avoid circular imports if any
     try:
-        from .resolver import get_layer_config_paths, load_config_file, get_search_paths, find_entity, load_config
-        from .merger import _merge_dicts
-
-        # Load merged config to get mail-addressbook
-        (sys_cfg, _), (usr_cfg, _), (prj_cfg, _) = get_layer_config_paths()
-        merged_config = {}
-        for layer_name, cfg in [('System', sys_cfg), ('User', usr_cfg), ('Project', prj_cfg)]:
-            if cfg:
-                merged_config = _merge_dicts(merged_config, load_config_file(cfg), False, f"Base:{layer_name}")
-
-        # Load search paths to find local agent mods for descriptions
-        extra_paths = merged_config.get('mod_path', [])
-        if isinstance(extra_paths, str):
-            extra_paths = [extra_paths]
-        search_paths = get_search_paths(extra_paths, merged_config.get('strict', False))
-
-        mails_dir = root / ".ucas" / MAIL_SUBDIR
-        if mails_dir.exists():
-            for item in mails_dir.iterdir():
-                if item.is_dir() and item.name.islower():
-                    # Skip USER and skip if this is current agent
-                    if item.name == USER_AGENT_NAME:
-                        continue
-                    if item.name == current_agent:
-                        continue
-
-                    # Try to find mod for this agent to get description
-                    desc = "Local Agent"
-                    mod_path = find_entity(item.name, search_paths)
-                    if mod_path:
-                        try:
-                            mod_cfg = load_config(mod_path)
-                            if mod_cfg.get('description'):
-                                desc = mod_cfg.get('description')
-                        except:
-                            pass
-
-                    contacts.append({
-                        "address": item.name,
-                        "type": "Agent",
-                        "desc": desc
-                    })
-
-        # Load configured mail-addressbook entries (external contacts)
-        configured_book = merged_config.get('mail-addressbook', {})
-        if isinstance(configured_book, dict):
-            for addr, desc in configured_book.items():
-                # Check if already exists (from local agents)
-                existing = next((c for c in contacts if c['address'] == addr), None)
-                if existing:
-                    # Override description if it was "Local Agent"
-                    if existing['desc'] == "Local Agent":
-                        existing['desc'] = desc
-                else:
-                    # Add new entry
-                    address_type = "External" if "@" in addr else "Configured"
-                    contacts.append({
-                        "address": addr,
-                        "type": address_type,
-                        "desc": desc
-                    })
-
+        for contact in _project_contacts(root):
+            # Skip the current agent itself
+            if contact["type"] in ("Agent", "Queue") and contact["address"] == current_agent:
+                continue
+            contacts.append(contact)
     except Exception:
         pass
 
+    if include_projects:
+        for project in mail_projects.list_projects(PROJECT_LIST_FILE, existing_only=True):
+            if Path(project) == root:
+                continue
+            try:
+                project_contacts = _project_contacts(Path(project))
+            except Exception:
+                continue
+            for contact in project_contacts:
+                if contact["type"] in ("Agent", "Queue"):
+                    contacts.append(dict(contact, address=f"{contact['address']}@{project}", project=project))
+
     return contacts
 
-def _get_mail_config() -> Dict[str, Any]:
-    """Get merged mail configuration from all layers."""
+def _config_files(project_root: Path) -> List[Path]:
+    """Files merge_configs reads for a project without mods (existing or not)."""
+    ucas_home = Path(os.environ.get('UCAS_HOME') or Path(__file__).parent.parent)
+    layers = (ucas_home, Path.home() / ".ucas", project_root / ".ucas")
+    return [base / name for base in layers for name in ("ucas.yaml", "ucas-override.yaml")] + \
+        [project_root / "ucas.yaml"]
+
+
+def _get_mail_config(project_root: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Merged mail configuration of a project (default: the current one). Cached
+    per project and merged again only when one of its config files changes,
+    so long-running commands (watch, GUI) pick up edits for a few stats.
+    """
+    root = Path(project_root).resolve() if project_root else _get_project_root()
+    signature = [_stat_signature(path) for path in _config_files(root)]
+    cached = _mail_configs.get(root)
+    if cached and cached[0] == signature:
+        return cached[1]
     try:
-        project_root = _get_project_root()
-        merged = merge_configs(project_root, [], [], project_root=project_root)
-        return merged.get('mail', {})
+        merged = merge_configs(root, [], [], project_root=root)
     except Exception:
         return {}
+    config = merged.get('mail', {}) or {}
+    _mail_configs[root] = (signature, config)
+    return config
 
 
-def _run_notification(msg_data: Dict[str, Any], project_root: Optional[Path] = None):
-    """Execute user-configured notification command when new mail arrives."""
-    mail_config = _get_mail_config()
-    notification_config = mail_config.get('notifications', {})
-    command_template = notification_config.get('on_new_mail', '').strip()
+def _get_notification_config() -> Dict[str, Any]:
+    """Notification settings of the current project."""
+    return _get_mail_config().get('notifications', {}) or {}
 
-    if not command_template:
-        return  # No notification configured
 
-    # Substitute variables
-    variables = {
-        'subject': msg_data.get('subject', '') or 'No subject',
-        'from': msg_data.get('from', '') or 'Unknown',
-        'id': msg_data.get('id', ''),
-        'date': msg_data.get('date_str', ''),
-    }
+def _format_notification(template: str, variables: Dict[str, str]) -> str:
+    command = template
+    for key, value in variables.items():
+        command = command.replace(f'{{{key}}}', shlex.quote(value))
+    return command
 
-    try:
-        command = command_template
-        for key, value in variables.items():
-            escaped_value = shlex.quote(value)
-            command = command.replace(f'{{{key}}}', escaped_value)
 
-        subprocess.run(command, shell=True, check=False, capture_output=True)
+def _spawn_notification(command: str):
+    """Start a notification command without waiting for it."""
+    try:
+        subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
     except Exception:
         # Silently fail on notification errors to not break mail delivery
         pass
 
 
-def print_address_book(json_output=True):
+def _notify_new_mail(msgs: List[Dict[str, Any]]):
+    """
+    Execute the user-configured notification for new mail: one per message, or
+    a single summary when a burst reaches `summary_threshold` messages.
+    """
+    config = _get_notification_config()
+    template = (config.get('on_new_mail') or '').strip()
+    summary_template = (config.get('on_new_mail_summary') or '').strip() or template
+    if not msgs or not summary_template:
+        return  # No notification configured
+
+    threshold = config.get('summary_threshold', NOTIFY_SUMMARY_THRESHOLD)
+    if threshold and len(msgs) >= threshold:
+        senders = list(dict.fromkeys(m.get('from') or 'Unknown' for m in msgs))
+        _spawn_notification(_format_notification(summary_template, {
+            'count': str(len(msgs)),
+            'subject': f"{len(msgs)} new messages",
+            'subjects': "; ".join(m.get('subject') or 'No subject' for m in msgs),
+            'from': ", ".join(senders),
+            'id': msgs[0].get('id', ''),
+            'date': msgs[0].get('date_str', ''),
+        }))
+        return
+
+    if not template:
+        return
+    for msg in msgs:
+        _spawn_notification(_format_notification(template, {
+            'subject': msg.get('subject', '') or 'No subject',
+            'from': msg.get('from', '') or 'Unknown',
+            'id': msg.get('id', ''),
+            'date': msg.get('date_str', ''),
+        }))
+
+
+def print_address_book(json_output=True, include_projects=False):
     """Print address book."""
-    contacts = get_address_book()
+    contacts = get_address_book(include_projects)
     if json_output:
         print(json.dumps(contacts, indent=2, ensure_ascii=False))
         return
@@ -432,20 +1321,207 @@ Use `ucas mail check --idle` to wait for tasks. Use `ucas mail send` with `--bod
 - NEVER use `ucas run` to send messages to other agents. Use ONLY `ucas mail send`.
 - Report to the human user (USER) only via `ucas mail send USER`."""
 
-def check_mail(idle=False):
+def _has_mail(inbox: Path) -> bool:
+    try:
+        with os.scandir(inbox) as it:
+            return any(e.name.endswith(".eml") for e in it)
+    except FileNotFoundError:
+        return False
+
+def _wait_for_mail(mail_dir: Path, queue: Optional[str] = None, timeout: Optional[float] = None,
+                   poll_only: bool = False) -> bool:
+    """
+    Block until mail_dir's inbox has a message (claiming from the queue if given).
+    Wakes on inotify events, with a slow rescan as a safety net; polls every
+    IDLE_POLL_INTERVAL seconds where inotify is unavailable. Returns False on timeout.
+    """
+    inbox = mail_dir / "inbox"
+    watch = [inbox]
+    if queue:
+        queue_inbox = _get_agent_mail_dir(queue) / "inbox"
+        queue_inbox.mkdir(parents=True, exist_ok=True)
+        watch.append(queue_inbox)
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    with fswatch.DirWatcher(watch, poll_interval=IDLE_POLL_INTERVAL, poll_only=poll_only) as watcher:
+        rescan = IDLE_RESCAN_INTERVAL if watcher.uses_inotify else IDLE_POLL_INTERVAL
+        while True:
+            if queue and not _has_mail(inbox):
+                _claim_from_queue(queue, mail_dir)
+            if _has_mail(inbox):
+                return True
+            wait = rescan
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            watcher.wait(wait)
+
+def _parse_since(value: str) -> float:
+    """Parse --since: a duration ago (30s, 10m, 2h, 1d), epoch seconds or an ISO date/time."""
+    value = value.strip()
+    if value[-1:] in _DURATION_UNITS and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - _parse_duration(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid --since value: {value}")
+
+def _watch_targets(agents: Optional[List[str]] = None, projects: Optional[List[str]] = None) -> List[Tuple[str, Path]]:
+    """Resolve watch addresses to (address, mail_dir); a project means all of its mailboxes."""
+    targets = [_get_sender_info(agent) for agent in agents or []]
+    for project in projects or []:
+        root = Path(project).expanduser().resolve()
+        mails_dir = root / ".ucas" / MAIL_SUBDIR
+        if mails_dir.is_dir():
+            targets.extend((f"{d.name}@{root}", d) for d in sorted(mails_dir.iterdir())
+                           if d.is_dir() and not d.name.startswith(".") and not _is_queue(d))
+    if not agents and not projects:
+        targets.append(_get_sender_info())
+
+    unique = {}
+    for name, mail_dir in targets:
+        unique.setdefault(mail_dir.resolve(), name)
+    return [(name, mail_dir) for mail_dir, name in unique.items()]
+
+def _scan_names(folder_dir: Path) -> set:
+    try:
+        with os.scandir(folder_dir) as it:
+            return {e.name for e in it if e.name.endswith(".eml")}
+    except FileNotFoundError:
+        return set()
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+def watch_messages(targets: List[Tuple[str, Path]], folders: Optional[List[str]] = None,
+                   since: Optional[float] = None, mark_read: bool = False,
+                   timeout: Optional[float] = None, poll_only: bool = False,
+                   on_batch: Optional[Callable[[List[Dict]], None]] = None):
+    """
+    Yield each message that appears in the watched folders, oldest first, as a
+    header dict with `agent` set to the mailbox address. Messages already there
+    are skipped unless newer than `since` (epoch seconds). With mark_read, inbox
+    messages are moved to read once yielded. Stops after `timeout` seconds idle.
+    on_batch is called with each burst of messages found together, before they are yielded.
+    """
+    folders = folders or ["inbox"]
+    watched = []
+    for name, mail_dir in targets:
+        _ensure_mail_dirs(mail_dir)
+        watched.extend((name, mail_dir, folder) for folder in folders)
+    for _, mail_dir, folder in watched:
+        (mail_dir / folder).mkdir(parents=True, exist_ok=True)
+
+    # Per folder, the file names already handled; only new names get their headers read
+    seen = {}
+    with fswatch.DirWatcher([mail_dir / folder for _, mail_dir, folder in watched],
+                            poll_interval=IDLE_POLL_INTERVAL, poll_only=poll_only) as watcher:
+        rescan = IDLE_RESCAN_INTERVAL if watcher.uses_inotify else IDLE_POLL_INTERVAL
+        for name, mail_dir, folder in watched:
+            names = _scan_names(mail_dir / folder)
+            if since is not None:
+                names = {n for n in names if _mtime(mail_dir / folder / n) < since}
+            seen[(mail_dir, folder)] = names
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            fresh = []
+            for name, mail_dir, folder in watched:
+                folder_dir = mail_dir / folder
+                names = _scan_names(folder_dir)
+                known = seen[(mail_dir, folder)]
+                for file_name in names - known:
+                    try:
+                        msg = _parse_eml(folder_dir / file_name, folder, headers_only=True)
+                    except FileNotFoundError:
+                        continue  # Moved away before we got to it
+                    except mail_index.IncompleteMessage:
+                        names.discard(file_name)  # Still being written; retry on the next event
+                        continue
+                    msg["agent"] = name
+                    fresh.append((msg, mail_dir))
+                # Forget names that left the folder so the set stays bounded
+                seen[(mail_dir, folder)] = names
+
+            if fresh:
+                fresh.sort(key=lambda item: mail_index.sort_key(item[0]))
+                if on_batch:
+                    on_batch([msg for msg, _ in fresh])
+                for msg, mail_dir in fresh:
+                    yield msg
+                    if mark_read and msg["_folder"] == "inbox":
+                        file_name = os.path.basename(msg["_path"])
+                        if not _move_message(mail_dir, msg["id"], msg["_path"], "read"):
+                            continue  # Already read or archived elsewhere
+                        seen[(mail_dir, "inbox")].discard(file_name)
+                        if (mail_dir, "read") in seen:
+                            seen[(mail_dir, "read")].add(file_name)
+                if deadline is not None:
+                    deadline = time.monotonic() + timeout
+                continue
+
+            wait = rescan
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return
+            watcher.wait(wait)
+
+def watch_mail(agents: Optional[List[str]] = None, projects: Optional[List[str]] = None,
+               folders: Optional[List[str]] = None, since: Optional[str] = None,
+               mark_read: bool = False, body: bool = False, timeout: Optional[float] = None):
+    """Stream new messages as JSON lines until interrupted (or idle for `timeout` seconds)."""
+    try:
+        since_ts = _parse_since(since) if since else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    unknown = [f for f in folders or [] if f not in ("inbox", "read", "sent", "archive")]
+    if unknown:
+        print(f"Error: Unknown folder(s): {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    def notify(batch):
+        _notify_new_mail([m for m in batch if m["agent"] == USER_AGENT_NAME and m["_folder"] == "inbox"])
+
+    targets = _watch_targets(agents, projects)
+    try:
+        for msg in watch_messages(targets, folders, since_ts, mark_read, timeout, on_batch=notify):
+            if body:
+                msg.get("body")
+            print(json.dumps(msg, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+def check_mail(idle=False, timeout: Optional[float] = None):
     """Check for new mail."""
     info = _get_sender_info()
     inbox = info[1] / "inbox"
+    # Replicas take work from their group's queue, one message at a time
+    queue = os.environ.get("UCAS_QUEUE") or None  # Empty: not a replica
     if not inbox.exists():
-        if idle:
+        if idle or queue:
             _ensure_mail_dirs(inbox.parent)
         else:
             sys.exit(1)
 
+    if queue and not any(inbox.glob("*.eml")):
+        _claim_from_queue(queue, info[1])
+
+    _auto_compact(info[1])
+
     if idle:
         print(f"Waiting for mail in {inbox}...")
-        while not any(inbox.glob("*.eml")):
-            time.sleep(5)
+        _wait_for_mail(info[1], queue, timeout)
 
     if any(inbox.glob("*.eml")):
         # Important: call get_messages with agent_name explicitly from info
@@ -453,14 +1529,15 @@ def check_mail(idle=False):
         if msgs:
             # Run notification for USER agent only
             if info[0] == USER_AGENT_NAME:
-                for msg in msgs:
-                    _run_notification(msg, project_root=_get_project_root())
+                _notify_new_mail(msgs)
 
             print("\n*** NEW MAIL RECEIVED ***")
             for m in msgs:
                 print(f"ID:      {m['id']}")
                 print(f"From:    {m['from']}")
                 print(f"Subject: {m['subject']}")
+                if m.get('priority') and m['priority'] != "normal":
+                    print(f"Priority: {m['priority']}")
                 print(f"Command: ucas mail read {m['id']}")
                 print("-" * 40)
             sys.exit(0)
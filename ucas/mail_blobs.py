@@ -0,0 +1,132 @@
+"""
+Content-addressed store for large mail bodies: <mails dir>/.blobs/<sha256>
+
+A body above the threshold is written once per project (per USER mail root)
+instead of into every copy of the message. The message keeps a short text
+stub and two headers:
+
+    X-Ucas-Blob: <sha256 of the UTF-8 body>
+    X-Ucas-Blob-Size: <bytes>
+
+Blobs are immutable; writing an existing one only refreshes its mtime. A
+message delivered to another project gets the blob linked (or copied) into
+that project's store first, so every mailbox reads from its own store.
+Unreferenced blobs are removed by `ucas mail gc` once older than BLOB_GRACE,
+which covers sends that wrote the blob but have not delivered yet.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import IO, Iterable, Optional, Tuple
+
+BLOB_DIR = ".blobs"
+BLOB_HEADER = "X-Ucas-Blob"
+SIZE_HEADER = "X-Ucas-Blob-Size"
+# Bodies larger than this (UTF-8 bytes) go to the store; mail.blobs.threshold overrides
+DEFAULT_THRESHOLD = 64 * 1024
+# Unreferenced blobs younger than this are kept (a send may still be in flight)
+BLOB_GRACE = 3600
+_CHUNK = 64 * 1024
+
+
+def store_for(mail_dir: Path) -> Path:
+    """The store shared by all mailboxes next to mail_dir."""
+    return Path(mail_dir).parent / BLOB_DIR
+
+
+def store_of_message(path: Path) -> Path:
+    """The store of a message at <mail_dir>/<folder>/<id>.eml (file or packed)."""
+    return store_for(Path(path).parent.parent)
+
+
+def _blob_path(store: Path, digest: str) -> Path:
+    if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+        raise ValueError(f"Invalid blob reference: {digest!r}")
+    return Path(store) / digest
+
+
+def put(store: Path, data: bytes) -> str:
+    """Store data (if not there yet) and return its digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    target = _blob_path(store, digest)
+    try:
+        os.utime(target)  # Already stored: keep it out of the GC grace window
+        return digest
+    except FileNotFoundError:
+        pass
+    os.makedirs(store, exist_ok=True)
+    tmp = Path(store) / f".{digest}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)  # Same content either way, so a concurrent writer is harmless
+    return digest
+
+
+def ensure(store: Path, source_store: Path, digest: str):
+    """Make a blob of source_store available in store (hardlink, else copy)."""
+    target = _blob_path(store, digest)
+    if Path(store).resolve() == Path(source_store).resolve() or target.exists():
+        return
+    os.makedirs(store, exist_ok=True)
+    source = _blob_path(source_store, digest)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        tmp = Path(store) / f".{digest}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+
+
+def open_blob(store: Path, digest: str) -> IO[bytes]:
+    return open(_blob_path(store, digest), "rb")
+
+
+def read_text(store: Path, digest: str) -> str:
+    with open_blob(store, digest) as f:
+        return f.read().decode("utf-8", "replace")
+
+
+def stream(store: Path, digest: str, out: IO[bytes]):
+    """Copy a blob to a binary stream in chunks, without loading it whole."""
+    with open_blob(store, digest) as f:
+        shutil.copyfileobj(f, out, _CHUNK)
+
+
+def collect(store: Path, referenced: Iterable[str], now: float, dry_run: bool = False,
+            grace: float = BLOB_GRACE) -> Tuple[int, int]:
+    """Remove blobs that no message references. Returns (files, bytes)."""
+    keep = set(referenced)
+    files = size = 0
+    try:
+        names = os.listdir(store)
+    except FileNotFoundError:
+        return 0, 0
+    for name in names:
+        # Leftover tmp files of interrupted writes go the same way
+        path = os.path.join(str(store), name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if name in keep or now - st.st_mtime < grace:
+            continue
+        if not dry_run:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+        files += 1
+        size += st.st_size
+    return files, size
+
+
+def reference(headers) -> Optional[str]:
+    """The blob digest a message (or header mapping) refers to, if any."""
+    value = headers.get(BLOB_HEADER)
+    return str(value).strip() if value else None
@@ -2,14 +2,108 @@
 Advanced Tkinter GUI for UCAS Mail.
 Identifies everything by absolute project PATH.
 Sidebar shows absolute paths. Only lowercase agent names permitted.
+
+All mailbox access (scanning projects, listing, reading, moving) runs on one
+loader thread; results come back to the Tk thread through a queue that is
+drained every POLL_MS. Lists are filled ROW_CHUNK rows per tick, and both
+trees are updated by diff, so refreshing keeps selection and scroll position.
 """
 
 import sys
 import os
+import queue
+import threading
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
 from . import mail
+from . import mail_index
+from . import mail_projects
+
+# Rows inserted into the message list per UI tick
+ROW_CHUNK = 200
+# Interval (ms) at which the UI thread picks up loader results
+POLL_MS = 50
+
+
+def _agent_label(name: str, mail_dir: Path) -> str:
+    unread = mail_index.counts(mail_dir).get("inbox", 0)
+    return f"{name} ({unread})" if unread else name
+
+
+def scan_accounts() -> List[Tuple[str, str, str]]:
+    """
+    Sidebar nodes as (node id, parent id, label), with unread counts taken from
+    each mailbox index. Deleted projects are dropped by the registry's locked
+    compaction.
+    """
+    user_dir = mail._get_user_mail_dir()
+    nodes = [("agent:USER:global", "", f"👤 {_agent_label('USER', user_dir)} (PATH: {user_dir})")]
+
+    registered = mail_projects.list_projects(mail.PROJECT_LIST_FILE)
+    valid_paths = mail_projects.list_projects(mail.PROJECT_LIST_FILE, existing_only=True)
+    for p_str in sorted(valid_paths):
+        p = Path(p_str)
+        p_node = f"proj:{p}"
+        nodes.append((p_node, "", f"📂 {p}"))
+        mails_dir = p / ".ucas" / "mails"
+        if mails_dir.exists():
+            for item in sorted(mails_dir.iterdir()):
+                if mail._is_agent_dir(item):
+                    nodes.append((f"agent:{item.name}:{p}", p_node, f"   {_agent_label(item.name, item)}"))
+
+    if len(valid_paths) != len(registered):
+        try:
+            mail_projects.compact(mail.PROJECT_LIST_FILE)
+        except OSError:
+            pass
+    return nodes
+
+
+class Loader(threading.Thread):
+    """
+    Runs mailbox jobs off the Tk thread. Each job has a key ("list", "body",
+    ...) and a generation; a job superseded by a newer one of the same key is
+    skipped, and its result (if already running) is dropped by the UI.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.jobs: "queue.Queue[tuple]" = queue.Queue()
+        self.results: "queue.Queue[tuple]" = queue.Queue()
+        self.current: Dict[str, int] = {}
+
+    def submit(self, key: str, fn: Callable, *args, on_done: Callable[[Any], None] = None):
+        gen = self.current.get(key, 0) + 1
+        self.current[key] = gen
+        self.jobs.put((key, gen, fn, args, on_done))
+
+    def run(self):
+        while True:
+            key, gen, fn, args, on_done = self.jobs.get()
+            if self.current.get(key) != gen:
+                continue
+            try:
+                self.results.put((key, gen, on_done, fn(*args), None))
+            except Exception as e:
+                self.results.put((key, gen, on_done, None, e))
+
+    def drain(self):
+        """Deliver finished jobs on the calling (Tk) thread."""
+        while True:
+            try:
+                key, gen, on_done, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if self.current.get(key) != gen:
+                continue
+            if error is not None:
+                messagebox.showerror("Error", str(error))
+            elif on_done:
+                on_done(result)
+
 
 class MailApp:
     def __init__(self, root, agent_name=None):
@@ -18,9 +112,18 @@ class MailApp:
         self.project_root = None 
         self.root.title(f"UCAS Mail Manager")
         self.root.geometry("1250x800")
+        self.loader = Loader()
+        self.loader.start()
+        self._view = None  # (agent, project root, folder) shown in the message list
+        self._fill_token = 0
         self.setup_ui()
+        self.root.after(POLL_MS, self._poll)
         self.refresh()
 
+    def _poll(self):
+        self.loader.drain()
+        self.root.after(POLL_MS, self._poll)
+
     def setup_ui(self):
         toolbar = ttk.Frame(self.root, padding=5)
         toolbar.pack(side=tk.TOP, fill=tk.X)
@@ -28,6 +131,8 @@ class MailApp:
         ttk.Button(toolbar, text="New Message", command=self.compose_mail).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Reply", command=self.reply_mail).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Archive", command=self.archive_selected).pack(side=tk.LEFT, padx=2)
+        self.status_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=self.status_var).pack(side=tk.RIGHT, padx=5)
         
         main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         main_paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -76,39 +181,37 @@ class MailApp:
         self.text_area.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
     def refresh(self):
-        self.nav_tree.delete(*self.nav_tree.get_children())
-        user_path = str(mail._get_user_mail_dir())
-        self.nav_tree.insert("", tk.END, "agent:USER:global", text=f"👤 USER (PATH: {user_path})")
-        
-        if mail.PROJECT_LIST_FILE.exists():
-            original_paths = sorted(list(set(p.strip() for p in mail.PROJECT_LIST_FILE.read_text().splitlines() if p.strip())))
-            valid_paths = []
-            
-            for p_str in original_paths:
-                p = Path(p_str).resolve()
-                # Check if it exists and is not in /tmp
-                if p.exists() and not str(p).startswith("/tmp/"):
-                    valid_paths.append(str(p))
-                    p_node = self.nav_tree.insert("", tk.END, f"proj:{p}", text=f"📂 {p}", open=True)
-                    self.add_agents_to_node(p_node, p)
-            
-            # Update the list file if some paths were removed
-            if len(valid_paths) != len(original_paths):
-                try:
-                    with open(mail.PROJECT_LIST_FILE, "w") as f:
-                        for vp in valid_paths:
-                            f.write(f"{vp}\n")
-                except:
-                    pass
-        
-        self.nav_tree.selection_set("agent:USER:global")
+        self.refresh_accounts()
+        if self._view:
+            self.load_mails()
 
-    def add_agents_to_node(self, parent_node, project_root):
-        mails_dir = project_root / ".ucas" / "mails"
-        if mails_dir.exists():
-            for item in sorted(mails_dir.iterdir()):
-                if item.is_dir() and item.name.islower():
-                    self.nav_tree.insert(parent_node, tk.END, f"agent:{item.name}:{project_root}", text=f"   {item.name}")
+    def refresh_accounts(self):
+        self.loader.submit("accounts", scan_accounts, on_done=self._apply_accounts)
+
+    def _apply_accounts(self, nodes):
+        """Update the sidebar by diff: only changed labels and added/removed nodes are touched."""
+        wanted = {node_id for node_id, _, _ in nodes}
+        for top in self.nav_tree.get_children():
+            for child in self.nav_tree.get_children(top):
+                if child not in wanted:
+                    self.nav_tree.delete(child)
+            if top not in wanted:
+                self.nav_tree.delete(top)
+
+        positions: Dict[str, int] = {}
+        for node_id, parent, label in nodes:
+            index = positions.get(parent, 0)
+            positions[parent] = index + 1
+            if self.nav_tree.exists(node_id):
+                if self.nav_tree.item(node_id, "text") != label:
+                    self.nav_tree.item(node_id, text=label)
+                if self.nav_tree.parent(node_id) != parent or self.nav_tree.index(node_id) != index:
+                    self.nav_tree.move(node_id, parent, index)
+            else:
+                self.nav_tree.insert(parent, index, node_id, text=label, open=True)
+
+        if not self.nav_tree.selection():
+            self.nav_tree.selection_set("agent:USER:global")
 
     def on_nav_select(self, event):
         selection = self.nav_tree.selection()
@@ -121,33 +224,93 @@ class MailApp:
             self.load_mails()
 
     def load_mails(self):
-        self.mail_tree.delete(*self.mail_tree.get_children())
-        self.text_area.config(state=tk.NORMAL); self.text_area.delete(1.0, tk.END); self.text_area.config(state=tk.DISABLED)
-        msgs = mail.get_messages(agent_name=self.agent_name, folders=[self.folder_var.get()], project_root=self.project_root)
-        for msg in msgs:
-            self.mail_tree.insert("", tk.END, values=(msg.get('id'), msg.get('date_str'), msg.get('from'), msg.get('to'), msg.get('subject')), iid=msg.get('id'))
+        view = (self.agent_name, self.project_root, self.folder_var.get())
+        if view != self._view:
+            # Another mailbox or folder: start from an empty list and viewer
+            self._view = view
+            self._fill_token += 1
+            self.mail_tree.delete(*self.mail_tree.get_children())
+            self._show_text("")
+        self.status_var.set("Loading...")
+        self.loader.submit("list", self._list_rows, *view, on_done=lambda rows: self._apply_rows(view, rows))
+
+    @staticmethod
+    def _list_rows(agent_name, project_root, folder) -> List[Tuple[str, tuple]]:
+        msgs = mail.get_messages(agent_name=agent_name, folders=[folder], project_root=project_root)
+        return [(m.get('id'), (m.get('id'), m.get('date_str'), m.get('from'), m.get('to'), m.get('subject'))) for m in msgs]
+
+    def _apply_rows(self, view, rows):
+        """Diff the list against the loaded rows, then fill it ROW_CHUNK rows per tick."""
+        if view != self._view:
+            return
+        wanted = {row_id for row_id, _ in rows}
+        stale = [iid for iid in self.mail_tree.get_children() if iid not in wanted]
+        if stale:
+            self.mail_tree.delete(*stale)
+        self._fill_token += 1
+        self._fill_rows(self._fill_token, rows, 0, deque(self.mail_tree.get_children()), set())
+
+    def _fill_rows(self, token, rows, start, pending, placed):
+        """
+        pending: rows loaded before this fill, in tree order, and placed: rows
+        already put at their position. The first pending row not yet placed is
+        the one at the fill position, so no row needs a tree.index() lookup.
+        """
+        if token != self._fill_token:
+            return  # A newer listing took over
+        end = min(start + ROW_CHUNK, len(rows))
+        for index, (row_id, values) in enumerate(rows[start:end], start):
+            while pending and pending[0] in placed:
+                pending.popleft()
+            if pending and pending[0] == row_id:
+                pending.popleft()
+            elif self.mail_tree.exists(row_id):
+                self.mail_tree.move(row_id, "", index)
+            else:
+                self.mail_tree.insert("", index, iid=row_id, values=values)
+            placed.add(row_id)
+        if end < len(rows):
+            self.status_var.set(f"{end}/{len(rows)} messages")
+            self.root.after(1, self._fill_rows, token, rows, end, pending, placed)
+        else:
+            self.status_var.set(f"{len(rows)} messages")
 
     def on_mail_select(self, event):
         selection = self.mail_tree.selection()
         if not selection: return
-        data, path, folder = mail.get_message_content(selection[0], agent_name=self.agent_name, project_root=self.project_root)
+        self.loader.submit("body", self._load_message, selection[0], self.agent_name, self.project_root,
+                           on_done=self._message_loaded)
+
+    @staticmethod
+    def _load_message(mail_id, agent_name, project_root):
+        """Parse the selected message (the only place a body is read) and mark it read."""
+        data, path, folder = mail.get_message_content(mail_id, agent_name=agent_name, project_root=project_root)
+        if data and folder == 'inbox':
+            mail.mark_as_read(mail_id, agent_name=agent_name, project_root=project_root)
+        return data, folder
+
+    def _message_loaded(self, result):
+        data, folder = result
         if data:
             self.display_message(data)
-            if folder == 'inbox': mail.mark_as_read(selection[0], agent_name=self.agent_name, project_root=self.project_root)
+            if folder == 'inbox':
+                self.refresh_accounts()
 
-    def display_message(self, data):
+    def _show_text(self, text):
         self.text_area.config(state=tk.NORMAL); self.text_area.delete(1.0, tk.END)
-        fields = [('From', data.get('from')), ('To', data.get('to')), ('Date', data.get('date_str')), ('Subject', data.get('subject')), ('PATH', data.get('from_project'))]
-        for label, val in fields:
-            if val: self.text_area.insert(tk.END, f"{label:<12}: {val}\n")
-        self.text_area.insert(tk.END, "-" * 80 + "\n\n" + data.get('body', ''))
+        self.text_area.insert(tk.END, text)
         self.text_area.config(state=tk.DISABLED)
 
+    def display_message(self, data):
+        fields = [('From', data.get('from')), ('To', data.get('to')), ('Date', data.get('date_str')), ('Subject', data.get('subject')), ('PATH', data.get('from_project'))]
+        text = "".join(f"{label:<12}: {val}\n" for label, val in fields if val)
+        self._show_text(text + "-" * 80 + "\n\n" + data.get('body', ''))
+
     def archive_selected(self):
         selection = self.mail_tree.selection()
         if selection:
-            mail.archive_mail(selection[0], agent_name=self.agent_name, project_root=self.project_root)
-            self.load_mails()
+            self.loader.submit("action", mail.archive_mail, selection[0], self.agent_name, self.project_root,
+                               on_done=lambda _: self.refresh())
 
     def compose_mail(self, reply_to=None):
         ComposeWindow(self.root, reply_to, current_agent=self.agent_name, project_root=self.project_root)
@@ -155,8 +318,8 @@ class MailApp:
     def reply_mail(self):
         selection = self.mail_tree.selection()
         if selection:
-            data, _, _ = mail.get_message_content(selection[0], agent_name=self.agent_name, project_root=self.project_root)
-            if data: self.compose_mail(reply_to=data)
+            self.loader.submit("reply", mail.get_message_content, selection[0], self.agent_name, self.project_root,
+                               on_done=lambda result: result[0] and self.compose_mail(reply_to=result[0]))
 
 class ComposeWindow:
     def __init__(self, parent, reply_to=None, current_agent="USER", project_root=None):
@@ -0,0 +1,473 @@
+"""
+Per-mailbox header index: <mail_dir>/.index.jsonl
+
+An append-only log of operations, replayed on load:
+
+    {"op": "add", "id": ..., "folder": "inbox", "from": ..., "subject": ..., ...}
+    {"op": "move", "id": ..., "folder": "read", "ts": ...}
+    {"op": "del", "id": ...}
+
+`timestamp` of an entry is its delivery time (file mtime); replaying a move
+with `ts` adds `read_at` (first move out of the inbox) and `archived_at`,
+which compaction keeps, so mail_stats never needs the messages themselves.
+
+Listing a mailbox then costs one file read plus a directory scan of the
+requested folders (names only) instead of parsing every .eml. Files that
+appear without an index entry (older UCAS, manual copies) are parsed once
+and added; entries whose file disappeared are dropped. The log is compacted
+once it grows well beyond the number of live entries.
+
+Messages packed into segment files (mail_segments) count as present in their
+folder; their `path` is the virtual <folder>/<id>.eml, read from the segment.
+
+The replayed log doubles as the ID -> (folder, path) map: resolve() looks up
+full IDs directly and short IDs by bisecting the sorted ID list. The map is
+cached per mailbox and reused until the log file changes.
+"""
+
+import bisect
+import fcntl
+import heapq
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from email import policy
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesHeaderParser
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Iterable, Mapping, Tuple, Union
+
+from . import mail_segments
+
+INDEX_FILE = ".index.jsonl"
+LOCK_FILE = ".index.lock"
+FOLDERS = ("inbox", "read", "sent", "archive")
+# Rewrite the log when it holds this many more lines than live entries
+COMPACT_SLACK = 256
+_HEADER_CHUNK = 8192
+# Seconds an .eml without a complete header block is treated as still being written
+INCOMPLETE_GRACE = 5.0
+# X-Ucas-Priority values, most urgent first; a missing or unknown value is "normal"
+PRIORITIES = ("urgent", "high", "normal", "low")
+# Old (YYYYMMDD-HHMMSS-xxxx) and current (YYYYMMDD-HHMMSSmmm-...) UCAS IDs
+_ID_TIME = re.compile(r"\d{8}-\d{6}")
+
+# mail_dir -> (log file signature, entries by id, sorted ids)
+_id_maps: Dict[str, tuple] = {}
+
+# (before, after) callbacks around every log rewrite, run under the lock:
+# before(mail_dir), after(mail_dir, old (inode, size) or None, new (inode, size))
+_rewrite_listeners: List[Tuple[Callable, Callable]] = []
+
+
+def _index_path(mail_dir: Path) -> Path:
+    return Path(mail_dir) / INDEX_FILE
+
+
+@contextmanager
+def _locked(mail_dir: Path):
+    """Serialize writers of one mailbox's index (appends and compaction)."""
+    Path(mail_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(mail_dir) / LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _append(mail_dir: Path, ops: Iterable[Dict[str, Any]]) -> None:
+    data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+    if not data:
+        return
+    with _locked(mail_dir):
+        with open(_index_path(mail_dir), "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+def _split_header_block(data: bytes) -> bytes:
+    for sep in (b"\n\n", b"\r\n\r\n"):
+        end = data.find(sep)
+        if end != -1:
+            return data[:end + len(sep)]
+    return data
+
+
+def read_header_block(path: Union[str, Path]) -> bytes:
+    """Read an .eml up to the blank line that ends its headers; the body is never read."""
+    data = b""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        packed = mail_segments.read(path)
+        if packed is None:
+            raise
+        return _split_header_block(packed)
+    with f:
+        while True:
+            chunk = f.read(_HEADER_CHUNK)
+            if not chunk:
+                return data
+            start = max(0, len(data) - 3)
+            data += chunk
+            for sep in (b"\n\n", b"\r\n\r\n"):
+                end = data.find(sep, start)
+                if end != -1:
+                    return data[:end + len(sep)]
+
+
+class IncompleteMessage(ValueError):
+    """The file looks like it is still being written (no end of headers yet)."""
+
+
+def _header_block_complete(block: bytes) -> bool:
+    return block.endswith(b"\n\n") or block.endswith(b"\r\n\r\n")
+
+
+def read_headers(path: Union[str, Path], block: Optional[bytes] = None) -> Dict[str, str]:
+    """
+    Parse only the header block of an .eml (compat32 policy, no header objects).
+    Returns {lowercase name: decoded value}.
+    """
+    if block is None:
+        block = read_header_block(path)
+    msg = BytesHeaderParser(policy=policy.compat32).parsebytes(block)
+    headers = {}
+    for name, value in msg.items():
+        value = str(value).replace("\r\n", "\n").replace("\n ", " ").replace("\n\t", " ")
+        if "=?" in value:
+            try:
+                value = str(make_header(decode_header(value)))
+            except Exception:
+                pass
+        headers.setdefault(name.lower(), value)
+    return headers
+
+
+def headers_entry(msg: Union[Message, Mapping[str, str]], mail_id: str, folder: str,
+                  size: int, mtime: float) -> Dict[str, Any]:
+    """Index entry from parsed headers (an EmailMessage or a read_headers() dict)."""
+    def get(name):
+        value = msg.get(name)
+        return str(value) if value is not None else None
+
+    return {
+        "id": mail_id,
+        "folder": folder,
+        "timestamp": mtime,
+        "size": size,
+        "date_str": get('date') or "",
+        "from": get('from'),
+        "to": get('to'),
+        "subject": get('subject'),
+        "from_project": get('x-ucas-project'),
+        "in_reply_to": get('x-ucas-in-reply-to'),
+        "thread": get('x-ucas-thread'),
+        "priority": get('x-ucas-priority'),
+        "blob": get('x-ucas-blob'),
+    }
+
+
+def read_entry(path: Path, folder: str) -> Dict[str, Any]:
+    """
+    Build an index entry from an .eml file (headers only).
+    UCAS delivers by rename/link, so files are complete when they appear; a file
+    dropped in by another writer that is recent and has no end of headers yet
+    raises IncompleteMessage instead of being indexed half-written.
+    """
+    try:
+        st = path.stat()
+        size, mtime = st.st_size, st.st_mtime
+    except FileNotFoundError:
+        # Packed into a segment by `ucas mail compact`
+        rec = mail_segments.locate(path)
+        if rec is None:
+            raise
+        size, mtime = rec[2], rec[3]
+    block = read_header_block(path)
+    if not _header_block_complete(block) and time.time() - mtime < INCOMPLETE_GRACE:
+        raise IncompleteMessage(str(path))
+    return headers_entry(read_headers(path, block), path.stem, folder, size, mtime)
+
+
+# --- Recording (called by the mail operations) ---
+
+def record_add(mail_dir: Path, entry: Dict[str, Any]) -> None:
+    _append(mail_dir, [dict(entry, op="add")])
+
+
+def record_file(mail_dir: Path, path: Path, folder: str, msg: Optional[Message] = None) -> None:
+    """Record a newly written .eml; reuses msg headers when the caller has them."""
+    try:
+        if msg is None:
+            entry = read_entry(path, folder)
+        else:
+            st = path.stat()
+            entry = headers_entry(msg, path.stem, folder, st.st_size, st.st_mtime)
+    except (OSError, IncompleteMessage):
+        return  # Picked up by the next reconcile
+    record_add(mail_dir, entry)
+
+
+def record_move(mail_dir: Path, mail_id: str, folder: str) -> None:
+    _append(mail_dir, [{"op": "move", "id": mail_id, "folder": folder, "ts": round(time.time(), 3)}])
+
+
+def record_remove(mail_dir: Path, mail_id: str) -> None:
+    _append(mail_dir, [{"op": "del", "id": mail_id}])
+
+
+# --- Loading ---
+
+def _decode(lines: List[str]) -> List[Dict[str, Any]]:
+    try:
+        # One decoder call for the whole log is much cheaper than one per line
+        return json.loads("[" + ",".join(lines) + "]")
+    except ValueError:
+        ops = []
+        for line in lines:
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                continue  # Torn write of a crashed writer
+        return ops
+
+
+def apply_move(entry: Dict[str, Any], op: Mapping[str, Any]) -> None:
+    """Apply a move op to an entry, keeping read/archive times."""
+    ts = op.get("ts")
+    if ts:
+        if entry["folder"] == "inbox" and op["folder"] != "inbox":
+            entry.setdefault("read_at", ts)
+        if op["folder"] == "archive":
+            entry["archived_at"] = ts
+    entry["folder"] = op["folder"]
+
+
+def _replay(mail_dir: Path):
+    """Replay the log. Returns (entries by id, number of log lines)."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(_index_path(mail_dir), encoding="utf-8") as f:
+            lines = [line for line in f.read().split("\n") if line]
+    except FileNotFoundError:
+        return entries, 0
+
+    _apply(entries, _decode(lines))
+    return entries, len(lines)
+
+
+def _apply(entries: Dict[str, Dict[str, Any]], ops: Iterable[Dict[str, Any]]):
+    for op in ops:
+        op = dict(op)
+        kind = op.pop("op", None)
+        op.pop("reconcile", None)
+        mail_id = op.get("id")
+        if kind == "add":
+            entries[mail_id] = op
+        elif kind == "move" and mail_id in entries:
+            apply_move(entries[mail_id], op)
+        elif kind == "del":
+            entries.pop(mail_id, None)
+
+
+def _reconcile(mail_dir: Path, entries: Dict[str, Dict[str, Any]], folders: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Match the index against the folders on disk (names only). Returns fix-up ops,
+    marked "reconcile" so readers of the log can tell them from deliveries.
+    """
+    ops = []
+    for folder in folders:
+        try:
+            with os.scandir(Path(mail_dir) / folder) as it:
+                on_disk = {e.name[:-4] for e in it if e.name.endswith(".eml")}
+        except FileNotFoundError:
+            on_disk = set()
+        on_disk.update(mail_segments.packed(Path(mail_dir) / folder))
+
+        for mail_id, entry in list(entries.items()):
+            if entry["folder"] == folder and mail_id not in on_disk:
+                del entries[mail_id]
+                ops.append({"op": "del", "id": mail_id, "reconcile": True})
+
+        for mail_id in on_disk:
+            entry = entries.get(mail_id)
+            if entry and entry["folder"] == folder:
+                continue
+            try:
+                entries[mail_id] = read_entry(Path(mail_dir) / folder / f"{mail_id}.eml", folder)
+            except Exception:
+                continue
+            ops.append(dict(entries[mail_id], op="add", reconcile=True))
+    return ops
+
+
+def on_rewrite(before: Callable[[Path], None], after: Callable[[Path, Optional[tuple], tuple], None]):
+    """Register callbacks around log rewrites (mail_stats keeps its totals across them)."""
+    _rewrite_listeners.append((before, after))
+
+
+def _write_log(mail_dir: Path, entries: Dict[str, Dict[str, Any]]):
+    """Replace the log with one `add` per entry (caller holds the lock)."""
+    path = _index_path(mail_dir)
+    for before, _ in _rewrite_listeners:
+        before(mail_dir)
+    try:
+        st = os.stat(path)
+        old = (st.st_ino, st.st_size)
+    except FileNotFoundError:
+        old = None
+    tmp = path.with_name(f"{INDEX_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for entry in entries.values():
+            f.write(json.dumps(dict(entry, op="add"), ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    st = os.stat(path)
+    for _, after in _rewrite_listeners:
+        after(mail_dir, old, (st.st_ino, st.st_size))
+
+
+def compact(mail_dir: Path, ops: Iterable[Dict[str, Any]] = ()) -> int:
+    """
+    Rewrite the log as one `add` per live entry, with `ops` applied on top.
+    The log is replayed under the lock, so operations appended by other
+    processes since the caller last read it are kept. Returns the number of entries.
+    """
+    with _locked(mail_dir):
+        entries, _ = _replay(mail_dir)
+        _apply(entries, ops)
+        _write_log(mail_dir, entries)
+    return len(entries)
+
+
+def load(mail_dir: Path, folders: Iterable[str] = FOLDERS) -> Dict[str, Dict[str, Any]]:
+    """Load the index of a mailbox, reconciled against the given folders."""
+    entries, lines = _replay(mail_dir)
+    fixes = _reconcile(mail_dir, entries, folders)
+    if lines + len(fixes) > 2 * len(entries) + COMPACT_SLACK:
+        compact(mail_dir, fixes)
+    elif fixes:
+        _append(mail_dir, fixes)
+    return entries
+
+
+def rebuild(mail_dir: Path) -> int:
+    """Rebuild the index from the .eml files on disk. Returns the number of messages."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    _reconcile(mail_dir, entries, FOLDERS)
+    with _locked(mail_dir):
+        _write_log(mail_dir, entries)
+    return len(entries)
+
+
+def sort_key(entry: Mapping[str, Any]) -> str:
+    """
+    Chronological sort key. UCAS IDs start with their creation time, so the ID
+    itself is the key (no stat needed); other names fall back to the file mtime.
+    """
+    mail_id = entry["id"]
+    if _ID_TIME.match(mail_id):
+        return mail_id
+    return time.strftime("%Y%m%d-%H%M%S", time.localtime(entry.get("timestamp") or 0)) + "~" + mail_id
+
+
+def priority_rank(entry: Mapping[str, Any]) -> int:
+    """3 for urgent down to 0 for low."""
+    priority = (entry.get("priority") or "normal").strip().lower()
+    if priority not in PRIORITIES:
+        priority = "normal"
+    return len(PRIORITIES) - 1 - PRIORITIES.index(priority)
+
+
+def priority_key(entry: Mapping[str, Any]) -> Tuple[int, str]:
+    """Sort key putting more urgent messages first (descending), then newer ones."""
+    return priority_rank(entry), sort_key(entry)
+
+
+def list_entries(mail_dir: Path, folders: List[str], limit: Optional[int] = None, offset: int = 0,
+                 where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 key: Callable[[Mapping[str, Any]], Any] = sort_key) -> List[Dict[str, Any]]:
+    """
+    Index entries of the given folders, newest first (largest key first), optionally filtered.
+    With a limit only the top offset+limit entries are kept (heap), not a full sort.
+    """
+    entries = load(mail_dir, folders)
+    selected = (e for e in entries.values() if e["folder"] in folders and (where is None or where(e)))
+    if limit is not None:
+        return heapq.nlargest(offset + limit, selected, key=key)[offset:]
+    result = sorted(selected, key=key, reverse=True)
+    return result[offset:] if offset else result
+
+
+# --- ID lookup ---
+
+def _log_signature(mail_dir: Path):
+    try:
+        st = os.stat(_index_path(mail_dir))
+    except FileNotFoundError:
+        return None
+    # Appends change the size, compaction replaces the inode
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _id_map(mail_dir: Path):
+    """(entries by id, sorted ids) of the log, replayed only when it changed."""
+    key = str(mail_dir)
+    sig = _log_signature(mail_dir)
+    cached = _id_maps.get(key)
+    if cached and sig is not None and cached[0] == sig:
+        return cached[1], cached[2]
+    entries, _ = _replay(mail_dir)
+    ids = sorted(entries)
+    _id_maps[key] = (sig, entries, ids)
+    return entries, ids
+
+
+def counts(mail_dir: Path) -> Dict[str, int]:
+    """
+    Messages per folder according to the log (no directory scan; cached like
+    the ID map). Files not yet reconciled into the log are not counted.
+    """
+    result: Dict[str, int] = {}
+    for entry in _id_map(mail_dir)[0].values():
+        result[entry["folder"]] = result.get(entry["folder"], 0) + 1
+    return result
+
+
+def _lookup(mail_dir: Path, entries, ids, mail_id: str) -> Optional[Tuple[str, str, str]]:
+    entry = entries.get(mail_id)
+    if entry:
+        candidates = [mail_id]
+    else:
+        # Short ID: every ID with that prefix sits right after its bisect point
+        i = bisect.bisect_left(ids, mail_id)
+        candidates = []
+        while i < len(ids) and ids[i].startswith(mail_id):
+            candidates.append(ids[i])
+            i += 1
+        # Same preference as the old folder probe: inbox, read, sent, archive
+        candidates.sort(key=lambda c: FOLDERS.index(entries[c]["folder"]) if entries[c]["folder"] in FOLDERS else len(FOLDERS))
+
+    for candidate in candidates:
+        folder = entries[candidate]["folder"]
+        path = os.path.join(str(mail_dir), folder, candidate + ".eml")
+        if os.path.exists(path) or mail_segments.locate(path):
+            return candidate, folder, path
+    return None
+
+
+def resolve(mail_dir: Path, mail_id: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Find a message by full ID or ID prefix. Returns (id, folder, path) or None.
+    A miss (or a stale entry) reconciles the index with the disk once and retries.
+    """
+    if not mail_id:
+        return None
+    hit = _lookup(mail_dir, *_id_map(mail_dir), mail_id)
+    if hit is None and Path(mail_dir).is_dir():
+        load(mail_dir)
+        hit = _lookup(mail_dir, *_id_map(mail_dir), mail_id)
+    return hit
@@ -0,0 +1,133 @@
+"""
+Registry of projects that use UCAS mail: ~/.ucas/mail-projects.txt
+
+One absolute project path per line, append-only. Senders register their
+project on every send, so the common case must be cheap and safe under
+concurrency:
+
+- the parsed registry is cached in-process and reused while the file's
+  (inode, size, mtime) is unchanged, so an already registered project costs
+  one stat;
+- a new path is appended with a single O_APPEND write under an exclusive
+  flock, after re-checking the file under the lock.
+
+Duplicates and paths of deleted projects are removed only by compact(),
+which rewrites the file under the same lock and renames it into place.
+"""
+
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+PROJECT_LIST_FILE = Path.home() / ".ucas" / "mail-projects.txt"
+LOCK_SUFFIX = ".lock"
+# Projects under these prefixes are never registered (test and scratch runs)
+IGNORED_PREFIXES = ("/tmp/",)
+
+# registry file -> (file signature, ordered unique paths, number of lines)
+_cache: Dict[str, tuple] = {}
+
+
+def _file(registry: Optional[Union[str, Path]]) -> str:
+    return str(registry or PROJECT_LIST_FILE)
+
+
+@contextmanager
+def _locked(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + LOCK_SUFFIX, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _load(path: str) -> Tuple[Dict[str, None], int]:
+    """Registered paths (ordered, unique) and the line count, cached by file signature."""
+    sig = _signature(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == sig:
+        return cached[1], cached[2]
+    paths: Dict[str, None] = {}
+    lines = 0
+    if sig is not None:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    continue  # Torn tail of an interrupted append
+                lines += 1
+                line = line.strip()
+                if line:
+                    paths[line] = None
+    _cache[path] = (sig, paths, lines)
+    return paths, lines
+
+
+def _live(path: str) -> bool:
+    return not path.startswith(IGNORED_PREFIXES) and os.path.isdir(path)
+
+
+def register(project_root: Union[str, Path], registry: Optional[Union[str, Path]] = None) -> bool:
+    """Add a project to the registry. Returns True if it was not registered yet."""
+    abs_path = str(Path(project_root).resolve())
+    if abs_path.startswith(IGNORED_PREFIXES):
+        return False
+    path = _file(registry)
+    if abs_path in _load(path)[0]:
+        return False
+    with _locked(path):
+        # Another sender may have registered it since the unlocked check
+        paths, lines = _load(path)
+        if abs_path in paths:
+            return False
+        data = f"{abs_path}\n".encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        # Keep the cache valid for our own append so the next send is one stat again
+        old_sig = _cache[path][0]
+        if st.st_size == (old_sig[1] if old_sig else 0) + len(data):
+            _cache[path] = ((st.st_ino, st.st_size, st.st_mtime_ns), dict(paths, **{abs_path: None}), lines + 1)
+    return True
+
+
+def list_projects(registry: Optional[Union[str, Path]] = None, existing_only: bool = False) -> List[str]:
+    """Registered project paths in registration order (existing_only: those compact() would keep)."""
+    paths = list(_load(_file(registry))[0])
+    if existing_only:
+        paths = [p for p in paths if _live(p)]
+    return paths
+
+
+def compact(registry: Optional[Union[str, Path]] = None, prune: bool = True) -> Tuple[int, int]:
+    """
+    Rewrite the registry without duplicate lines and (with prune) without
+    projects that no longer exist. Returns (kept, removed) line counts.
+    """
+    path = _file(registry)
+    with _locked(path):
+        paths, lines = _load(path)
+        keep = [p for p in paths if _live(p) or (not prune and not p.startswith(IGNORED_PREFIXES))]
+        if len(keep) == lines:
+            return len(keep), 0
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(p + "\n" for p in keep)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    return len(keep), lines - len(keep)
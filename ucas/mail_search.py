@@ -0,0 +1,237 @@
+"""
+Full-text search over a mailbox (`ucas mail search`).
+
+An SQLite FTS5 table in <mail_dir>/.search.sqlite holds subject, body, from
+and to of every message, next to a plain table with ID, folder and headers.
+Both follow the mailbox index log (.index.jsonl): each search first applies
+the log operations appended since the last one (deliveries, moves,
+deletions), so only new messages have their body read. When the log was
+compacted or rebuilt (the rewrite clears the stored log position), the
+tables are diffed against the index instead.
+"""
+
+import email
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import mail_blobs
+from . import mail_index
+from . import mail_segments
+
+SEARCH_DB = ".search.sqlite"
+# bm25 column weights: subject, body, sender, recipient
+_WEIGHTS = "10.0, 1.0, 5.0, 2.0"
+# Field filters accepted in queries, mapped to the FTS5 column names
+_FIELD_ALIASES = {"from": "sender", "to": "recipient"}
+_FIELD_RE = re.compile(r"\b(from|to):")
+
+
+class SearchUnavailable(RuntimeError):
+    """SQLite was built without FTS5."""
+
+
+def _connect(mail_dir: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(str(mail_dir), SEARCH_DB), timeout=30)
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5("
+            "subject, body, sender, recipient, tokenize='unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError as e:
+        conn.close()
+        raise SearchUnavailable(f"SQLite FTS5 is not available: {e}")
+    # One row per message, sharing its rowid with the FTS row
+    conn.execute("CREATE TABLE IF NOT EXISTS msgs (rowid INTEGER PRIMARY KEY, id TEXT UNIQUE, folder TEXT, "
+                 "date_str TEXT, sender TEXT, recipient TEXT, subject TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+def _index_body(path: Path) -> str:
+    """Plain-text body for indexing; compat32 parsing is much cheaper than policy.default."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = mail_segments.read(path)
+        if data is None:
+            raise
+    msg = email.message_from_bytes(data)
+    digest = mail_blobs.reference(msg)
+    if digest:
+        return mail_blobs.read_text(mail_blobs.store_of_message(path), digest)
+    for part in msg.walk():
+        if part.get_content_type() == "text/plain":
+            payload = part.get_payload(decode=True) or b""
+            return payload.decode(part.get_content_charset() or "utf-8", "replace")
+    return ""
+
+
+def _get_meta(conn, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn, key: str, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _delete(conn, mail_id: str):
+    row = conn.execute("SELECT rowid FROM msgs WHERE id = ?", (mail_id,)).fetchone()
+    if row:
+        conn.execute("DELETE FROM docs WHERE rowid = ?", row)
+        conn.execute("DELETE FROM msgs WHERE rowid = ?", row)
+
+
+def _insert(conn, mail_dir: Path, entry: Dict[str, Any], read_body: Callable[[Path], str]):
+    path = Path(mail_dir) / entry["folder"] / f"{entry['id']}.eml"
+    try:
+        body = read_body(path)
+    except Exception:
+        body = ""  # Unreadable or already gone; still searchable by headers
+    _delete(conn, entry["id"])
+    fields = (entry.get("subject") or "", entry.get("from") or "", entry.get("to") or "")
+    cur = conn.execute("INSERT INTO msgs (id, folder, date_str, subject, sender, recipient) VALUES (?, ?, ?, ?, ?, ?)",
+                       (entry["id"], entry["folder"], entry.get("date_str") or "") + fields)
+    conn.execute("INSERT INTO docs (rowid, subject, sender, recipient, body) VALUES (?, ?, ?, ?, ?)",
+                 (cur.lastrowid,) + fields + (body,))
+
+
+def _full_sync(conn, mail_dir: Path, entries: Dict[str, Dict[str, Any]], read_body):
+    indexed = dict(conn.execute("SELECT id, folder FROM msgs"))
+    for mail_id in indexed.keys() - entries.keys():
+        _delete(conn, mail_id)
+    for mail_id, entry in entries.items():
+        folder = indexed.get(mail_id)
+        if folder is None:
+            _insert(conn, mail_dir, entry, read_body)
+        elif folder != entry["folder"]:
+            conn.execute("UPDATE msgs SET folder = ? WHERE id = ?", (entry["folder"], mail_id))
+
+
+def _apply_ops(conn, mail_dir: Path, ops: List[Dict[str, Any]], read_body):
+    for op in ops:
+        kind = op.pop("op", None)
+        mail_id = op.get("id")
+        if kind == "add":
+            row = conn.execute("SELECT folder FROM msgs WHERE id = ?", (mail_id,)).fetchone()
+            if row is None:
+                _insert(conn, mail_dir, op, read_body)
+            elif row[0] != op["folder"]:
+                conn.execute("UPDATE msgs SET folder = ? WHERE id = ?", (op["folder"], mail_id))
+        elif kind == "move":
+            conn.execute("UPDATE msgs SET folder = ? WHERE id = ?", (op["folder"], mail_id))
+        elif kind == "del":
+            _delete(conn, mail_id)
+
+
+def sync(mail_dir: Path, read_body: Callable[[Path], str] = _index_body):
+    """
+    Bring the search tables up to date with the mailbox index log. An unchanged
+    log costs one stat; files changed behind the index are picked up once a
+    listing has reconciled them into the log.
+    """
+    log_path = os.path.join(str(mail_dir), mail_index.INDEX_FILE)
+    if not os.path.exists(log_path):
+        mail_index.load(mail_dir)
+    try:
+        st = os.stat(log_path)
+    except FileNotFoundError:
+        return
+
+    conn = _connect(mail_dir)
+    try:
+        with conn:
+            inode, offset = _get_meta(conn, "log_inode"), int(_get_meta(conn, "log_offset") or 0)
+            if inode != str(st.st_ino) or offset > st.st_size:
+                # New, compacted or rebuilt log: diff against the live entries
+                _full_sync(conn, mail_dir, mail_index.load(mail_dir), read_body)
+                st = os.stat(log_path)
+                offset = st.st_size
+            elif offset < st.st_size:
+                with open(log_path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(st.st_size - offset)
+                end = data.rfind(b"\n") + 1  # Only whole lines; a torn tail is retried
+                lines = [line for line in data[:end].decode("utf-8").split("\n") if line]
+                _apply_ops(conn, mail_dir, mail_index._decode(lines), read_body)
+                offset += end
+            else:
+                return
+            _set_meta(conn, "log_inode", st.st_ino)
+            _set_meta(conn, "log_offset", offset)
+    finally:
+        conn.close()
+
+
+def _after_rewrite(mail_dir: Path, old: Optional[tuple], new: tuple):
+    # The new log may reuse an inode of an earlier one: force a diff on the next sync
+    path = os.path.join(str(mail_dir), SEARCH_DB)
+    if not os.path.exists(path):
+        return
+    try:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            with conn:
+                conn.execute("DELETE FROM meta WHERE key IN ('log_inode', 'log_offset')")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass  # Caught by the inode/size check, or rebuilt by `ucas mail reindex`
+
+
+mail_index.on_rewrite(lambda mail_dir: None, _after_rewrite)
+
+
+def _fts_query(query: str) -> str:
+    return _FIELD_RE.sub(lambda m: _FIELD_ALIASES[m.group(1)] + ":", query)
+
+
+def _quoted(query: str) -> str:
+    """Fallback for text that is not valid FTS5 syntax: every word as a plain term."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+def search(mail_dir: Path, query: str, folders: Optional[List[str]] = None, sender: Optional[str] = None,
+           limit: int = 20, read_body: Callable[[Path], str] = _index_body) -> List[Dict[str, Any]]:
+    """
+    Ranked matches (best first). The query is FTS5 syntax: words, "phrases",
+    prefix*, AND/OR/NOT, and field filters subject:, body:, from:, to:.
+    """
+    sync(mail_dir, read_body)
+    conn = _connect(mail_dir)
+    try:
+        sql = (f"SELECT m.id, m.folder, bm25(docs, {_WEIGHTS}) AS score, m.date_str, m.sender, m.recipient, "
+               "m.subject, snippet(docs, 1, '[', ']', '...', 12) "
+               "FROM docs JOIN msgs m ON m.rowid = docs.rowid WHERE docs MATCH ?")
+        params: List[Any] = []
+        if folders:
+            sql += f" AND m.folder IN ({','.join('?' * len(folders))})"
+            params.extend(folders)
+        if sender:
+            sql += " AND m.sender LIKE ?"
+            params.append(f"%{sender}%")
+        sql += " ORDER BY score, m.id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = conn.execute(sql, [_fts_query(query)] + params).fetchall()
+        except sqlite3.OperationalError:
+            rows = conn.execute(sql, [_quoted(query)] + params).fetchall()
+    finally:
+        conn.close()
+
+    keys = ("id", "folder", "score", "date_str", "from", "to", "subject", "snippet")
+    results = [dict(zip(keys, row)) for row in rows]
+    for r in results:
+        r["score"] = round(-r["score"], 3)
+    return results
+
+
+def drop(mail_dir: Path):
+    """Delete the search table; it is rebuilt on the next search."""
+    try:
+        os.unlink(os.path.join(str(mail_dir), SEARCH_DB))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,229 @@
+"""
+Packed message segments for large mail folders (`ucas mail compact`).
+
+Old messages of a folder are appended to segment files in <folder>/.segments/:
+
+    000001.seg   mbox-like: "From ucas <id> <mtime>\n" + raw message + "\n"
+    000001.idx   sidecar, one JSON line per message:
+                 {"id": ..., "offset": ..., "length": ..., "mtime": ...}
+                 {"id": ..., "del": true}          (message moved out or deleted)
+
+Segments are append-only. Data is fsynced before its sidecar line is written,
+so every line a reader sees points at complete bytes. A message that exists
+both as an .eml file and in a segment (crash during compaction) is read from
+the file. Messages are read in place through mmap, never unpacked.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+SEGMENT_DIR = ".segments"
+# Start a new segment once the current one reaches this size
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# folder dir -> (sidecar signature, {id: (segment path, offset, length, mtime)})
+_maps: Dict[str, tuple] = {}
+
+
+def _segment_dir(folder_dir: Union[str, Path]) -> str:
+    return os.path.join(str(folder_dir), SEGMENT_DIR)
+
+
+@contextmanager
+def _locked(folder_dir: Union[str, Path]):
+    seg_dir = _segment_dir(folder_dir)
+    os.makedirs(seg_dir, exist_ok=True)
+    with open(os.path.join(seg_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield seg_dir
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _sidecars(seg_dir: str):
+    try:
+        with os.scandir(seg_dir) as it:
+            return sorted((e.name, e.stat()) for e in it if e.name.endswith(".idx"))
+    except FileNotFoundError:
+        return []
+
+
+def packed(folder_dir: Union[str, Path]) -> Dict[str, Tuple[str, int, int, float]]:
+    """Messages packed in a folder's segments: {id: (segment path, offset, length, mtime)}."""
+    seg_dir = _segment_dir(folder_dir)
+    sidecars = _sidecars(seg_dir)
+    if not sidecars:
+        return {}
+    sig = [(name, st.st_size, st.st_mtime_ns) for name, st in sidecars]
+    cached = _maps.get(seg_dir)
+    if cached and cached[0] == sig:
+        return cached[1]
+
+    records: Dict[str, Tuple[str, int, int, float]] = {}
+    for name, _ in sidecars:
+        seg_path = os.path.join(seg_dir, name[:-4] + ".seg")
+        with open(os.path.join(seg_dir, name), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # Torn write of a crashed writer
+                if rec.get("del"):
+                    records.pop(rec["id"], None)
+                else:
+                    records[rec["id"]] = (seg_path, rec["offset"], rec["length"], rec.get("mtime", 0.0))
+    _maps[seg_dir] = (sig, records)
+    return records
+
+
+def locate(path: Union[str, Path]) -> Optional[Tuple[str, int, int, float]]:
+    """Segment record for a (virtual) <folder>/<id>.eml path, or None."""
+    path = str(path)
+    return packed(os.path.dirname(path)).get(os.path.basename(path)[:-4])
+
+
+def read(path: Union[str, Path]) -> Optional[bytes]:
+    """Raw bytes of a packed message, read through mmap; None if not packed."""
+    rec = locate(path)
+    if rec is None:
+        return None
+    seg_path, offset, length, _ = rec
+    with open(seg_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return m[offset:offset + length]
+
+
+def _current_segment(seg_dir: str) -> Tuple[str, str]:
+    """(segment path, sidecar path) to append to, starting a new one when full."""
+    numbers = sorted(int(n[:-4]) for n in os.listdir(seg_dir) if n.endswith(".seg") and n[:-4].isdigit())
+    number = numbers[-1] if numbers else 1
+    seg_path = os.path.join(seg_dir, f"{number:06d}.seg")
+    if os.path.exists(seg_path) and os.path.getsize(seg_path) >= SEGMENT_MAX_BYTES:
+        number += 1
+        seg_path = os.path.join(seg_dir, f"{number:06d}.seg")
+    return seg_path, seg_path[:-4] + ".idx"
+
+
+def _append_sidecar(idx_path: str, records: Iterable[dict]):
+    data = "".join(json.dumps(rec) + "\n" for rec in records)
+    if data:
+        with open(idx_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def pack(folder_dir: Union[str, Path], cutoff: float) -> int:
+    """
+    Move .eml files of a folder last modified before `cutoff` (epoch seconds)
+    into its current segment. Returns the number of messages packed.
+    """
+    folder_dir = str(folder_dir)
+    with _locked(folder_dir) as seg_dir:
+        already = packed(folder_dir)
+        candidates = []
+        with os.scandir(folder_dir) as it:
+            for e in it:
+                if e.name.endswith(".eml") and e.is_file():
+                    mtime = e.stat().st_mtime
+                    if mtime < cutoff:
+                        candidates.append((e.name, mtime))
+        candidates.sort()
+
+        count = 0
+        while candidates:
+            seg_path, idx_path = _current_segment(seg_dir)
+            records, done = [], []
+            with open(seg_path, "ab") as seg:
+                offset = seg.tell()
+                while candidates and offset < SEGMENT_MAX_BYTES:
+                    name, mtime = candidates.pop(0)
+                    mail_id = name[:-4]
+                    if mail_id in already:
+                        done.append(name)  # Packed before a crash; only the file is left over
+                        continue
+                    try:
+                        with open(os.path.join(folder_dir, name), "rb") as f:
+                            data = f.read()
+                    except FileNotFoundError:
+                        continue  # Moved meanwhile
+                    header = f"From ucas {mail_id} {mtime:.6f}\n".encode()
+                    seg.write(header + data + b"\n")
+                    records.append({"id": mail_id, "offset": offset + len(header),
+                                    "length": len(data), "mtime": mtime})
+                    offset += len(header) + len(data) + 1
+                    done.append(name)
+                seg.flush()
+                os.fsync(seg.fileno())
+            _append_sidecar(idx_path, records)
+            gone: Dict[str, list] = {}
+            lost = 0
+            for name in done:
+                try:
+                    os.unlink(os.path.join(folder_dir, name))
+                except FileNotFoundError:
+                    # Moved or deleted after it was read (movers do not take our lock):
+                    # drop the packed copy too, or the message would exist twice
+                    mail_id = name[:-4]
+                    if mail_id in already:
+                        seg = already[mail_id][0]
+                    else:
+                        seg, lost = seg_path, lost + 1
+                    gone.setdefault(seg[:-4] + ".idx", []).append({"id": mail_id, "del": True})
+            for path, dels in gone.items():
+                _append_sidecar(path, dels)
+            count += len(records) - lost
+        return count
+
+
+def remove(folder_dir: Union[str, Path], mail_id: str):
+    """Mark a packed message as gone (moved to another folder or deleted)."""
+    rec = packed(folder_dir).get(mail_id)
+    if rec is None:
+        return
+    with _locked(folder_dir):
+        _append_sidecar(rec[0][:-4] + ".idx", [{"id": mail_id, "del": True}])
+
+
+def count_files(folder_dir: Union[str, Path]) -> int:
+    """Number of loose .eml files in a folder."""
+    try:
+        with os.scandir(folder_dir) as it:
+            return sum(1 for e in it if e.name.endswith(".eml"))
+    except FileNotFoundError:
+        return 0
+
+
+def drop_dead(folder_dir: Union[str, Path]) -> int:
+    """Delete segments whose messages were all moved out or deleted. Returns bytes freed."""
+    freed = 0
+    seg_dir = _segment_dir(folder_dir)
+    if not _sidecars(seg_dir):
+        return 0
+    with _locked(folder_dir):
+        for name, _ in _sidecars(seg_dir):
+            live = set()
+            with open(os.path.join(seg_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if rec.get("del"):
+                        live.discard(rec["id"])
+                    else:
+                        live.add(rec["id"])
+            if live:
+                continue
+            for path in (os.path.join(seg_dir, name[:-4] + ".seg"), os.path.join(seg_dir, name)):
+                try:
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+    return freed
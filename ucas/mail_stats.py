@@ -0,0 +1,213 @@
+"""
+Mailbox throughput and latency metrics (`ucas mail stats`).
+
+Computed from the mailbox index log (.index.jsonl) only; messages are never
+opened. The running totals live in <mail_dir>/.stats.json together with the
+log inode and the offset they cover, so each call applies just the operations
+appended since the previous one. Once a mailbox has stats, every rewrite of
+its log (compaction, rebuild) first counts the old log to its end and then
+moves the offset to the end of the new file, so totals of deleted messages
+are kept. Only a log rewritten behind UCAS's back (or before the first
+`mail stats`) is replayed from the start, and then covers just the messages
+still in the mailbox (`add` lines keep `timestamp`, `read_at` and `archived_at`).
+
+IDs counted in the last HOURS_KEPT hours are kept, so a message the index
+re-adds after a reconcile (a move or delete the log missed) is not counted
+twice; if it left the inbox that way, it is counted as read then.
+
+Tracked per mailbox:
+- received/sent/read counts per hour (the last HOURS_KEPT hours),
+- send-to-read latency of the last LATENCY_SAMPLES messages read
+  (delivery time to the first move out of the inbox),
+- messages received per sender,
+- delivery times of unread messages (for the age of the oldest one).
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import mail_index
+
+STATS_FILE = ".stats.json"
+HOURS_KEPT = 7 * 24
+LATENCY_SAMPLES = 2000
+_VERSION = 1
+
+
+def _empty() -> Dict[str, Any]:
+    return {"version": _VERSION, "log_inode": None, "offset": 0,
+            "hours": {}, "senders": {}, "latency": [], "unread": {}, "counted": {}}
+
+
+def _bump(state: Dict[str, Any], ts: float, field: str):
+    hour = str(int(ts // 3600))
+    counts = state["hours"].setdefault(hour, {})
+    counts[field] = counts.get(field, 0) + 1
+
+
+def _read(state: Dict[str, Any], delivered: Optional[float], read_at: float):
+    _bump(state, read_at, "read")
+    if delivered:
+        state["latency"].append(round(max(0.0, read_at - delivered), 3))
+
+
+def _readd(state: Dict[str, Any], op: Dict[str, Any], dropped: Dict[str, float]):
+    """A counted message added again: only track whether it is still unread."""
+    mail_id = op.get("id")
+    delivered = dropped.pop(mail_id, state["unread"].pop(mail_id, None))
+    if delivered is None:
+        return
+    if op.get("folder") == "inbox":
+        state["unread"][mail_id] = delivered
+    else:
+        _read(state, delivered, op.get("read_at") or time.time())
+
+
+def _apply(state: Dict[str, Any], ops: List[Dict[str, Any]]):
+    unread, counted = state["unread"], state["counted"]
+    # Unread messages a reconcile removed from one folder, usually re-added to another next
+    dropped: Dict[str, float] = {}
+    window_start = (int(time.time() // 3600) - HOURS_KEPT) * 3600
+    for op in ops:
+        kind, mail_id = op.get("op"), op.get("id")
+        if kind == "add":
+            delivered = op.get("timestamp") or 0.0
+            if mail_id in counted or (op.get("reconcile") and delivered < window_start):
+                _readd(state, op, dropped)  # Already counted
+                continue
+            counted[mail_id] = delivered
+            if op.get("folder") == "sent":
+                _bump(state, delivered, "sent")
+                continue
+            _bump(state, delivered, "received")
+            sender = op.get("from") or "Unknown"
+            state["senders"][sender] = state["senders"].get(sender, 0) + 1
+            if op.get("read_at"):
+                _read(state, delivered, op["read_at"])
+            elif op.get("folder") == "inbox":
+                unread[mail_id] = delivered
+        elif kind == "move":
+            if mail_id in unread and op.get("folder") != "inbox":
+                _read(state, unread.pop(mail_id), op.get("ts") or time.time())
+        elif kind == "del":
+            if op.get("reconcile") and mail_id in unread:
+                dropped[mail_id] = unread.pop(mail_id)
+            else:
+                unread.pop(mail_id, None)
+
+
+def _trim(state: Dict[str, Any]):
+    oldest = int(time.time() // 3600) - HOURS_KEPT
+    state["hours"] = {h: c for h, c in state["hours"].items() if int(h) > oldest}
+    state["counted"] = {i: ts for i, ts in state["counted"].items() if ts >= oldest * 3600}
+    del state["latency"][:-LATENCY_SAMPLES]
+
+
+def _load(stats_path: str) -> Dict[str, Any]:
+    try:
+        with open(stats_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == _VERSION:
+            state.setdefault("counted", dict(state["unread"]))  # Written before IDs were kept
+            return state
+    except (OSError, ValueError):
+        pass
+    return _empty()
+
+
+def _save(stats_path: str, state: Dict[str, Any]):
+    tmp = f"{stats_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, stats_path)
+    except OSError:
+        pass  # Read-only mailbox: recomputed next time
+
+
+def update(mail_dir: Path) -> Dict[str, Any]:
+    """Bring the stored totals up to date with the index log and return them."""
+    stats_path = os.path.join(str(mail_dir), STATS_FILE)
+    log_path = os.path.join(str(mail_dir), mail_index.INDEX_FILE)
+    state = _load(stats_path)
+    try:
+        st = os.stat(log_path)
+    except FileNotFoundError:
+        return state
+
+    if state["log_inode"] != st.st_ino or state["offset"] > st.st_size:
+        state = _empty()  # New, compacted or rebuilt log: replay it whole
+    if state["offset"] == st.st_size:
+        return state
+
+    with open(log_path, "rb") as f:
+        f.seek(state["offset"])
+        data = f.read(st.st_size - state["offset"])
+    end = data.rfind(b"\n") + 1  # Only whole lines; a torn tail is read next time
+    lines = [line for line in data[:end].decode("utf-8").split("\n") if line]
+    _apply(state, mail_index._decode(lines))
+    state["log_inode"], state["offset"] = st.st_ino, state["offset"] + end
+    _trim(state)
+    _save(stats_path, state)
+    return state
+
+
+def _before_rewrite(mail_dir: Path):
+    # Count the old log to its end while it still exists (only mailboxes with stats)
+    if os.path.exists(os.path.join(str(mail_dir), STATS_FILE)):
+        update(mail_dir)
+
+
+def _after_rewrite(mail_dir: Path, old: Optional[tuple], new: tuple):
+    stats_path = os.path.join(str(mail_dir), STATS_FILE)
+    if old is None or not os.path.exists(stats_path):
+        return
+    state = _load(stats_path)
+    if (state["log_inode"], state["offset"]) == tuple(old):
+        # Everything in the new log is already counted: continue after it
+        state["log_inode"], state["offset"] = new
+        _save(stats_path, state)
+
+
+mail_index.on_rewrite(_before_rewrite, _after_rewrite)
+
+
+def _percentile(ordered: List[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summary(mail_dir: Path, window_hours: int = 24, top: int = 5) -> Dict[str, Any]:
+    """Backlog, latency percentiles, hourly rates and top senders of a mailbox."""
+    state = update(mail_dir)
+    now = time.time()
+    backlog = {folder: 0 for folder in mail_index.FOLDERS}
+    backlog.update(mail_index.counts(mail_dir))
+
+    current = int(now // 3600)
+    totals = {"received": 0, "sent": 0, "read": 0}
+    for hour, counts in state["hours"].items():
+        if current - int(hour) < window_hours:
+            for field in totals:
+                totals[field] += counts.get(field, 0)
+
+    ordered = sorted(state["latency"])
+    unread = state["unread"].values()
+    senders = sorted(state["senders"].items(), key=lambda item: item[1], reverse=True)
+    return {
+        "backlog": backlog,
+        "oldest_unread_age": round(now - min(unread), 1) if unread else None,
+        "latency": {
+            "count": len(ordered),
+            "p50": _percentile(ordered, 50),
+            "p90": _percentile(ordered, 90),
+            "p99": _percentile(ordered, 99),
+            "max": ordered[-1] if ordered else None,
+        },
+        "per_hour": {field: round(total / window_hours, 2) for field, total in totals.items()},
+        "top_senders": [{"from": sender, "count": count} for sender, count in senders[:top]],
+    }
@@ -0,0 +1,152 @@
+"""
+Conversation threads of a mailbox (`ucas mail thread`, `ucas mail list --threads`).
+
+Replies carry X-Ucas-In-Reply-To (the parent ID) and X-Ucas-Thread (the ID of
+the thread's first message). Every reply delivered to or sent from a mailbox
+appends one line to <mail_dir>/.threads/<thread id>.jsonl:
+
+    {"id": ..., "parent": ...}
+
+Resolving a thread reads that one file and locates each member by probing its
+folders, so it costs O(thread size) whatever the mailbox size. `ucas mail
+reindex` rebuilds the files from the In-Reply-To chains in the index.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import mail_index
+from . import mail_segments
+
+THREAD_DIR = ".threads"
+
+
+def _thread_file(mail_dir: Path, thread: str) -> str:
+    return os.path.join(str(mail_dir), THREAD_DIR, os.path.basename(thread) + ".jsonl")
+
+
+def record(mail_dir: Path, thread: str, mail_id: str, parent: str):
+    """Add a reply to its thread (one O_APPEND write; no lock needed)."""
+    path = _thread_file(mail_dir, thread)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": mail_id, "parent": parent}) + "\n")
+
+
+def _members(mail_dir: Path, thread: str) -> Dict[str, Optional[str]]:
+    """{id: parent} of the replies recorded for a thread."""
+    members = {}
+    try:
+        with open(_thread_file(mail_dir, thread), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                members[rec["id"]] = rec.get("parent")
+    except FileNotFoundError:
+        pass
+    return members
+
+
+def locate(mail_dir: Path, mail_id: str) -> Optional[Dict[str, Any]]:
+    """Index entry of a message found by probing its possible folders (no index replay)."""
+    for folder in mail_index.FOLDERS:
+        path = Path(mail_dir) / folder / f"{mail_id}.eml"
+        if path.exists() or mail_segments.locate(path):
+            try:
+                return mail_index.read_entry(path, folder)
+            except (OSError, ValueError):
+                return None
+    return None
+
+
+def thread_of(entry: Dict[str, Any]) -> str:
+    return entry.get("thread") or entry["id"]
+
+
+def get_thread(mail_dir: Path, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    All messages of entry's thread present in this mailbox, oldest first, each
+    with `parent` and `depth` (0 for the thread's first message).
+    """
+    thread = thread_of(entry)
+    parents: Dict[str, Optional[str]] = {thread: None}
+    parents.update(_members(mail_dir, thread))
+    parents.setdefault(entry["id"], entry.get("in_reply_to"))
+
+    found = {}
+    for mail_id in parents:
+        msg = entry if mail_id == entry["id"] else locate(mail_dir, mail_id)
+        if msg:
+            found[mail_id] = msg
+
+    def depth(mail_id, seen=()):
+        parent = parents.get(mail_id)
+        if parent is None or parent not in parents or parent in seen:
+            return 0
+        return depth(parent, seen + (mail_id,)) + 1
+
+    result = []
+    for mail_id, msg in found.items():
+        msg = dict(msg, parent=parents.get(mail_id), depth=depth(mail_id))
+        result.append(msg)
+    result.sort(key=mail_index.sort_key)
+    return result
+
+
+def rebuild(mail_dir: Path, entries: Dict[str, Dict[str, Any]]) -> int:
+    """Rewrite the thread files from In-Reply-To chains. Returns the number of threads."""
+    def root(mail_id):
+        seen = set()
+        while True:
+            entry = entries.get(mail_id)
+            if entry is None or mail_id in seen:
+                return mail_id
+            if entry.get("thread"):
+                return entry["thread"]
+            parent = entry.get("in_reply_to")
+            if not parent:
+                return mail_id
+            seen.add(mail_id)
+            mail_id = parent
+
+    threads: Dict[str, List[dict]] = {}
+    for mail_id, entry in entries.items():
+        if entry.get("in_reply_to"):
+            threads.setdefault(root(mail_id), []).append({"id": mail_id, "parent": entry["in_reply_to"]})
+
+    thread_dir = os.path.join(str(mail_dir), THREAD_DIR)
+    os.makedirs(thread_dir, exist_ok=True)
+    for name in os.listdir(thread_dir):
+        if name.endswith(".jsonl"):
+            os.unlink(os.path.join(thread_dir, name))
+    for thread, members in threads.items():
+        with open(_thread_file(mail_dir, thread), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(m) + "\n" for m in members)
+    return len(threads)
+
+
+def summarize(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group listed messages by thread, most recently active thread first."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        groups.setdefault(thread_of(entry), []).append(entry)
+
+    summaries = []
+    for thread, msgs in groups.items():
+        msgs.sort(key=mail_index.sort_key)
+        first, last = msgs[0], msgs[-1]
+        summaries.append((mail_index.sort_key(last), {
+            "thread": thread,
+            "subject": first.get("subject"),
+            "count": len(msgs),
+            "unread": sum(1 for m in msgs if m.get("_folder", m.get("folder")) == "inbox"),
+            "participants": list(dict.fromkeys(m.get("from") or "Unknown" for m in msgs)),
+            "last_id": last["id"],
+            "last_date": last.get("date_str", ""),
+        }))
+    summaries.sort(key=lambda item: item[0], reverse=True)
+    return [summary for _, summary in summaries]
@@ -10,6 +10,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Union, Any
 
 from .yaml_parser import load_yaml, save_yaml
+from . import state
 
 
 # Constants
@@ -349,8 +350,14 @@ def build_project_list(include_all_info: bool = True) -> List[Dict[str, Any]]:
             project_info["tags"] = config.get("tags", [])
             project_info["team_started"] = config.get("team_started", "NONE")
 
-            # Get team agents if a team is started
-            if project_info["team_started"] != "NONE":
+            if state.has_state(project_path):
+                # Recorded launch state: verified with pid checks, no tmux scan
+                running = [s for s in state.list_states(project_path) if state.live_members(s)]
+                project_info["team_started"] = ",".join(
+                    s.get("team") or state.SINGLE for s in running) or "NONE"
+                project_info["team_agents"] = [m for s in running for m in state.live_members(s)]
+            elif project_info["team_started"] != "NONE":
+                # Get team agents if a team is started
                 project_info["team_agents"] = get_team_agents(
                     project_path,
                     project_info["team_started"]
@@ -766,6 +773,10 @@ def handle_autostart_command(tag_names: List[str]) -> None:
                 print(f"  {alias}: tag '{tag_name}' → team '{team_to_run}'")
                 break
 
+        if proj.get("team_started", "NONE") != "NONE":
+            print(f"  → {alias}: team '{proj['team_started']}' already running, skipping")
+            continue
+
         # Start team
         print(f"  → Starting team '{team_to_run}' in {alias}...")
 
@@ -786,9 +797,6 @@ def handle_autostart_command(tag_names: List[str]) -> None:
 
             os.chdir(original_cwd)
 
-            # Update team_started
-            set_team_started(project_path, team_to_run)
-
         except Exception as e:
             print(f"  Error: Failed to start team: {e}", file=sys.stderr)
 
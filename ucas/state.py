@@ -0,0 +1,259 @@
+"""
+Recorded launch state: .ucas/state/<team>.json
+
+Written at launch time by run_team / prepare_and_run_member so that stop,
+status, `list --running` and autostart can find the runner, session, windows
+and pids of a team without re-resolving the configuration or scanning every
+tmux pane on the machine. Liveness is verified with a cheap pid check plus
+the process start time (/proc/<pid>/stat), so a pid reused after a reboot or
+by an unrelated process is treated as stale and never signalled.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import signal
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+STATE_SUBDIR = "state"
+# State key for agents started with `ucas run` (no team)
+SINGLE = "_single"
+# Start times within this many seconds match (/proc/stat btime has 1 s resolution)
+_START_SLACK = 2.0
+# Context keys that change on every launch (or with team size) but do not
+# change what the agent actually runs. UCAS_TEAM_INDEX/UCAS_TEAM_SIZE are
+# launch-time values: scale/reload do not restart survivors to update them.
+_VOLATILE_KEYS = ('UCAS_SESSION_ID', 'UCAS_MAIN_COMMAND', 'UCAS_WINDOW_NAME',
+                  'UCAS_TEAM_INDEX', 'UCAS_TEAM_SIZE', 'UCAS_POOL_SIZE', 'UCAS_TEAM_APPEND')
+
+
+def get_state_dir(project_root: Path) -> Path:
+    return Path(project_root) / ".ucas" / STATE_SUBDIR
+
+
+def get_state_path(project_root: Path, team: Optional[str]) -> Path:
+    return get_state_dir(project_root) / f"{team or SINGLE}.json"
+
+
+def get_pid_file(project_root: Path, team: Optional[str], member: str) -> Path:
+    return get_state_dir(project_root) / "pids" / (team or SINGLE) / f"{member}.pid"
+
+
+@contextmanager
+def _locked(path: Path):
+    """Exclusive lock for read-modify-write of a state file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(str(path) + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(str(tmp), str(path))
+
+
+def load_state(project_root: Path, team: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Load a team's launch state, or None if it was never recorded."""
+    try:
+        return json.loads(get_state_path(project_root, team).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def list_states(project_root: Path) -> List[Dict[str, Any]]:
+    """Load all recorded team states of a project."""
+    state_dir = get_state_dir(project_root)
+    if not state_dir.is_dir():
+        return []
+    states = []
+    for path in sorted(state_dir.glob("*.json")):
+        try:
+            states.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return states
+
+
+def record_member(project_root: Path, team: Optional[str], member: str, entry: Dict[str, Any],
+                  session: str, runner: Dict[str, Any]) -> None:
+    """Add or replace a member entry in the team's state file."""
+    path = get_state_path(project_root, team)
+    now = time.time()
+    with _locked(path):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            data = {"team": team or "", "started_at": now, "members": {}}
+        data["session"] = session
+        data["runner"] = runner
+        data["updated_at"] = now
+        data.setdefault("members", {})[member] = dict(entry, started_at=now)
+        _write_atomic(path, data)
+
+
+def update_team(project_root: Path, team: Optional[str], **fields: Any) -> None:
+    """Set team-level fields (e.g. the mods the team was launched with)."""
+    path = get_state_path(project_root, team)
+    with _locked(path):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            data = {"team": team or "", "started_at": time.time(), "members": {}}
+        data.update(fields)
+        _write_atomic(path, data)
+
+
+def remove_members(project_root: Path, team: Optional[str], members: List[str]) -> None:
+    """Drop member entries (e.g. after a selective stop)."""
+    path = get_state_path(project_root, team)
+    with _locked(path):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+        for member in members:
+            data.get("members", {}).pop(member, None)
+        data["updated_at"] = time.time()
+        _write_atomic(path, data)
+
+
+def clear_team(project_root: Path, team: Optional[str]) -> None:
+    """Forget a team's state (after stop)."""
+    path = get_state_path(project_root, team)
+    for p in (path, Path(str(path) + ".lock")):
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+    pid_dir = get_pid_file(project_root, team, "x").parent
+    if pid_dir.is_dir():
+        for pid_file in pid_dir.glob("*.pid"):
+            pid_file.unlink()
+
+
+def launch_plan_hash(context: Dict[str, str], main_cmd: str, hooks: Dict[str, Any],
+                     run_def: Dict[str, Any], prompt: str = "") -> str:
+    """Stable hash of what a member runs: command, env, prompts, hooks and runner."""
+    plan = json.dumps({
+        "env": {k: v for k, v in context.items() if k not in _VOLATILE_KEYS},
+        "cmd": main_cmd,
+        "prompt": prompt,
+        "prerun": hooks.get('prerun', []),
+        "postrun": hooks.get('postrun', []),
+        "run": run_def,
+    }, sort_keys=True, default=str)
+    # The session id is fresh on every launch
+    session_id = context.get('UCAS_SESSION_ID', '')
+    if session_id:
+        plan = plan.replace(session_id, "{uuid}")
+    return hashlib.sha256(plan.encode()).hexdigest()
+
+
+_boot_time: Optional[float] = None
+
+
+def process_start_time(pid: int) -> Optional[float]:
+    """Epoch start time of a process from /proc (None if gone or not on Linux)."""
+    global _boot_time
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field 22 (starttime, in clock ticks since boot); comm may contain spaces
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        if _boot_time is None:
+            with open("/proc/stat") as f:
+                _boot_time = float(next(line.split()[1] for line in f if line.startswith("btime ")))
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+    return _boot_time + ticks / os.sysconf("SC_CLK_TCK")
+
+
+def member_pid(entry: Dict[str, Any]) -> Optional[int]:
+    """
+    Pid of a member's shell, read from its pid file (written by the command
+    itself), or None when the pid now belongs to another process: the shell
+    started before it wrote the file, so a process started later is a reuse.
+    """
+    if entry.get("pid"):
+        pid, recorded = int(entry["pid"]), entry.get("pid_start")
+        started = process_start_time(pid) if recorded else None
+        if started is not None and abs(started - recorded) > _START_SLACK:
+            return None
+        return pid
+    pid_file = entry.get("pid_file")
+    if not pid_file:
+        return None
+    try:
+        pid = int(Path(pid_file).read_text().strip())
+        written = os.stat(pid_file).st_mtime
+    except (OSError, ValueError):
+        return None
+    started = process_start_time(pid)
+    if started is not None and started > written + _START_SLACK:
+        return None
+    return pid
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_member_alive(entry: Dict[str, Any]) -> bool:
+    return pid_alive(member_pid(entry))
+
+
+def live_members(state: Dict[str, Any]) -> List[str]:
+    return [m for m, e in state.get("members", {}).items() if is_member_alive(e)]
+
+
+def running_teams(project_root: Path) -> List[str]:
+    """Names of teams in the project that have at least one live member."""
+    return [s.get("team") or SINGLE for s in list_states(project_root) if live_members(s)]
+
+
+def has_state(project_root: Path) -> bool:
+    """True if this project records launch state (launched by a state-aware UCAS)."""
+    return get_state_dir(project_root).is_dir()
+
+
+def kill_member(entry: Dict[str, Any], sig: int = signal.SIGTERM) -> bool:
+    """Signal a member's process group (falls back to the pid). Returns True if signalled."""
+    pid = member_pid(entry)
+    if not pid_alive(pid):
+        return False
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            return False
+    return True
+
+
+def stop_member(entry: Dict[str, Any], timeout: float = 5.0) -> bool:
+    """SIGTERM a member, wait up to timeout for it to exit, then SIGKILL."""
+    if not kill_member(entry):
+        return False
+    deadline = time.monotonic() + timeout
+    while is_member_alive(entry) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if is_member_alive(entry):
+        kill_member(entry, signal.SIGKILL)
+    return True
@@ -12,8 +12,11 @@ from typing import List, Dict, Any, Optional
 
 from . import settings
 from . import mail
+from . import mail_index
+from . import state
 from .launcher import prepare_and_run_member, stop_runner, prepare_context, select_run_mod
 from .exceptions import LaunchError
+from .limits import get_usage, format_usage, remove_cgroup
 from .merger import merge_configs, resolve_entities, _merge_dicts
 from .resolver import find_entity, load_config_file, get_layer_config_paths, get_search_paths, get_run_config
 
@@ -25,18 +28,29 @@ def handle_team_command(args):
         stop_team(args)
     elif args.team_command == 'status':
         show_status(args)
+    elif args.team_command == 'restart':
+        restart_members(args)
+    elif args.team_command == 'reload':
+        reload_team(args)
+    elif args.team_command == 'scale':
+        scale_team(args)
     else:
-        print("Use: ucas team {run,stop,status} ...")
+        print("Use: ucas team {run,stop,status,restart,reload,scale} ...")
         sys.exit(1)
 
 
-def _init_mails(merged_config: Dict[str, Any], team_members: List[str]):
+def _init_mails(merged_config: Dict[str, Any], team_members: List[str], queues: Optional[List[str]] = None):
     """Initialize mail system for the project if enabled."""
     if merged_config.get('mails') is not True:
         return
 
     project_root = Path.cwd()
     mail._update_project_list(project_root)
+
+    # Shared work-queue mailboxes of replica groups
+    for queue in (queues or []):
+        if queue.islower():
+            mail._ensure_queue_dir(project_root / ".ucas" / "mails" / queue)
     
     # Create directories for all members (only lowercase names allowed)
     for member in team_members:
@@ -47,8 +61,7 @@ def _init_mails(merged_config: Dict[str, Any], team_members: List[str]):
         mail._ensure_mail_dirs(agent_mail_dir)
         
         # perfection: Notify if new mail is waiting
-        inbox = agent_mail_dir / "inbox"
-        new_cnt = len(list(inbox.glob("*.eml")))
+        new_cnt = mail_index.counts(agent_mail_dir).get("inbox", 0)
         if new_cnt > 0:
             print(f"📩 [{member}] You have {new_cnt} new message(s) in your inbox.")
         
@@ -56,13 +69,12 @@ def _init_mails(merged_config: Dict[str, Any], team_members: List[str]):
         print(f"[MAIL] Initialized mailboxes for {len(team_members)} members at {project_root}")
 
 
-def run_team(args):
-    """Run a team of agents."""
-    # Import project module for team_started tracking
-    from . import project
-
-    project_root = Path.cwd()
-
+def _resolve_team(project_root: Path, team_arg: Optional[str], cli_mods: List[str],
+                  replicas: Optional[Dict[str, int]] = None):
+    """
+    Resolve the team definition. Returns (merged_config, team_def, team_name, members, groups)
+    with replicated members already expanded (see _expand_replicas).
+    """
     # 1. Resolve configuration layers
     (sys_cfg, _), (usr_cfg, _), (prj_cfg, _) = get_layer_config_paths(project_root)
     base_config = {}
@@ -77,11 +89,11 @@ def run_team(args):
     # 2. Resolve Mods (including Team Mod if specified)
     team_mod_paths = []
     
-    # If args.team is specified, treat it as a mod that might contain team definition
-    if args.team:
-        m_path = find_entity(args.team, search_paths)
+    # If team_arg is specified, treat it as a mod that might contain team definition
+    if team_arg:
+        m_path = find_entity(team_arg, search_paths)
         if not m_path:
-            raise LaunchError(f"Team Mod '{args.team}' not found")
+            raise LaunchError(f"Team Mod '{team_arg}' not found")
         team_mod_paths.append(m_path)
         # Dynamic search path update is handled inside resolve_entities or we do it here?
         # resolve_entities is not used here yet.
@@ -92,7 +104,7 @@ def run_team(args):
         _update_search_paths(search_paths, m_path)
 
     # Add CLI mods
-    for mod_item in (args.mods or []):
+    for mod_item in (cli_mods or []):
         m_path = find_entity(mod_item, search_paths)
         if not m_path:
             raise LaunchError(f"Mod '{mod_item}' not found")
@@ -120,63 +132,271 @@ def run_team(args):
         else:
             raise LaunchError("No 'team' block or agents definition found in final configuration")
 
+    team_name = team_def.get('name') or team_arg or project_root.name
+    members, groups = _expand_replicas(team_def.get('agents') or team_def.get('members', {}), replicas)
+    return merged_config, team_def, team_name, members, groups
+
+
+def _expand_replicas(members: Dict[str, Any], overrides: Optional[Dict[str, int]] = None):
+    """
+    Expand members with `replicas: N` into name-1..name-N.
+    overrides ({member: N}, from `ucas team scale`) win over the config.
+    Returns (members, {replica_name: group_name}).
+    """
+    overrides = overrides or {}
+    expanded, groups = {}, {}
+    for name, spec in members.items():
+        count = overrides.get(name, spec.get('replicas') if isinstance(spec, dict) else None)
+        if count is None:
+            expanded[name] = spec
+            continue
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            raise LaunchError(f"Member '{name}': 'replicas' must be an integer, got {count!r}")
+        if count < 0:
+            raise LaunchError(f"Member '{name}': 'replicas' must be >= 0")
+
+        if isinstance(spec, dict):
+            replica_spec = {k: v for k, v in spec.items() if k != 'replicas'}
+        else:
+            replica_spec = {'mods': spec if isinstance(spec, list) else [spec]}
+        for i in range(1, count + 1):
+            expanded[f"{name}-{i}"] = replica_spec
+            groups[f"{name}-{i}"] = name
+    return expanded, groups
+
+def _parse_member_spec(spec: Any):
+    """Parse a member spec. Returns (base, mods, prompt, model, provider, limits)."""
+    limits = None
+    if isinstance(spec, list):
+        base, mmods, prompt, model, provider = spec[0], spec[1:], None, None, None
+    elif isinstance(spec, str):
+        base, mmods, prompt, model, provider = spec, [], None, None, None
+    elif isinstance(spec, dict):
+        agent_list = spec.get('mods') or spec.get('agent', [])
+        if isinstance(agent_list, list):
+            base, mmods = agent_list[0], agent_list[1:]
+        else:
+            base, mmods = agent_list, spec.get('mods', [])
+        prompt, model, provider = spec.get('prompt'), spec.get('model'), spec.get('provider')
+        limits = spec.get('limits')
+    return base, mmods, prompt, model, provider, limits
+
+
+def _launch_member(project_root: Path, team_arg: Optional[str], cli_mods: List[str], team_def: Dict[str, Any],
+                   team_name: str, name: str, spec: Any, idx: int, size: int, queue: Optional[str] = None,
+                   append: bool = False, plan_only: bool = False) -> str:
+    """Launch one team member (or only compute its plan hash). Returns the plan hash."""
+    base, mmods, prompt, model, provider, limits = _parse_member_spec(spec)
+
+    effective_mods = []
+    if team_arg:
+        effective_mods.append(team_arg)
+    effective_mods.extend(team_def.get('mods', []))
+    effective_mods.extend(cli_mods or [])
+    effective_mods.extend(mmods)
+
+    return prepare_and_run_member(
+        member_name=name, agent_name=base, mods=effective_mods,
+        prefix=f"[{name}] ",
+        team_name=team_name, team_index=idx, team_size=size,
+        prompt=prompt or team_def.get('prompt'), model=model, provider=provider,
+        project_root=project_root, limits=limits, append=append, plan_only=plan_only,
+        extra_env={'UCAS_QUEUE': queue} if queue else None
+    )
+
+
+def run_team(args):
+    """Run a team of agents."""
+    project_root = Path.cwd()
+    merged_config, team_def, team_name, members, groups = _resolve_team(project_root, args.team, args.mods)
+
     # 5. Run Members
-    team_name = team_def.get('name') or args.team or project_root.name
-    members = team_def.get('agents') or team_def.get('members', {})
-    team_wide_mods = team_def.get('mods', [])
     member_names = list(members.keys())
     
+    if not settings.DRY_RUN:
+        previous = state.load_state(project_root, team_name)
+        if previous and state.live_members(previous):
+            raise LaunchError(f"Team '{team_name}' is already running. Use 'ucas team stop' first.")
+        state.clear_team(project_root, team_name)
+        # Remembered so restart/reload resolve the team exactly as it was launched
+        state.update_team(project_root, team_name, team_arg=args.team, mods=args.mods or [])
+
     print(f"Starting team '{team_name}' with {len(member_names)} members...")
     
     # Initialize Mails
-    _init_mails(merged_config, member_names)
+    _init_mails(merged_config, member_names, sorted(set(groups.values())))
 
     for idx, name in enumerate(member_names):
-        spec = members[name]
-        # Parse member spec
-        if isinstance(spec, list):
-            base, mmods, prompt, model, provider = spec[0], spec[1:], None, None, None
-        elif isinstance(spec, str):
-            base, mmods, prompt, model, provider = spec, [], None, None, None
-        elif isinstance(spec, dict):
-            agent_list = spec.get('mods') or spec.get('agent', [])
-            if isinstance(agent_list, list):
-                base, mmods = agent_list[0], agent_list[1:]
-            else:
-                base, mmods = agent_list, spec.get('mods', [])
-            prompt, model, provider = spec.get('prompt'), spec.get('model'), spec.get('provider')
-        
-        effective_mods = []
-        if args.team:
-            effective_mods.append(args.team)
-        effective_mods.extend(team_wide_mods)
-        effective_mods.extend(args.mods or [])
-        effective_mods.extend(mmods)
-        
-        prepare_and_run_member(
-            member_name=name, agent_name=base, mods=effective_mods,
-            prefix=f"[{name}] ",
-            team_name=team_name, team_index=idx, team_size=len(member_names),
-            prompt=prompt or team_def.get('prompt'), model=model, provider=provider,
-            project_root=project_root
-        )
+        _launch_member(project_root, args.team, args.mods, team_def, team_name, name, members[name],
+                       idx, len(member_names), queue=groups.get(name))
         
         if team_def.get('sleep_seconds', 0) > 0 and idx < len(member_names)-1 and not settings.DRY_RUN:
             time.sleep(team_def['sleep_seconds'])
 
-    # Update team_started in project config
+    if settings.VERBOSE and not settings.DRY_RUN:
+        print(f"[STATE] Recorded launch state in {state.get_state_path(project_root, team_name)}")
+
+
+def _require_recorded_team(project_root: Path, team: str) -> Dict[str, Any]:
+    team_state = state.load_state(project_root, team)
+    if not team_state:
+        raise LaunchError(f"Team '{team}' has no recorded launch state. Start it with 'ucas team run {team}'.")
+    return team_state
+
+
+def _stop_member(project_root: Path, team_name: str, name: str, entry: Optional[Dict[str, Any]]) -> None:
+    if entry and not settings.DRY_RUN:
+        state.stop_member(entry)
+        remove_cgroup(entry.get('cgroup'))
+        state.remove_members(project_root, team_name, [name])
+
+
+def restart_members(args):
+    """Restart selected members of a running team; other members keep running."""
+    project_root = Path.cwd()
+    team_state = _require_recorded_team(project_root, args.team)
+    team_arg, cli_mods = team_state.get('team_arg', args.team), team_state.get('mods', [])
+    merged_config, team_def, team_name, members, groups = _resolve_team(
+        project_root, team_arg, cli_mods, team_state.get('replicas'))
+
+    unknown = [m for m in args.members if m not in members]
+    if unknown:
+        raise LaunchError(f"Unknown member(s) of team '{team_name}': {', '.join(unknown)}")
+
+    member_names = list(members.keys())
+    for name in args.members:
+        print(f"Restarting '{name}'...")
+        _stop_member(project_root, team_name, name, team_state.get('members', {}).get(name))
+        _launch_member(project_root, team_arg, cli_mods, team_def, team_name, name, members[name],
+                       member_names.index(name), len(member_names), queue=groups.get(name), append=True)
+
+
+def _apply_team(project_root: Path, team_state: Dict[str, Any], only: Optional[List[str]] = None) -> None:
+    """
+    Re-resolve a running team and apply the difference: restart members whose
+    launch plan changed (or died), add new members, stop removed ones.
+    only: limit the changes to these members / replica groups.
+    """
+    team_arg, cli_mods = team_state.get('team_arg', team_state.get('team')), team_state.get('mods', [])
+    merged_config, team_def, team_name, members, groups = _resolve_team(
+        project_root, team_arg, cli_mods, team_state.get('replicas'))
+    recorded = team_state.get('members', {})
+    member_names = list(members.keys())
+
+    def selected(name: str) -> bool:
+        if not only or name in only or groups.get(name) in only:
+            return True
+        # Replicas of a group that was scaled down are only known from the launch state
+        return bool(only) and recorded.get(name, {}).get('group') in only
+
+    for name in [m for m in recorded if m not in members and selected(m)]:
+        print(f"- {name}: removed")
+        _stop_member(project_root, team_name, name, recorded[name])
+
+    _init_mails(merged_config, [m for m in member_names if m not in recorded], sorted(set(groups.values())))
+
+    for idx, name in enumerate(member_names):
+        if not selected(name):
+            continue
+        entry = recorded.get(name)
+        plan_hash = _launch_member(project_root, team_arg, cli_mods, team_def, team_name, name, members[name],
+                                   idx, len(member_names), queue=groups.get(name), plan_only=True)
+        if entry and entry.get('plan_hash') == plan_hash and state.is_member_alive(entry):
+            print(f"= {name}: unchanged")
+            continue
+
+        if not entry:
+            print(f"+ {name}: added")
+        elif entry.get('plan_hash') != plan_hash:
+            print(f"~ {name}: changed, restarting")
+        else:
+            print(f"~ {name}: not running, restarting")
+        _stop_member(project_root, team_name, name, entry)
+        _launch_member(project_root, team_arg, cli_mods, team_def, team_name, name, members[name],
+                       idx, len(member_names), queue=groups.get(name), append=True)
+
+
+def reload_team(args):
+    """Apply configuration changes to a running team without touching unchanged members."""
+    project_root = Path.cwd()
+    _apply_team(project_root, _require_recorded_team(project_root, args.team))
+
+
+def scale_team(args):
+    """Grow or shrink replica groups of a running team: ucas team scale <team> worker=4."""
+    project_root = Path.cwd()
+    team_state = _require_recorded_team(project_root, args.team)
+    replicas = dict(team_state.get('replicas') or {})
+    for item in args.scale:
+        member, _, count = item.partition('=')
+        if not member or not count.isdigit():
+            raise LaunchError(f"Invalid scale '{item}', expected <member>=N")
+        replicas[member] = int(count)
+
+    team_def = _resolve_team(project_root, team_state.get('team_arg', args.team), team_state.get('mods', []))[1]
+    defined = team_def.get('agents') or team_def.get('members', {})
+    unknown = [m for m in replicas if m not in defined]
+    if unknown:
+        raise LaunchError(f"Unknown member(s) of team '{args.team}': {', '.join(unknown)}")
+
+    team_state['replicas'] = replicas
+    _apply_team(project_root, team_state, only=[item.partition('=')[0] for item in args.scale])
     if not settings.DRY_RUN:
-        project.set_team_started(project_root, team_name)
+        state.update_team(project_root, team_state.get('team'), replicas=replicas)
+
+
+def _find_recorded_team(project_root: Path, team: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Find the recorded state for a team (or the only recorded team if none given)."""
+    if team:
+        return state.load_state(project_root, team)
+    states = state.list_states(project_root)
+    return states[0] if len(states) == 1 else None
+
+
+def _clear_team_started(project_root: Path) -> None:
+    """Reset team_started left by an older UCAS, so `list --running` stops reporting it."""
+    from . import project
+
+    if project.get_team_started(project_root) != "NONE":
+        project.set_team_started(project_root, "NONE")
         if settings.VERBOSE:
-            print(f"[PROJECT] Set team_started = {team_name}")
+            print("[PROJECT] Set team_started = NONE")
+
+
+def _stop_recorded_team(project_root: Path, team_state: Dict[str, Any]) -> None:
+    """Stop a team using its recorded runner; no configuration resolution needed."""
+    team_name = team_state.get("team") or None
+    context = {
+        'UCAS_AGENT': 'stop',
+        'UCAS_TEAM': team_name or '',
+        'UCAS_PROJECT_ROOT': str(project_root.resolve()),
+        'UCAS_SESSION_ID': next((m.get('session_id') for m in team_state.get('members', {}).values()
+                                 if m.get('session_id')), ''),
+    }
+    stop_runner(team_state.get("runner", {}), context)
+
+    # Runners without a stop hook (bash, xterm, ...) leave processes behind
+    if not settings.DRY_RUN:
+        for entry in team_state.get("members", {}).values():
+            state.kill_member(entry)
+        for entry in team_state.get("members", {}).values():
+            remove_cgroup(entry.get('cgroup'))
+        state.clear_team(project_root, team_name)
+        _clear_team_started(project_root)
 
 
 def stop_team(args):
     """Stop a team."""
-    from . import project
-
     project_root = Path.cwd()
 
+    team_state = _find_recorded_team(project_root, args.team)
+    if team_state:
+        _stop_recorded_team(project_root, team_state)
+        return
+
+    # Fallback: team launched without recorded state, resolve its run block
     (sys_cfg, _), (usr_cfg, _), (prj_cfg, _) = get_layer_config_paths(project_root)
     base_config = {}
     for layer_name, cfg in [('System', sys_cfg), ('User', usr_cfg), ('Project', prj_cfg)]:
@@ -217,11 +437,8 @@ def stop_team(args):
     team_name = merged_config.get('team', {}).get('name') or args.team or project_root.name
 
     stop_runner(run_def, prepare_context("stop", project_root, team_name, project_root=project_root))
-
-    # Update team_started to NONE
-    project.set_team_started(project_root, "NONE")
-    if settings.VERBOSE:
-        print(f"[PROJECT] Set team_started = NONE")
+    if not settings.DRY_RUN:
+        _clear_team_started(project_root)
 
 
 def _get_tmux_sessions() -> List[Dict]:
@@ -252,6 +469,10 @@ def _get_tmux_sessions() -> List[Dict]:
 
 def is_team_running(project_root: Path) -> bool:
     """Check if any team is running for the given project."""
+    if state.has_state(project_root):
+        return bool(state.running_teams(project_root))
+
+    # Legacy: project never recorded launch state, scan tmux
     all_panes = _get_tmux_sessions()
     prefix = project_root.name
     # Check for exact session match or session-team match
@@ -282,6 +503,69 @@ def _capture_pane(session: str, window: str, lines: int = 15) -> str:
     except:
         return ""
 
+def _limits_line(entry: Dict[str, Any], pid: Optional[int]) -> str:
+    """Usage vs. limits for a recorded member ('' if it has no limits or is dead)."""
+    if not entry.get('limits') or not state.pid_alive(pid):
+        return ""
+    return format_usage(get_usage(pid, entry.get('cgroup')), entry['limits'])
+
+
+def _format_age(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    if seconds < 86400:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    return f"{seconds // 86400}d{(seconds % 86400) // 3600}h"
+
+
+def _show_recorded_status(team_states: List[Dict[str, Any]], target: Optional[str], lines: int) -> None:
+    """Status from recorded launch state: pid checks only, no tmux-wide scan."""
+    now = time.time()
+    for team_state in team_states:
+        team_name = team_state.get('team') or "Default"
+        session_name = team_state.get('session', '')
+        members = team_state.get('members', {})
+
+        if target and target not in (team_name, session_name):
+            matching = [(m, e) for m, e in members.items() if target in m or target in e.get('window', '')]
+            if not matching:
+                continue
+            for member, entry in matching:
+                pid = state.member_pid(entry)
+                print(f"Agent: {member} (PID: {pid or '-'}, Window: {entry.get('window')})")
+                print(f"Status: {'RUNNING' if state.pid_alive(pid) else 'DEAD'}")
+                print(f"Uptime: {_format_age(now - entry.get('started_at', now))}")
+                limits_line = _limits_line(entry, pid)
+                if limits_line:
+                    print(f"Limits: {limits_line}")
+                print("-" * 40)
+                print(_capture_pane(session_name, entry.get('window', member), lines))
+                print("-" * 40)
+            return
+
+        print(f"Team: {team_name} (Session: {session_name})")
+        print(f"{'AGENT':<20} {'PID':<8} {'STATUS':<10} {'UPTIME':<10} {'LAST OUTPUT'}")
+        print("-" * 80)
+        for member, entry in members.items():
+            pid = state.member_pid(entry)
+            alive = state.pid_alive(pid)
+            last_line = ""
+            if alive:
+                last_lines = _capture_pane(session_name, entry.get('window', member), 1).strip().splitlines()
+                last_line = last_lines[-1] if last_lines else ""
+                if len(last_line) > 30: last_line = last_line[:27] + "..."
+            status = "RUNNING" if alive else "DEAD"
+            uptime = _format_age(now - entry.get('started_at', now))
+            print(f"{member:<20} {str(pid or '-'):<8} {status:<10} {uptime:<10} {last_line}")
+            limits_line = _limits_line(entry, pid)
+            if limits_line:
+                print(f"{'':<20} limits: {limits_line}")
+        print()
+
+
 def show_status(args):
     """Show status of teams."""
     # 1. Ensure we are in a UCAS project
@@ -290,6 +574,19 @@ def show_status(args):
         print(f"Error: Not in a UCAS project (no .ucas directory found in {project_root})", file=sys.stderr)
         sys.exit(1)
 
+    target = args.target # could be Team or Agent
+    lines = args.lines 
+    if lines is None:
+        lines = 15 # Default summary
+        if target:
+            lines = 80 # Default detail if target specified
+
+    team_states = state.list_states(project_root)
+    if team_states:
+        _show_recorded_status(team_states, target, lines)
+        return
+
+    # Legacy: no recorded state, scan all tmux panes
     all_panes = _get_tmux_sessions()
     
     # UCAS run-tmux session name format: {project_root.name}-{team} or {project_root.name}
@@ -310,13 +607,6 @@ def show_status(args):
         print(f"No active sessions found for project '{prefix}' at {project_root_str}.")
         return
 
-    target = args.target # could be Team or Agent
-    lines = args.lines 
-    if lines is None:
-        lines = 15 # Default summary
-        if target:
-            lines = 80 # Default detail if target specified
-
     # Group by session (Team)
     teams = {}
     for p in relevant_panes: